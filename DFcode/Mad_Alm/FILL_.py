@@ -1,133 +1,204 @@
-import pandas as pd
 from openpyxl import load_workbook
-import re
 from tqdm import tqdm
 
+from xlsx_patch import patch_sheet_columns
+from header_index import clean_header
+from mapping_plan import parse_mapping_file, load_mapping_plan, execute_plan, plan_cache_path, source_columns
+from table_io import read_table, read_table_columns, table_format
+from vlookup import LOOKUP_MODES, evaluate_lookups
 
-def process_column_mapping(mapping_file_path, csv_file_path, excel_file_path, output_file_path, sheet_name='一元问题表'):
+
+WRITE_ENGINES = ('xml', 'stream', 'openpyxl')
+
+# 流式写入时每块生成的行数
+STREAM_CHUNK_ROWS = 10000
+
+
+def write_columns_openpyxl(ws, columns, first_row=2):
+    """
+    用openpyxl按行一次写入所有映射列(每行一个元组)，作为XML写入的备用方式
+
+    Args:
+        ws: 目标工作表
+        columns: {列号: 该列从first_row开始的全部值}
+        first_row: 第一行数据所在的行号
+    """
+    col_indices = list(columns)
+    values = [list(columns[col_idx]) for col_idx in col_indices]
+    for row_idx, row in enumerate(tqdm(zip(*values), total=len(values[0]) if values else 0,
+                                       desc="写入进度", unit="行"), start=first_row):
+        for col_idx, value in zip(col_indices, row):
+            ws.cell(row=row_idx, column=col_idx, value=value)
+
+
+def process_column_mapping(mapping_file_path, csv_file_path, excel_file_path, output_file_path, sheet_name='一元问题表', write_engine='xml', use_plan_cache=True, lookup_mode='formula', source_df=None, plan_cache_dir=None, header_containment=False):
     """
     简单的列对列映射：将CSV的整列数据复制到Excel对应列
 
     Args:
         mapping_file_path: 映射文件路径
-        csv_file_path: CSV文件路径（数据源）
+        csv_file_path: 数据源文件路径，扩展名为.parquet/.feather时按列式格式读取，其余为CSV；
+                       只读取映射用到的列，指定source_df时不读取，可为None
         excel_file_path: Excel文件路径（目标表格）
         output_file_path: 输出文件路径
         sheet_name: Excel工作表名称
+        write_engine: 写入方式，'xml'直接改写工作表XML，'stream'分块流式改写(模板很大时内存只与写入数据有关)，
+                      'openpyxl'通过单元格对象写入
+        use_plan_cache: 是否缓存编译后的映射计划(默认保存在映射文件旁的 .plan.json 中)
+        lookup_mode: VLOOKUP公式列的写法，'formula'只写公式(Excel打开时计算)，'value'在Python中查找后只写结果，
+                     'both'写公式并附带查找结果作为缓存值(仅xml/stream写入方式)
+        source_df: 内存中的数据源(如merge_alm_issues返回的合并结果DataFrame，或pyarrow的Table)，
+                   指定后直接使用，不再读取CSV
+        plan_cache_dir: 映射计划缓存目录，为None时使用环境变量DFCODE_PLAN_CACHE_DIR，都未设置时放在映射文件旁
+        header_containment: 表头精确和清理后都找不到时，是否按包含关系匹配(FILL_2的宽松规则)；
+                            默认关闭，找不到的列报告为失败
     """
     try:
+        if write_engine not in WRITE_ENGINES:
+            raise ValueError(f"不支持的写入方式: {write_engine}")
+        if lookup_mode not in LOOKUP_MODES:
+            raise ValueError(f"不支持的公式计算方式: {lookup_mode}")
+        if lookup_mode == 'both' and write_engine == 'openpyxl':
+            raise ValueError("openpyxl写入方式不能保存公式的缓存值，请使用xml或stream写入方式")
         print("开始处理列映射...")
 
         # 步骤1: 读取映射文件
         print("正在读取映射规则...")
-        mapping_rules = {}
-        with open(mapping_file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                cleaned = line.strip()
-                if '-->' in cleaned and not cleaned.startswith('#'):
-                    excel_col, csv_col = cleaned.split('-->', 1)
-                    excel_col = excel_col.strip()
-                    csv_col = csv_col.strip()
-                    mapping_rules[excel_col] = csv_col
+        mapping_rules = parse_mapping_file(mapping_file_path)
 
         print(f"读取到 {len(mapping_rules)} 条映射规则:")
-        for excel_col, csv_col in mapping_rules.items():
-            print(f"  Excel[{excel_col}] <-- CSV[{csv_col}]")
-
-        # 步骤2: 读取CSV文件
-        print("\n正在读取CSV文件...")
-        csv_df = pd.read_csv(csv_file_path, encoding='utf-8', dtype=str)
-        csv_df = csv_df.fillna('')  # 填充空值
-        print(f"CSV文件包含 {len(csv_df)} 行数据")
-
-        # 步骤3: 打开Excel文件
+        for excel_col, source in mapping_rules.items():
+            print(f"  Excel[{excel_col}] <-- {source}")
+
+        # 步骤2: 读取数据源的列名，数据在编译映射计划后只按需读取用到的列；
+        # 与合并流程串联时直接使用内存中的合并结果，省去写出再解析CSV
+        if source_df is not None:
+            csv_df = source_df.to_pandas() if hasattr(source_df, 'to_pandas') else source_df
+            csv_columns = list(csv_df.columns)
+            print(f"\n使用内存中的数据源，包含 {len(csv_df)} 行数据")
+        else:
+            print("\n正在读取数据源列名...")
+            csv_df = None
+            csv_columns = read_table_columns(csv_file_path)
+            print(f"数据源包含 {len(csv_columns)} 列")
+
+        # 步骤3: 打开Excel文件(xml/stream方式只需要以只读模式读取表头)
         print("\n正在读取Excel文件...")
-        wb = load_workbook(excel_file_path)
+        read_only = write_engine != 'openpyxl'
+        wb = load_workbook(excel_file_path, read_only=read_only)
         if sheet_name not in wb.sheetnames:
             raise ValueError(f"Excel文件中不存在工作表: {sheet_name}")
 
         ws = wb[sheet_name]
+        header_row = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        sheet_names = list(wb.sheetnames)
+        if read_only:
+            wb.close()
 
-        # 步骤4: 创建Excel表头映射（支持模糊匹配）
-        excel_headers = {}
-        excel_headers_clean = {}  # 清理后的表头映射
-        for col_idx in range(1, ws.max_column + 1):
-            cell_value = ws.cell(row=1, column=col_idx).value
-            if cell_value:
-                # 原始表头
-                header_name = str(cell_value).strip()
-                excel_headers[header_name] = col_idx
-
-                # 清理后的表头（去除换行符、空格等）
-                clean_header = re.sub(r'[\n\r\s]+', '', header_name)
-                excel_headers_clean[clean_header] = col_idx
+        # 步骤4: 编译映射计划：解析表头（精确 -> 清理后 (-> 包含匹配)）并校验，结果缓存在映射文件旁
+        excel_headers = [(col_idx, str(cell_value).strip())
+                         for col_idx, cell_value in enumerate(header_row, start=1) if cell_value]
 
         print(f"Excel表头 ({len(excel_headers)} 列):")
-        for header, col_idx in excel_headers.items():
-            clean_header = re.sub(r'[\n\r\s]+', '', header)
-            print(f"  列 {col_idx}: '{header}' -> 清理后: '{clean_header}'")
-
-        # 步骤5: 先处理A列序号
-        print("\n正在添加A列序号...")
-        # 确保有足够的行数（基于CSV数据行数）
-        data_rows = len(csv_df)
-
-        # 在A列添加序号（从第2行开始，因为第1行是表头）
-        for row_idx in range(2, 2 + data_rows):
-            sequence_num = row_idx - 1  # 序号从1开始
-            ws.cell(row=row_idx, column=1, value=sequence_num)
-
-        print(f"  ✅ 在A列添加了 {data_rows} 个序号 (1-{data_rows})")
-
-        # 步骤6: 执行列映射
+        for col_idx, header in excel_headers:
+            print(f"  列 {col_idx}: '{header}' -> 清理后: '{clean_header(header)}'")
+
+        plan, plan_cached = load_mapping_plan(
+            mapping_file_path, mapping_rules, excel_headers, csv_columns, sheet_names, use_plan_cache,
+            plan_cache_dir, header_containment)
+        if plan_cached:
+            print(f"\n使用缓存的映射计划: {plan_cache_path(mapping_file_path, plan_cache_dir)}")
+
+        if csv_df is None:
+            # 只读取映射用到的列(都不用时读第1列以得到行数)；Parquet/Feather按列读取并使用内存映射
+            used_columns = source_columns(plan) or csv_columns[:1]
+            print(f"\n正在读取数据源({table_format(csv_file_path)}, {len(used_columns)}/{len(csv_columns)} 列)...")
+            csv_df = read_table(csv_file_path, used_columns, dtype=str)
+            if table_format(csv_file_path) == 'csv':
+                csv_df = csv_df.fillna('')  # 填充空值
+            print(f"数据源包含 {len(csv_df)} 行数据")
+
+        # 步骤5: 检查映射计划（第1列默认写序号）
         print("\n开始执行列映射...")
+        data_rows = len(csv_df)
         successful_mappings = 0
+        skipped_mappings = 0
         failed_mappings = []
 
-        for excel_col, csv_col in mapping_rules.items():
-            print(f"\n处理映射: Excel[{excel_col}] <-- CSV[{csv_col}]")
+        for rule in plan:
+            excel_col, source = rule['target'], rule['source']
+            print(f"\n处理映射: Excel[{excel_col}] <-- {source}")
 
-            # 检查Excel中是否存在目标列
-            if excel_col not in excel_headers_clean:
-                print(f"Excel中的列: { excel_headers_clean}")
-                print(f"  ❌ Excel中未找到列: {excel_col}")
-                failed_mappings.append(f"Excel中未找到列: {excel_col}")
+            # 映射文件中标记为null的列不写入
+            if rule['op'] == 'skip':
+                print(f"  ⏭ 跳过: Excel[{excel_col}]")
+                skipped_mappings += 1
                 continue
 
-            # 检查CSV中是否存在源列
-            if csv_col not in csv_df.columns:
-                print(f"  ❌ CSV中未找到列: {csv_col}")
-                failed_mappings.append(f"CSV中未找到列: {csv_col}")
+            # Excel目标列或CSV源列未找到
+            if rule['error']:
+                print(f"  ❌ {rule['error']}")
+                failed_mappings.append(rule['error'])
                 continue
 
-            # 获取Excel列索引
-            excel_col_idx = excel_headers_clean[excel_col]
-
-            # 复制数据
-            csv_data = csv_df[csv_col].tolist()
-            print(
-                f"  📋 从CSV[{csv_col}]复制 {len(csv_data)} 行数据到Excel列{excel_col_idx}[{excel_col}]")
-
-            # 写入Excel（从第2行开始，第1行是表头）
-            for row_idx, value in enumerate(csv_data, start=2):
-                if pd.isna(value):
-                    value = ""
-                else:
-                    value = str(value).strip()
-                ws.cell(row=row_idx, column=excel_col_idx, value=value)
+            if rule['excel_match'] not in ('精确', '默认'):
+                print(f"  ✓ {rule['excel_match']}匹配Excel列: '{excel_col}' -> '{rule['excel_header']}'")
+            if rule['csv_match'] not in (None, '精确'):
+                print(f"  ✓ {rule['csv_match']}匹配CSV列: '{source}' -> '{rule['csv_column']}'")
+            if rule['warning']:
+                print(f"  ⚠ {rule['warning']}")
+
+            excel_col_idx = rule['excel_idx']
+            if rule['op'] == 'copy':
+                print(f"  📋 从CSV[{rule['csv_column']}]复制 {data_rows} 行数据到Excel列{excel_col_idx}[{excel_col}]")
+            elif rule['op'] == 'formula':
+                print(f"  🧮 在Excel列{excel_col_idx}[{excel_col}]写入 {data_rows} 行公式: {rule['template']}")
+            elif rule['op'] == 'constant':
+                print(f"  📝 在Excel列{excel_col_idx}[{excel_col}]写入常量: '{rule['value']}'")
+            else:
+                print(f"  🔢 在Excel列{excel_col_idx}[{excel_col}]添加了 {data_rows} 个序号 (1-{data_rows})")
 
             successful_mappings += 1
-            print(f"  ✅ 成功映射: Excel[{excel_col}] <-- CSV[{csv_col}]")
-
-        # 步骤6: 保存文件
+            print(f"  ✅ 成功映射: Excel[{excel_col}] <-- {source}")
+
+        # 步骤6: 按映射计划整列生成数据 {列号: 值}（从第2行开始，因为第1行是表头）
+        columns = execute_plan(plan, csv_df)
+
+        # 步骤6.1: 可选在Python中计算VLOOKUP：对查找表的键列建立一次哈希索引，按行查找
+        cached_values = None
+        if lookup_mode != 'formula':
+            print(f"\n正在计算VLOOKUP公式 (方式: {lookup_mode})...")
+            lookup_values, lookup_stats = evaluate_lookups(plan, columns, excel_file_path)
+            for col_idx, stat in lookup_stats.items():
+                print(f"  🔍 Excel列{col_idx}: 找到 {stat['found']} 行，#N/A {stat['missing']} 行，"
+                      f"保留公式 {stat['formula']} 行 (查找表 {stat['index_size']} 个键)")
+            if not lookup_values:
+                print("  没有可以在Python中计算的VLOOKUP(查找表不在模板中或查找值列未映射)，仍写入公式")
+            if lookup_mode == 'value':
+                for col_idx, values in lookup_values.items():
+                    columns[col_idx] = [formula if value is None else value
+                                        for formula, value in zip(columns[col_idx], values)]
+            else:
+                cached_values = lookup_values
+
+        # 步骤7: 一次性写入所有列并保存文件
         print(f"\n正在保存文件到: {output_file_path}")
-        wb.save(output_file_path)
+        if write_engine == 'xml':
+            patch_sheet_columns(excel_file_path, output_file_path,
+                                sheet_name, columns, cached_values=cached_values)
+        elif write_engine == 'stream':
+            patch_sheet_columns(excel_file_path, output_file_path, sheet_name,
+                                columns, chunk_rows=STREAM_CHUNK_ROWS, cached_values=cached_values)
+        else:
+            write_columns_openpyxl(ws, columns)
+            wb.save(output_file_path)
 
         # 输出统计信息
         print(f"\n" + "="*50)
         print(f"列映射处理完成!")
         print(f"映射规则总数: {len(mapping_rules)}")
         print(f"成功映射列数: {successful_mappings}")
+        print(f"跳过列数: {skipped_mappings}")
         print(f"失败映射列数: {len(failed_mappings)}")
 
         if failed_mappings:
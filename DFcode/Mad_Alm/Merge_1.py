@@ -4,7 +4,26 @@ from tqdm import tqdm
 import argparse
 import sys
 from multiprocessing import Pool, cpu_count
+import pickle
 import numpy as np
+from collections import Counter
+from contextlib import nullcontext
+from match_cache import MatchCache, refine_with_subjects
+from assignment import ASSIGNMENT_METHODS, candidate_edges, one_to_one_assignment
+from table_io import table_format, read_table, write_table, resolve_encoding
+from merged_frame import ISSUE_KEY, assemble_merged_frame
+from text_normalize import NORMALIZE_MODES, normalize_text
+import os
+
+
+# ALM表的主键列(Issues表的主键列ISSUE_KEY见merged_frame)，增量模式按主键比较新旧数据
+ALM_KEY = '编号'
+
+# 批量模式下单个分数矩阵允许占用的最大内存(字节)，据此决定每块的ALM行数
+BATCH_MATRIX_BYTES = 256 * 1024 * 1024
+
+# 一对一分配时每行ALM保留的最少候选个数
+ASSIGNMENT_CANDIDATES = 5
 
 
 def find_best_match(query, choices, threshold=75):
@@ -25,98 +44,812 @@ def find_best_match(query, choices, threshold=75):
     return None, 0
 
 
+def prepare_subjects(issue_subjects, mode='exact'):
+    """
+    预处理Issues主题，返回:
+    normalized -- 与issue_subjects等长的规范形式列表，空主题为None
+    unique_forms -- 去重后的非空规范形式(按首次出现顺序)，匹配引擎只对它们打分
+    first_idx -- 每个unique_forms在issue_subjects中首次出现的位置
+    同分时取首次出现顺序最靠前的形式，即位置最小的主题，与全量扫描一致
+    """
+    normalized = []
+    positions = {}
+    for idx, subject in enumerate(issue_subjects):
+        if subject is None or (isinstance(subject, float) and np.isnan(subject)):
+            normalized.append(None)
+            continue
+        form = normalize_text(str(subject), mode)
+        normalized.append(form)
+        if form:
+            positions.setdefault(form, idx)
+    return normalized, list(positions), np.array(list(positions.values()), dtype=np.int64)
+
+
+class SubjectIndex:
+    """
+    Issues主题的字符倒排索引，用于在模糊匹配前召回候选
+
+    对每个主题记录token集合字符串中各字符的出现次数。查询时先用倒排表算出
+    查询与每个主题共有的字符数C，再由 token_set_ratio <= 200*C/(C+min(La, Lb))
+    得到分数上界，只对上界达到阈值的主题按上界从高到低逐个精确打分，
+    当上界低于当前最优分数时提前结束。结果与全量扫描(process.extractOne)一致。
+    """
+
+    # 浮点误差容忍度，保证上界判断不会漏掉分数相同的候选
+    EPS = 1e-6
+
+    def __init__(self, subjects):
+        self.subjects = subjects
+        self.lengths = np.zeros(len(subjects), dtype=np.int64)
+        self.valid = np.zeros(len(subjects), dtype=bool)
+
+        postings = {}
+        for idx, subject in enumerate(subjects):
+            # 与process.extractOne保持一致：None/NaN主题不参与匹配
+            if subject is None or (isinstance(subject, float) and np.isnan(subject)):
+                continue
+            set_str = normalize_text(str(subject))
+            self.lengths[idx] = len(set_str)
+            self.valid[idx] = len(set_str) > 0
+            for ch, cnt in Counter(set_str).items():
+                postings.setdefault(ch, ([], []))
+                postings[ch][0].append(idx)
+                postings[ch][1].append(cnt)
+
+        self.postings = {
+            ch: (np.array(ids, dtype=np.int64), np.array(cnts, dtype=np.int64))
+            for ch, (ids, cnts) in postings.items()
+        }
+
+    def upper_bounds(self, query):
+        """
+        计算query与所有主题的token_set_ratio分数上界
+        """
+        set_str = normalize_text(query)
+        bounds = np.full(len(self.subjects), -1.0)
+        if not set_str:
+            return bounds
+
+        ids_parts, shared_parts = [], []
+        for ch, q_cnt in Counter(set_str).items():
+            posting = self.postings.get(ch)
+            if posting is None:
+                continue
+            ids_parts.append(posting[0])
+            shared_parts.append(np.minimum(posting[1], q_cnt))
+
+        if ids_parts:
+            shared = np.bincount(np.concatenate(ids_parts),
+                                 weights=np.concatenate(shared_parts),
+                                 minlength=len(self.subjects))
+        else:
+            shared = np.zeros(len(self.subjects))
+
+        min_len = np.minimum(self.lengths, len(set_str))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bounds = np.where(self.valid, 200.0 * shared /
+                              (shared + min_len), -1.0)
+        return bounds
+
+    def find_best_match(self, query, threshold=75):
+        """
+        与find_best_match相同的接口，只对召回的候选打分
+        返回匹配索引和匹配分数
+        """
+        if threshold <= 0:
+            # 阈值为0时任意主题都满足条件，退回全量扫描
+            return find_best_match(query, self.subjects, threshold)
+
+        bounds = self.upper_bounds(query)
+        candidates = np.nonzero(bounds >= threshold - self.EPS)[0]
+        # 按上界降序、索引升序排列，保证同分时与全量扫描一样取第一个
+        order = candidates[np.lexsort((candidates, -bounds[candidates]))]
+
+        best_idx, best_score = None, 0
+        for idx in order:
+            if best_idx is not None and bounds[idx] < best_score - self.EPS:
+                break
+            score = fuzz.token_set_ratio(query, self.subjects[idx])
+            if score < threshold:
+                continue
+            if best_idx is None or score > best_score or (score == best_score and idx < best_idx):
+                best_idx, best_score = int(idx), score
+
+        return best_idx, best_score
+
+    def find_top_k(self, query, cutoff, top_k):
+        """
+        返回分数不低于cutoff的前top_k个(索引, 分数)，按分数降序、索引升序排列
+        当剩余候选的上界低于第top_k名的分数时提前结束
+        """
+        if cutoff <= 0:
+            return find_top_k(query, self.subjects, cutoff, top_k)
+
+        bounds = self.upper_bounds(query)
+        candidates = np.nonzero(bounds >= cutoff - self.EPS)[0]
+        order = candidates[np.lexsort((candidates, -bounds[candidates]))]
+
+        found = []
+        for idx in order:
+            if len(found) >= top_k and bounds[idx] < found[top_k - 1][1] - self.EPS:
+                break
+            score = fuzz.token_set_ratio(query, self.subjects[idx])
+            if score >= cutoff:
+                found.append((int(idx), score))
+                found.sort(key=lambda item: (-item[1], item[0]))
+        return found[:top_k]
+
+
+def find_top_k(query, choices, cutoff, top_k):
+    """
+    在choices中找到分数不低于cutoff的前top_k个(索引, 分数)，按分数降序、索引升序排列
+    """
+    results = process.extract(
+        query,
+        choices,
+        scorer=fuzz.token_set_ratio,
+        score_cutoff=cutoff,
+        limit=None
+    )
+    found = sorted(((idx, score) for _, score, idx in results),
+                   key=lambda item: (-item[1], item[0]))
+    return found[:top_k]
+
+
+def top_k_from_scores(scores, top_k):
+    """
+    从分数矩阵中取每行前top_k个非零分数，按分数降序、列号升序排列
+    返回(top_idx, top_score)，不足top_k个时用-1/0补齐
+    """
+    top_idx = np.full((len(scores), top_k), -1, dtype=np.int64)
+    top_score = np.zeros((len(scores), top_k), dtype=scores.dtype)
+    if scores.shape[1] == 0:
+        return top_idx, top_score
+
+    # 先用partition求出每行第k大的分数，只对不低于它的元素排序(保留同分的全部元素)
+    k = min(top_k, scores.shape[1])
+    kth = np.partition(scores, scores.shape[1] - k, axis=1)[:, scores.shape[1] - k]
+    rows, cols = np.nonzero((scores >= kth[:, None]) & (scores > 0))
+    values = scores[rows, cols]
+    order = np.lexsort((cols, -values, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = rank < top_k
+    top_idx[rows[keep], rank[keep]] = cols[keep]
+    top_score[rows[keep], rank[keep]] = values[keep]
+    return top_idx, top_score
+
+
+def batch_match(queries, issue_subjects, threshold=75, workers=-1, dtype=np.float64, top_k=1, margin=0):
+    """
+    使用rapidfuzz.process.cdist一次性计算一批query与全部主题的分数矩阵
+    返回每行最佳匹配索引(未匹配为-1)、匹配分数，以及前top_k个候选(top_k为1时为None)
+
+    参数:
+    queries -- 待匹配文本列表
+    issue_subjects -- Issues主题列表
+    threshold -- 模糊匹配阈值 (默认: 75)
+    workers -- cdist使用的线程数，-1表示全部CPU核心 (默认: -1)
+    dtype -- 分数矩阵的数据类型，np.uint8可将内存降为float64的1/8，但分数取整 (默认: np.float64)
+    top_k -- 每行保留的候选个数，大于1时复用同一个分数矩阵取前top_k (默认: 1)
+    margin -- 候选可以比阈值低多少分，便于发现阈值附近的次优匹配 (默认: 0)
+    """
+    match_idx = np.full(len(queries), -1, dtype=np.int64)
+    match_score = np.zeros(len(queries), dtype=dtype)
+    candidates = None
+    if top_k > 1:
+        candidates = (np.full((len(queries), top_k), -1, dtype=np.int64),
+                      np.zeros((len(queries), top_k), dtype=dtype))
+    if len(queries) == 0 or len(issue_subjects) == 0:
+        return match_idx, match_score, candidates
+
+    scores = process.cdist(
+        queries,
+        issue_subjects,
+        scorer=fuzz.token_set_ratio,
+        score_cutoff=max(threshold - margin, 0) if top_k > 1 else threshold,
+        dtype=dtype,
+        workers=workers
+    )
+
+    # argmax取第一个最大值，与process.extractOne同分时的选择一致
+    best_idx = scores.argmax(axis=1)
+    best_score = scores[np.arange(len(queries)), best_idx]
+    matched = best_score >= threshold
+
+    match_idx[matched] = best_idx[matched]
+    match_score[matched] = best_score[matched]
+    if top_k > 1:
+        candidates = top_k_from_scores(scores, top_k)
+    return match_idx, match_score, candidates
+
+
+def _same_values(left, right):
+    """
+    按元素比较两个DataFrame，两边同为空值视为相等
+    """
+    return (left.values == right.values) | (pd.isna(left).values & pd.isna(right).values)
+
+
+def diff_previous_result(alm_df, issues_df, previous_df, previous_issues_df=None):
+    """
+    以编号为键比较新的ALM导出与上一次的合并结果，确定需要重新匹配的行
+
+    - ALM新增或内容有变化的行 -> 重新匹配
+    - 上次匹配到的Issue已删除或主题有变化的行 -> 重新匹配
+    - 其余行沿用上次的匹配结果，只需与主题变化/新增的Issue比较
+      (提供上一次的Issues导出时才能识别新增Issue，否则只识别上次匹配到的Issue的变化)
+
+    返回字典:
+    rematch_rows -- 需要重新匹配的行号
+    kept_rows / kept_idx / kept_score -- 沿用上次结果的行号、对应当前issues行号和分数
+    crosscheck_idx -- 需要与沿用行比较的主题位置
+    reasons -- 行号到变更类型的映射
+    previous -- 上次结果中每个编号的(Issues主键, 匹配分数)
+    deleted -- 本次ALM导出中已不存在的编号
+    """
+    if alm_df[ALM_KEY].duplicated().any():
+        raise ValueError(f"ALM文件中的{ALM_KEY}不唯一，无法使用增量模式")
+    if previous_df[ALM_KEY].duplicated().any():
+        raise ValueError(f"上次合并结果中的{ALM_KEY}不唯一，无法使用增量模式")
+
+    issue_pos = pd.Series(np.arange(len(issues_df)),
+                          index=issues_df[ISSUE_KEY]).groupby(level=0).first()
+    previous = previous_df.set_index(ALM_KEY)
+    issue_key_col = f"Issues_{ISSUE_KEY}"
+    matched_before = previous['匹配状态'].eq('成功匹配')
+
+    # 新增和内容变化的ALM行
+    alm_columns = [col for col in alm_df.columns if col != ALM_KEY]
+    in_previous = alm_df[ALM_KEY].isin(previous.index).values
+    changed = ~in_previous
+    if all(col in previous.columns for col in alm_columns):
+        old_rows = previous.reindex(alm_df[ALM_KEY])[alm_columns]
+        same = _same_values(old_rows, alm_df[alm_columns]).all(axis=1)
+        changed |= in_previous & ~same
+    else:
+        changed[:] = True
+
+    # 上次匹配到的Issue：已删除或主题有变化的需要重新匹配
+    old_issue_keys = previous.loc[matched_before, issue_key_col]
+    old_subjects = previous.loc[matched_before, 'Issues_主题']
+    current_pos = old_issue_keys.map(issue_pos)
+    current_subjects = pd.Series(
+        issues_df['主题'].values[current_pos.fillna(0).astype(np.int64)], index=current_pos.index)
+    issue_gone = current_pos.isna()
+    subject_changed = ~issue_gone & ~_same_values(
+        old_subjects.to_frame(), current_subjects.to_frame())[:, 0]
+    stale_keys = set(old_issue_keys.index[issue_gone | subject_changed])
+
+    # 需要与沿用行比较的主题：主题变化的Issue，以及(若提供)上次Issues导出中没有的Issue
+    crosscheck = set(current_pos[subject_changed].astype(np.int64).tolist())
+    if previous_issues_df is not None:
+        old_subject_by_key = previous_issues_df.drop_duplicates(
+            ISSUE_KEY).set_index(ISSUE_KEY)['主题']
+        old_subject = issues_df[ISSUE_KEY].map(old_subject_by_key)
+        is_new = ~issues_df[ISSUE_KEY].isin(old_subject_by_key.index)
+        is_edited = ~is_new & ~_same_values(
+            old_subject.to_frame(), issues_df[['主题']])[:, 0]
+        crosscheck |= set(np.nonzero((is_new | is_edited).values)[0].tolist())
+
+    reasons = {}
+    for row, (key, is_changed, existed) in enumerate(zip(alm_df[ALM_KEY], changed, in_previous)):
+        if not existed:
+            reasons[row] = '新增'
+        elif is_changed:
+            reasons[row] = '修改'
+        elif key in stale_keys:
+            reasons[row] = '关联Issue变更'
+
+    rematch_rows = np.array(sorted(reasons), dtype=np.int64)
+    kept_rows = np.setdiff1d(np.arange(len(alm_df)), rematch_rows)
+    kept_keys = alm_df[ALM_KEY].values[kept_rows]
+    kept_matched = matched_before.reindex(kept_keys).fillna(False).values
+    kept_idx = np.where(
+        kept_matched,
+        previous[issue_key_col].reindex(kept_keys).map(
+            issue_pos).fillna(-1).values,
+        -1).astype(np.int64)
+    kept_score = np.where(
+        kept_idx >= 0, previous['匹配分数'].reindex(kept_keys).values, 0)
+
+    return {
+        'rematch_rows': rematch_rows,
+        'kept_rows': kept_rows,
+        'kept_idx': kept_idx,
+        'kept_score': kept_score,
+        'crosscheck_idx': np.array(sorted(crosscheck), dtype=np.int64),
+        'reasons': reasons,
+        'previous': previous.loc[:, [issue_key_col, '匹配分数']].where(
+            matched_before, axis=0),
+        'deleted': [key for key in previous.index if key not in set(alm_df[ALM_KEY])],
+    }
+
+
+def build_changelog(alm_df, issues_df, delta, match_idx, match_score):
+    """
+    生成增量模式的变更记录：重新匹配的行、匹配结果发生变化的行以及已删除的行
+    """
+    previous = delta['previous']
+    new_keys = np.where(match_idx >= 0,
+                        issues_df[ISSUE_KEY].values[np.maximum(match_idx, 0)], None)
+    old = previous.reindex(alm_df[ALM_KEY])
+    old_keys = old[f"Issues_{ISSUE_KEY}"].values
+    old_scores = old['匹配分数'].values
+
+    records = []
+    for row, key in enumerate(alm_df[ALM_KEY]):
+        reason = delta['reasons'].get(row)
+        new_key = new_keys[row]
+        old_key = None if pd.isna(old_keys[row]) else old_keys[row]
+        if reason is None:
+            if (old_key is None) == (new_key is None) and (old_key is None or old_key == new_key):
+                continue
+            reason = '匹配变化'
+        records.append({
+            ALM_KEY: key,
+            '变更类型': reason,
+            f"原Issues_{ISSUE_KEY}": old_key,
+            f"新Issues_{ISSUE_KEY}": new_key,
+            '原匹配分数': None if pd.isna(old_scores[row]) else old_scores[row],
+            '新匹配分数': match_score[row] if new_key is not None else None,
+        })
+    for key in delta['deleted']:
+        old_key = previous.at[key, f"Issues_{ISSUE_KEY}"]
+        records.append({
+            ALM_KEY: key,
+            '变更类型': '删除',
+            f"原Issues_{ISSUE_KEY}": None if pd.isna(old_key) else old_key,
+            f"新Issues_{ISSUE_KEY}": None,
+            '原匹配分数': previous.at[key, '匹配分数'],
+            '新匹配分数': None,
+        })
+
+    return pd.DataFrame(records, columns=[ALM_KEY, '变更类型', f"原Issues_{ISSUE_KEY}",
+                                          f"新Issues_{ISSUE_KEY}", '原匹配分数', '新匹配分数'])
+
+
+# 工作进程内常驻的数据，由init_worker在进程启动时设置一次
+_worker_state = {}
+
+
+def init_worker(queries, issue_subjects, subject_index, threshold, top_k=1, margin=0):
+    """
+    进程池初始化函数：每个工作进程只接收一次待匹配文本、主题列表和主题索引，
+    之后的任务只需传递行号范围
+    queries为None时是跨多批query复用的进程池(见create_match_pool)，每个任务自带该块的query
+    """
+    _worker_state['queries'] = queries
+    _worker_state['issue_subjects'] = issue_subjects
+    _worker_state['subject_index'] = subject_index
+    _worker_state['threshold'] = threshold
+    _worker_state['top_k'] = top_k
+    _worker_state['margin'] = margin
+
+
 def process_chunk(args):
     """
     处理数据块的函数，用于多进程
+    args为ALM行号范围(start, stop)，数据从_worker_state中读取；
+    复用的进程池传递(start, stop, 该块的query列表)
+    返回起始行号、该块的匹配索引(未匹配为-1)和匹配分数数组，以及前top_k个候选(top_k为1时为None)
     """
-    alm_chunk, issue_subjects, threshold, issues_df = args
-    results = []
+    start, stop = args[:2]
+    queries = args[2] if len(args) > 2 else _worker_state['queries'][start:stop]
+    issue_subjects = _worker_state['issue_subjects']
+    subject_index = _worker_state['subject_index']
+    threshold = _worker_state['threshold']
+    top_k = _worker_state['top_k']
+    cutoff = max(threshold - _worker_state['margin'], 0)
 
-    for _, alm_row in alm_chunk.iterrows():
-        nonconformity = str(alm_row['不符合现象'])
-        match_idx, match_score = find_best_match(
-            nonconformity, issue_subjects, threshold)
+    match_idx = np.full(stop - start, -1, dtype=np.int64)
+    match_score = np.zeros(stop - start, dtype=np.float64)
+    candidates = None
+    if top_k > 1:
+        candidates = (np.full((stop - start, top_k), -1, dtype=np.int64),
+                      np.zeros((stop - start, top_k), dtype=np.float64))
 
-        row_data = alm_row.to_dict()
-        row_data['匹配分数'] = match_score
+    for i, nonconformity in enumerate(queries):
+        if top_k > 1:
+            if subject_index is not None:
+                found = subject_index.find_top_k(nonconformity, cutoff, top_k)
+            else:
+                found = find_top_k(nonconformity, issue_subjects, cutoff, top_k)
+            for rank, (idx, score) in enumerate(found):
+                candidates[0][i, rank], candidates[1][i, rank] = idx, score
+            if found and found[0][1] >= threshold:
+                match_idx[i], match_score[i] = found[0]
+            continue
 
-        if match_idx is not None:
-            matched_issue = issues_df.iloc[match_idx]
-            for col in issues_df.columns:
-                row_data[f"Issues_{col}"] = matched_issue[col]
-            row_data['主题匹配结果'] = matched_issue['主题']
-            row_data['匹配状态'] = '成功匹配'
+        if subject_index is not None:
+            idx, score = subject_index.find_best_match(
+                nonconformity, threshold)
         else:
-            for col in issues_df.columns:
-                row_data[f"Issues_{col}"] = ""
-            row_data['主题匹配结果'] = ""
-            row_data['匹配状态'] = '未找到匹配'
+            idx, score = find_best_match(
+                nonconformity, issue_subjects, threshold)
+        if idx is not None:
+            match_idx[i], match_score[i] = idx, score
+
+    return start, match_idx, match_score, candidates
+
+
+def create_match_pool(issue_subjects, threshold, n_workers, subject_index=None, top_k=1, margin=0):
+    """
+    创建可在多批query之间复用的pool引擎进程池，主题列表和主题索引每个工作进程只传一次
+    流式模式下每块ALM都用同一个进程池，不必每块重新启动进程、重新传递整个主题库
+
+    参数:
+    issue_subjects -- Issues主题列表
+    threshold -- 模糊匹配阈值
+    n_workers -- 进程数
+    subject_index -- 主题索引，为None时全量扫描 (默认: None)
+    top_k -- 每行保留的候选个数 (默认: 1)
+    margin -- 候选可以比阈值低多少分 (默认: 0)
+    """
+    return Pool(processes=n_workers, initializer=init_worker,
+                initargs=(None, issue_subjects, subject_index, threshold, top_k, margin))
+
+
+def match_queries(queries, issue_subjects, threshold, n_workers, engine='batch', score_dtype='float64', subject_index=None, pbar=None, subject_positions=None, top_k=1, margin=0, pool=None):
+    """
+    用指定的匹配引擎为一批query寻找最佳匹配，相同的query只打分一次
+    返回匹配索引(未匹配为-1)、匹配分数、pool引擎的传输统计(batch引擎为None)，
+    以及前top_k个候选(top_idx, top_score)(top_k为1时为None)
+
+    参数:
+    queries -- 待匹配文本列表
+    issue_subjects -- Issues主题列表(通常是prepare_subjects返回的去重规范形式)
+    threshold -- 模糊匹配阈值
+    n_workers -- pool引擎的进程数 / batch引擎的cdist线程数
+    engine -- 'batch' 或 'pool' (默认: 'batch')
+    score_dtype -- batch引擎分数矩阵的数据类型 (默认: 'float64')
+    subject_index -- pool引擎使用的主题索引，为None时全量扫描 (默认: None)
+    pbar -- 用于更新进度的tqdm进度条(按行计数) (默认: None)
+    subject_positions -- issue_subjects各项在原Issues表中的位置，用于换算匹配索引 (默认: None)
+    top_k -- 每行保留的候选个数 (默认: 1)
+    margin -- 候选可以比阈值低多少分 (默认: 0)
+    pool -- create_match_pool创建的进程池，必须用相同的主题、阈值、top_k和margin创建；
+            为None时pool引擎为这批query临时创建进程池 (默认: None)
+    """
+    queries, inverse = np.unique(
+        np.array(queries, dtype=object), return_inverse=True)
+    queries = queries.tolist()
+    # 去重后第i个query之前对应的原始行数，用于按原始行数更新进度条
+    row_offsets = np.concatenate(
+        [[0], np.cumsum(np.bincount(inverse, minlength=len(queries)))])
 
-        results.append(row_data)
+    dtype = np.dtype(score_dtype if engine == 'batch' else 'float64')
+    match_idx = np.full(len(queries), -1, dtype=np.int64)
+    match_score = np.zeros(len(queries), dtype=dtype)
+    pool_stats = None
+    candidates = None
+    if top_k > 1:
+        candidates = (np.full((len(queries), top_k), -1, dtype=np.int64),
+                      np.zeros((len(queries), top_k), dtype=dtype))
 
-    return results
+    if engine == 'batch':
+        # 按分数矩阵的内存上限切块，每块一次cdist打分
+        chunk_size = max(1, BATCH_MATRIX_BYTES //
+                         (max(len(issue_subjects), 1) * dtype.itemsize))
+        for start in range(0, len(queries), chunk_size):
+            stop = min(start + chunk_size, len(queries))
+            chunk_idx, chunk_score, chunk_candidates = batch_match(
+                queries[start:stop], issue_subjects, threshold, n_workers, dtype, top_k, margin)
+            match_idx[start:stop], match_score[start:stop] = chunk_idx, chunk_score
+            if candidates is not None:
+                candidates[0][start:stop], candidates[1][start:stop] = chunk_candidates
+            if pbar is not None:
+                pbar.update(int(row_offsets[stop] - row_offsets[start]))
+    else:
+        # 将ALM数据分成多个块，每块只传递行号范围
+        chunk_size = max(100, len(queries) // (n_workers * 4))  # 每个块至少100行
+        chunks = [(i, min(i + chunk_size, len(queries)))
+                  for i in range(0, len(queries), chunk_size)]
+
+        # 共享数据每个工作进程只传一次，统计每块的传输字节数
+        worker_args = (queries, issue_subjects, subject_index,
+                       threshold, top_k, margin)
+        if pool is not None:
+            # 复用的进程池只持有主题数据，query随块传递
+            chunks = [(start, stop, queries[start:stop]) for start, stop in chunks]
+            worker_args = (None,) + worker_args[1:]
+        pool_stats = {
+            'chunk_size': chunk_size,
+            'chunk_bytes': len(pickle.dumps(chunks[0])) if chunks else 0,
+            'shared_bytes': len(pickle.dumps(worker_args)),
+        }
+
+        # 使用多进程处理
+        with (nullcontext(pool) if pool is not None else
+              Pool(processes=n_workers, initializer=init_worker, initargs=worker_args)) as pool:
+            for start, chunk_idx, chunk_score, chunk_candidates in pool.imap(process_chunk, chunks):
+                stop = start + len(chunk_idx)
+                match_idx[start:stop] = chunk_idx
+                match_score[start:stop] = chunk_score
+                if candidates is not None:
+                    candidates[0][start:stop], candidates[1][start:stop] = chunk_candidates
+                if pbar is not None:
+                    pbar.update(int(row_offsets[stop] - row_offsets[start]))
+
+    # 换算回原Issues表的位置，并展开到去重前的每一行
+    if subject_positions is not None:
+        match_idx = np.where(
+            match_idx >= 0, subject_positions[np.maximum(match_idx, 0)], -1)
+    if candidates is not None:
+        top_idx, top_score = candidates
+        if subject_positions is not None:
+            top_idx = np.where(
+                top_idx >= 0, subject_positions[np.maximum(top_idx, 0)], -1)
+        candidates = (top_idx[inverse], top_score[inverse])
+    return match_idx[inverse], match_score[inverse], pool_stats, candidates
+
+
+def lookup_cache(cache, queries, rows, threshold, score_dtype, normalize, match_idx, match_score):
+    """
+    查询缓存并把命中的结果写入match_idx/match_score，返回仍需匹配的行号
+    """
+    hit, cached_idx, cached_score = cache.lookup(
+        [queries[i] for i in rows], threshold, score_dtype, normalize)
+    match_idx[rows[hit]] = cached_idx[hit]
+    match_score[rows[hit]] = cached_score[hit]
+    return rows[~hit]
 
 
-def merge_alm_issues(alm_path, issues_path, output_path, alm_encoding='ANSI', issues_encoding='ANSI', threshold=75, n_workers=None):
+def merge_alm_issues(alm_path, issues_path, output_path, alm_encoding='auto', issues_encoding='auto', threshold=75, n_workers=None, exhaustive=False, engine='batch', score_dtype='float64', cache_path=None, cache_max_entries=200000, previous_result_path=None, previous_issues_path=None, changelog_path=None, stream_chunksize=None, normalize='exact', top_k=1, ambiguity_margin=5, one_to_one=None, assignment_max_cells=4000000):
     """
     合并ALM和Issues表格基于模糊匹配（优化版）
     参数:
     alm_path -- ALM文件路径
     issues_path -- Issues文件路径
-    output_path -- 输出文件路径
-    alm_encoding -- ALM文件编码 (默认: 'ANSI')
-    issues_encoding -- Issues文件编码 (默认: 'ANSI')
+    output_path -- 输出文件路径，扩展名为.parquet/.feather时写出列式格式，其余写CSV；
+                   为None时不写出合并结果，只返回DataFrame(流式模式必须指定)
+    alm_encoding -- ALM文件编码，'auto'时按文件内容识别(BOM/UTF-8/GB18030(兼容GBK))，
+                    当前平台不支持的编码名(如Linux上的'ANSI')同样自动识别 (默认: 'auto')
+    issues_encoding -- Issues文件编码，规则同alm_encoding (默认: 'auto')
     threshold -- 模糊匹配阈值 (默认: 75)
-    n_workers -- 并行工作进程数 (默认: CPU核心数)
+    n_workers -- 并行工作进程数，batch引擎下为cdist线程数 (默认: CPU核心数)
+    exhaustive -- pool引擎下是否关闭候选索引，对全部主题逐一打分，用于校验 (默认: False)
+    engine -- 匹配引擎: 'batch'(cdist分数矩阵) 或 'pool'(多进程逐行匹配) (默认: 'batch')
+    score_dtype -- batch引擎分数矩阵的数据类型: 'float64'/'float32'/'uint8' (默认: 'float64')
+    cache_path -- 匹配结果缓存(SQLite)路径，为None时不使用缓存 (默认: None)
+    cache_max_entries -- 缓存最多保留的条目数，超出时淘汰最久未使用的条目 (默认: 200000)
+    previous_result_path -- 上一次的合并结果，指定后只重新匹配新增/变化的行 (默认: None)
+    previous_issues_path -- 上一次的Issues导出，用于识别新增Issue (默认: None)
+    changelog_path -- 增量模式的变更记录输出路径 (默认: 输出文件名加"_变更记录")
+    stream_chunksize -- 流式模式每次读取的ALM行数，指定后逐块匹配并追加写出，
+                        ALM各列按文本读取，函数返回None (默认: None，一次读入全部)
+    normalize -- 文本预处理模式: 'exact'(结果与原文比较一致) 或 'cjk'(全角半角/标点/按字切分) (默认: 'exact')
+    top_k -- 每行输出的候选个数，大于1时增加"候选匹配"和"匹配歧义"列 (默认: 1)
+    ambiguity_margin -- 第一、二名分差小于该值时标记为歧义，候选最多比阈值低这么多分 (默认: 5)
+    one_to_one -- 一对一分配方法: 'auto'/'hungarian'/'greedy'，为None时允许多个ALM匹配同一Issue (默认: None)
+    assignment_max_cells -- 精确分配时单个连通分量的最大矩阵元素个数，超过时用贪心近似 (默认: 4000000)
     """
-    # 读取两个CSV文件
-    alm_df = pd.read_csv(alm_path, encoding=alm_encoding)
+    if engine not in ('batch', 'pool'):
+        raise ValueError(f"不支持的匹配引擎: {engine}")
+    if normalize not in NORMALIZE_MODES:
+        raise ValueError(f"不支持的预处理模式: {normalize}")
+    if stream_chunksize and output_path is None:
+        raise ValueError("流式模式必须指定输出文件路径")
+    if stream_chunksize and table_format(output_path) != 'csv':
+        raise ValueError("流式模式只支持输出CSV")
+    if stream_chunksize and previous_result_path:
+        raise ValueError("流式模式不支持增量合并(--since-previous)")
+    if top_k < 1:
+        raise ValueError(f"候选个数必须大于0: {top_k}")
+    if top_k > 1 and (cache_path or previous_result_path):
+        # 缓存和增量模式只保存最佳匹配，无法还原候选列表
+        raise ValueError("输出多个候选(--top-k)时不支持匹配缓存和增量模式")
+    if one_to_one is not None:
+        if one_to_one not in ASSIGNMENT_METHODS:
+            raise ValueError(f"不支持的分配方法: {one_to_one}")
+        if cache_path or previous_result_path or stream_chunksize:
+            # 全局分配需要全部行的候选
+            raise ValueError("一对一分配不支持匹配缓存、增量模式和流式模式")
+
+    # 先确定编码(识别结果按文件缓存)，再用C解析器一次读入，不因猜错编码而重读
+    requested_issues_encoding = issues_encoding
+    alm_encoding = resolve_encoding(alm_path, alm_encoding)
+    issues_encoding = resolve_encoding(issues_path, issues_encoding)
+    print(f"文件编码: ALM {alm_encoding}，Issues {issues_encoding}")
+
+    # 读取Issues文件，ALM文件在非流式模式下一次读入
     issues_df = pd.read_csv(issues_path, encoding=issues_encoding)
 
-    # 为issues表创建主题列表用于匹配
+    # 为issues表创建主题列表，并一次性预处理成规范形式用于匹配
     issue_subjects = issues_df['主题'].tolist()
+    normalized_subjects, subject_forms, subject_positions = prepare_subjects(
+        issue_subjects, normalize)
 
     # 设置工作进程数
     if n_workers is None:
         n_workers = min(cpu_count(), 8)  # 最多使用8个进程
 
-    # 将ALM数据分成多个块
-    chunk_size = max(100, len(alm_df) // (n_workers * 4))  # 每个块至少100行
-    chunks = [alm_df[i:i+chunk_size]
-              for i in range(0, len(alm_df), chunk_size)]
+    # 建立主题倒排索引，pool引擎只对候选主题做模糊打分
+    subject_index = None
+    if engine == 'pool' and not exhaustive:
+        subject_index = SubjectIndex(subject_forms)
+
+    effective_dtype = score_dtype if engine == 'batch' else 'float64'
+    cache = None
+    if cache_path:
+        cache = MatchCache(cache_path, cache_max_entries)
+        cache.sync_corpus(normalized_subjects)
+
+    # 一对一分配需要每行的多个候选，候选个数至少为ASSIGNMENT_CANDIDATES
+    candidate_k = max(top_k, ASSIGNMENT_CANDIDATES) if one_to_one else top_k
+
+    delta = None
+    pool_stats = None
+    assignment_stats = None
+    if stream_chunksize:
+        # 流式模式：逐块读取ALM，匹配后直接追加到输出文件，内存只与块大小有关
+        total_rows, matched_rows = 0, 0
+        reader = pd.read_csv(alm_path, encoding=alm_encoding,
+                             dtype=str, chunksize=stream_chunksize)
+        # pool引擎的进程池只建一次，各块共用，主题库不随每块重新传递
+        match_pool = create_match_pool(subject_forms, threshold, n_workers, subject_index,
+                                       top_k, ambiguity_margin) if engine == 'pool' else nullcontext()
+        with open(output_path, 'w', encoding='utf_8_sig', newline='') as out_file, \
+                tqdm(desc="处理进度", unit="行") as pbar, match_pool as shared_pool:
+            for alm_chunk in reader:
+                queries = [normalize_text(q, normalize)
+                           for q in alm_chunk['不符合现象'].astype(str)]
+                match_idx = np.full(len(queries), -1, dtype=np.int64)
+                match_score = np.zeros(len(queries), dtype=effective_dtype)
+                todo_rows = np.arange(len(queries))
+                if cache is not None:
+                    todo_rows = lookup_cache(cache, queries, todo_rows, threshold,
+                                             effective_dtype, normalize, match_idx, match_score)
+                    pbar.update(len(queries) - len(todo_rows))
+
+                todo_idx, todo_score, chunk_stats, candidates = match_queries(
+                    [queries[i] for i in todo_rows], subject_forms, threshold, n_workers,
+                    engine, score_dtype, subject_index, pbar, subject_positions,
+                    top_k, ambiguity_margin, shared_pool)
+                match_idx[todo_rows] = todo_idx
+                match_score[todo_rows] = todo_score
+                pool_stats = pool_stats or chunk_stats
+                if cache is not None:
+                    cache.store(match_idx, match_score)
+
+                merged_chunk = assemble_merged_frame(
+                    alm_chunk, issues_df, match_idx, match_score, candidates, ambiguity_margin)
+                merged_chunk.to_csv(out_file, index=False,
+                                    header=total_rows == 0)
+                total_rows += len(merged_chunk)
+                matched_rows += int((match_idx >= 0).sum())
+        alm_sample = alm_chunk if total_rows else None
+        merged_df = None
+    else:
+        alm_df = pd.read_csv(alm_path, encoding=alm_encoding)
+        alm_sample = alm_df
+
+        # 匹配阶段只产出两个数组：issues行号(未匹配为-1)和匹配分数
+        queries = [normalize_text(q, normalize)
+                   for q in alm_df['不符合现象'].astype(str)]
+        match_idx = np.full(len(alm_df), -1, dtype=np.int64)
+        match_score = np.zeros(len(alm_df), dtype=effective_dtype)
+
+        # 增量模式：与上一次的合并结果比较，沿用未变化行的匹配结果
+        todo_rows = np.arange(len(alm_df))
+        if previous_result_path:
+            # round_trip保证沿用的匹配分数与上次写出的值完全一致(Parquet/Feather本身保存原值)
+            previous_df = read_table(
+                previous_result_path, encoding='utf_8_sig', float_precision='round_trip')
+            previous_issues_df = None
+            if previous_issues_path:
+                previous_issues_df = pd.read_csv(
+                    previous_issues_path, encoding=resolve_encoding(previous_issues_path, requested_issues_encoding))
+            delta = diff_previous_result(
+                alm_df, issues_df, previous_df, previous_issues_df)
+            match_idx[delta['kept_rows']] = delta['kept_idx']
+            match_score[delta['kept_rows']] = delta['kept_score']
+            todo_rows = delta['rematch_rows']
+
+        # 再查持久化缓存，只对未命中的行重新匹配
+        cache_rows = todo_rows
+        if cache is not None:
+            todo_rows = lookup_cache(cache, queries, cache_rows, threshold,
+                                     effective_dtype, normalize, match_idx, match_score)
+
+        with tqdm(total=len(todo_rows), desc="处理进度", unit="行") as pbar:
+            todo_idx, todo_score, pool_stats, candidates = match_queries(
+                [queries[i] for i in todo_rows], subject_forms, threshold, n_workers,
+                engine, score_dtype, subject_index, pbar, subject_positions,
+                candidate_k, ambiguity_margin)
+        match_idx[todo_rows] = todo_idx
+        match_score[todo_rows] = todo_score
+
+        if one_to_one:
+            # 在候选组成的稀疏分数矩阵上做全局一对一分配
+            edges = candidate_edges(*candidates, threshold, normalized_subjects)
+            assigned_idx, assigned_score, assignment_stats = one_to_one_assignment(
+                *edges, len(alm_df), one_to_one, assignment_max_cells)
+            assignment_stats['changed'] = int((assigned_idx != match_idx).sum())
+            assignment_stats['shared_before'] = int(
+                (np.bincount(match_idx[match_idx >= 0]) > 1).sum())
+            match_idx = assigned_idx
+            match_score = assigned_score.astype(match_score.dtype)
+            if top_k > 1:
+                candidates = (candidates[0][:, :top_k], candidates[1][:, :top_k])
+            else:
+                candidates = None
+
+        if delta is not None:
+            # 沿用上次结果的行只需与主题新增/变化的Issue比较
+            kept_rows = delta['kept_rows']
+            match_idx[kept_rows], match_score[kept_rows] = refine_with_subjects(
+                [queries[i] for i in kept_rows],
+                match_idx[kept_rows],
+                match_score[kept_rows],
+                normalized_subjects,
+                delta['crosscheck_idx'],
+                threshold,
+                effective_dtype
+            )
+
+        if cache is not None:
+            cache.store(match_idx[cache_rows], match_score[cache_rows])
 
-    # 准备多进程参数
-    pool_args = [(chunk, issue_subjects, threshold, issues_df)
-                 for chunk in chunks]
+        # 按列组装合并后的DataFrame
+        merged_df = assemble_merged_frame(
+            alm_df, issues_df, match_idx, match_score, candidates, ambiguity_margin)
 
-    # 使用多进程处理
-    merged_data = []
-    with Pool(processes=n_workers) as pool:
-        # 使用tqdm显示进度
-        with tqdm(total=len(chunks), desc="处理进度") as pbar:
-            for result in pool.imap(process_chunk, pool_args):
-                merged_data.extend(result)
-                pbar.update(1)
+        # 保存合并结果；与填表流程串联时合并结果直接在内存中传递，文件只用于留档
+        if output_path is not None:
+            write_table(merged_df, output_path)
 
-    # 创建合并后的DataFrame
-    merged_df = pd.DataFrame(merged_data)
+        if delta is not None:
+            changelog_df = build_changelog(
+                alm_df, issues_df, delta, match_idx, match_score)
+            if changelog_path is None and output_path is not None:
+                root, ext = os.path.splitext(output_path)
+                changelog_path = f"{root}_变更记录{ext or '.csv'}"
+            if changelog_path is not None:
+                write_table(changelog_df, changelog_path)
 
-    # 调整列顺序以便阅读
-    core_columns = ['编号', '匹配状态', '匹配分数', '不符合现象', '主题匹配结果']
-    other_columns = [
-        col for col in merged_df.columns if col not in core_columns]
-    merged_df = merged_df[core_columns + other_columns]
+        total_rows = len(merged_df)
+        matched_rows = merged_df['匹配状态'].eq('成功匹配').sum()
 
-    # 保存合并结果
-    merged_df.to_csv(output_path, index=False, encoding='utf_8_sig')
+    if cache is not None:
+        cache.close()
 
     # 打印统计信息
-    total_rows = len(merged_df)
-    matched_rows = merged_df['匹配状态'].eq('成功匹配').sum()
-    print(f"合并完成! 结果已保存至: {output_path}")
+    if output_path is not None:
+        print(f"合并完成! 结果已保存至: {output_path}")
+    else:
+        print("合并完成! (未写出合并结果文件)")
     print(f"总行数: {total_rows}")
-    print(f"成功匹配行数: {matched_rows} ({matched_rows/total_rows:.1%})")
-    print(f"使用进程数: {n_workers}")
+    print(f"成功匹配行数: {matched_rows} ({matched_rows/max(total_rows, 1):.1%})")
+    if stream_chunksize:
+        print(f"流式模式: 每块 {stream_chunksize} 行")
+    print(f"文本预处理: {normalize}，去重后主题数: {len(subject_forms)}")
+    if top_k > 1 and merged_df is not None:
+        ambiguous_rows = merged_df['匹配歧义'].eq('是').sum()
+        print(f"候选个数: {top_k}，歧义匹配行数: {ambiguous_rows} (分差 < {ambiguity_margin})")
+    if engine == 'batch':
+        print(f"匹配模式: 批量分数矩阵(cdist, {score_dtype}, {n_workers}线程)")
+    else:
+        print(f"使用进程数: {n_workers}")
+        print(f"匹配模式: {'全量扫描' if exhaustive else '候选索引'}")
+        if pool_stats is not None and alm_sample is not None:
+            legacy_chunk_bytes = len(pickle.dumps(
+                (alm_sample[:pool_stats['chunk_size']], issue_subjects, threshold, issues_df, subject_index)))
+            chunk_note = '行号和该块query' if stream_chunksize else '仅行号'
+            print(f"每块传输字节数: {legacy_chunk_bytes:,} (整表随块传递) -> {pool_stats['chunk_bytes']:,} ({chunk_note})")
+            print(f"共享数据字节数: {pool_stats['shared_bytes']:,} (每个工作进程一次)")
+    if assignment_stats is not None:
+        print(f"一对一分配: {assignment_stats['method']}，候选边 {assignment_stats['edges']} 条，"
+              f"连通分量 {assignment_stats['components']} 个(其中贪心 {assignment_stats['greedy_components']} 个)")
+        print(f"被多行共用的Issue: {assignment_stats['shared_before']} 个，分配后匹配变化的行: {assignment_stats['changed']}")
+    if delta is not None:
+        print(f"增量模式: 重新匹配 {len(delta['rematch_rows'])} 行，沿用 {len(delta['kept_rows'])} 行，"
+              f"删除 {len(delta['deleted'])} 行，需复核的Issue {len(delta['crosscheck_idx'])} 个")
+        print(f"变更记录: {changelog_path or '未写出'} ({len(changelog_df)} 条)")
+    if cache is not None:
+        stats = cache.stats
+        print(f"缓存命中: {stats['hits']} (其中增量校验 {stats['revalidated']})，"
+              f"未命中: {stats['misses']}，淘汰: {stats['evicted']}")
 
     return merged_df
 
@@ -128,15 +861,44 @@ def main():
     # 添加命令行参数
     parser.add_argument('-a', '--alm', required=True, help='ALM文件路径')
     parser.add_argument('-i', '--issues', required=True, help='Issues文件路径')
-    parser.add_argument('-o', '--output', required=True, help='输出文件路径')
-    parser.add_argument('--alm-encoding', default='ANSI',
-                        help='ALM文件编码 (默认: ANSI)')
-    parser.add_argument('--issues-encoding', default='ANSI',
-                        help='Issues文件编码 (默认: ANSI)')
+    parser.add_argument('-o', '--output', required=True,
+                        help='输出文件路径，扩展名为.parquet/.feather时写出列式格式，其余为CSV')
+    parser.add_argument('--alm-encoding', default='auto',
+                        help='ALM文件编码，auto按内容识别BOM/UTF-8/GB18030(兼容GBK) (默认: auto)')
+    parser.add_argument('--issues-encoding', default='auto',
+                        help='Issues文件编码，auto按内容识别 (默认: auto)')
     parser.add_argument('-t', '--threshold', type=int,
                         default=75, help='模糊匹配阈值 (默认: 75)')
     parser.add_argument('-n', '--n-workers', type=int, default=None,
                         help='并行工作进程数 (默认: CPU核心数，最多8个)')
+    parser.add_argument('--engine', choices=['batch', 'pool'], default='batch',
+                        help='匹配引擎: batch为cdist分数矩阵, pool为多进程逐行匹配 (默认: batch)')
+    parser.add_argument('--score-dtype', choices=['float64', 'float32', 'uint8'], default='float64',
+                        help='batch引擎分数矩阵类型，uint8最省内存但分数取整 (默认: float64)')
+    parser.add_argument('--exhaustive', action='store_true',
+                        help='pool引擎下关闭候选索引，对全部主题逐一打分(用于校验结果)')
+    parser.add_argument('--normalize', choices=list(NORMALIZE_MODES), default='exact',
+                        help='文本预处理: exact结果与原文比较一致, cjk另做全角半角转换/去标点/按字切分 (默认: exact)')
+    parser.add_argument('--top-k', type=int, default=1,
+                        help='每行输出的候选个数，大于1时增加"候选匹配"和"匹配歧义"列 (默认: 1)')
+    parser.add_argument('--ambiguity-margin', type=float, default=5,
+                        help='第一、二名分差小于该值时标记为歧义 (默认: 5)')
+    parser.add_argument('--one-to-one', nargs='?', const='auto', choices=list(ASSIGNMENT_METHODS), default=None,
+                        help='一对一分配，每个Issue最多匹配一行ALM: auto/hungarian/greedy (默认: 不启用，只写--one-to-one时为auto)')
+    parser.add_argument('--assignment-max-cells', type=int, default=4000000,
+                        help='精确分配时单个连通分量的最大矩阵元素个数，超过时用贪心近似 (默认: 4000000)')
+    parser.add_argument('--cache', default=None,
+                        help='匹配结果缓存文件路径(SQLite)，不指定则不使用缓存')
+    parser.add_argument('--cache-max-entries', type=int, default=200000,
+                        help='缓存最多保留的条目数 (默认: 200000)')
+    parser.add_argument('--stream-chunksize', type=int, default=None,
+                        help='流式模式每次读取的ALM行数，逐块匹配并追加写出(不支持--since-previous)')
+    parser.add_argument('--since-previous', default=None,
+                        help='上一次的合并结果(CSV/Parquet/Feather)，指定后只重新匹配新增/变化的ALM行')
+    parser.add_argument('--previous-issues', default=None,
+                        help='上一次的Issues导出(编码同--issues-encoding)，用于识别新增Issue')
+    parser.add_argument('--changelog', default=None,
+                        help='增量模式的变更记录输出路径 (默认: 输出文件名加"_变更记录")')
 
     # 解析命令行参数
     args = parser.parse_args()
@@ -151,6 +913,21 @@ def main():
     print(f"Issues编码: {args.issues_encoding}")
     print(f"匹配阈值: {args.threshold}")
     print(f"工作进程数: {args.n_workers if args.n_workers else '自动(CPU核心数)'}")
+    print(f"匹配引擎: {args.engine}")
+    if args.engine == 'batch':
+        print(f"分数类型: {args.score_dtype}")
+    else:
+        print(f"匹配模式: {'全量扫描' if args.exhaustive else '候选索引'}")
+    print(f"文本预处理: {args.normalize}")
+    if args.top_k > 1:
+        print(f"候选个数: {args.top_k} (歧义分差 {args.ambiguity_margin})")
+    if args.one_to_one:
+        print(f"一对一分配: {args.one_to_one}")
+    print(f"匹配缓存: {args.cache if args.cache else '不使用'}")
+    if args.stream_chunksize:
+        print(f"流式模式: 每块 {args.stream_chunksize} 行")
+    if args.since_previous:
+        print(f"增量模式: 基于 {args.since_previous}")
     print("=" * 50)
 
     # 执行合并操作
@@ -162,7 +939,21 @@ def main():
             alm_encoding=args.alm_encoding,
             issues_encoding=args.issues_encoding,
             threshold=args.threshold,
-            n_workers=args.n_workers
+            n_workers=args.n_workers,
+            exhaustive=args.exhaustive,
+            engine=args.engine,
+            score_dtype=args.score_dtype,
+            cache_path=args.cache,
+            cache_max_entries=args.cache_max_entries,
+            previous_result_path=args.since_previous,
+            previous_issues_path=args.previous_issues,
+            changelog_path=args.changelog,
+            stream_chunksize=args.stream_chunksize,
+            normalize=args.normalize,
+            top_k=args.top_k,
+            ambiguity_margin=args.ambiguity_margin,
+            one_to_one=args.one_to_one,
+            assignment_max_cells=args.assignment_max_cells
         )
         print("\n[SUCCESS] 合并操作成功完成！")
     except Exception as e:
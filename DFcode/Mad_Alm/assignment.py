@@ -0,0 +1,125 @@
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+except ImportError:  # 没有scipy时只能使用贪心分配
+    linear_sum_assignment = None
+
+
+ASSIGNMENT_METHODS = ('auto', 'hungarian', 'greedy')
+
+
+def candidate_edges(top_idx, top_score, threshold, normalized_subjects=None):
+    """
+    把每行的前top_k个候选整理成稀疏的(ALM行, Issue行, 分数)边列表，只保留不低于阈值的候选
+
+    匹配时同一规范化主题只保留第一次出现的位置，一对一分配时重复的主题应当可以分给不同的ALM行，
+    因此指定normalized_subjects后，把每条边展开到该主题的全部出现位置
+
+    参数:
+    top_idx -- 每行候选的issues行号，形状为(行数, top_k)，不足时为-1
+    top_score -- 每行候选的分数
+    threshold -- 模糊匹配阈值
+    normalized_subjects -- 规范化后的Issues主题列表(空主题为None) (默认: None)
+    """
+    rows, ranks = np.nonzero((top_idx >= 0) & (top_score >= threshold))
+    cols = top_idx[rows, ranks]
+    scores = top_score[rows, ranks].astype(np.float64)
+    if normalized_subjects is None or len(cols) == 0:
+        return rows, cols, scores
+
+    positions = {}
+    for pos, subject in enumerate(normalized_subjects):
+        if subject is not None:
+            positions.setdefault(subject, []).append(pos)
+    counts = np.array([len(positions[normalized_subjects[c]]) for c in cols])
+    if (counts == 1).all():
+        return rows, cols, scores
+
+    cols = np.concatenate([positions[normalized_subjects[c]] for c in cols])
+    return np.repeat(rows, counts), cols, np.repeat(scores, counts)
+
+
+def greedy_assignment(rows, cols, scores, n_rows):
+    """
+    贪心近似：按分数从高到低(同分按行号、列号)依次选边，行和列都未被占用时接受
+    """
+    match_idx = np.full(n_rows, -1, dtype=np.int64)
+    match_score = np.zeros(n_rows, dtype=np.float64)
+    used_cols = set()
+    for e in np.lexsort((cols, rows, -scores)):
+        row, col = rows[e], cols[e]
+        if match_idx[row] < 0 and col not in used_cols:
+            match_idx[row], match_score[row] = col, scores[e]
+            used_cols.add(col)
+    return match_idx, match_score
+
+
+def one_to_one_assignment(rows, cols, scores, n_rows, method='auto', max_cells=4000000):
+    """
+    在候选边组成的稀疏二分图上求最大权一对一分配
+
+    先按连通分量拆分，每个分量单独用linear_sum_assignment求解(没有边的位置权重为0，
+    分到0权重的行视为未匹配)，超过max_cells的分量改用贪心近似。
+    候选裁剪后分量通常很小，5万x5万的输入也只需要求解许多个小矩阵。
+    返回(匹配索引(未匹配为-1), 匹配分数, 统计信息)
+
+    参数:
+    rows -- 边的ALM行号
+    cols -- 边的Issue行号
+    scores -- 边的分数
+    n_rows -- ALM总行数
+    method -- 'hungarian'(精确)、'greedy'(贪心) 或 'auto'(有scipy时精确求解) (默认: 'auto')
+    max_cells -- 精确求解时单个分量稠密矩阵的最大元素个数 (默认: 4000000)
+    """
+    if method not in ASSIGNMENT_METHODS:
+        raise ValueError(f"不支持的分配方法: {method}")
+    if linear_sum_assignment is None:
+        if method == 'hungarian':
+            raise ImportError("一对一精确分配需要安装scipy")
+        method = 'greedy'
+
+    stats = {'method': method, 'edges': len(rows), 'components': 0,
+             'greedy_components': 0}
+    if method == 'greedy' or len(rows) == 0:
+        match_idx, match_score = greedy_assignment(rows, cols, scores, n_rows)
+        return match_idx, match_score, stats
+
+    # 只对出现在边里的列编号，ALM行在前、Issue列在后组成无向图
+    col_ids, col_local = np.unique(cols, return_inverse=True)
+    n_nodes = n_rows + len(col_ids)
+    graph = coo_matrix((np.ones(len(rows)), (rows, n_rows + col_local)),
+                       shape=(n_nodes, n_nodes))
+    _, labels = connected_components(graph, directed=False)
+
+    match_idx = np.full(n_rows, -1, dtype=np.int64)
+    match_score = np.zeros(n_rows, dtype=np.float64)
+    edge_labels = labels[rows]
+    order = np.argsort(edge_labels, kind='stable')
+    bounds = np.flatnonzero(np.diff(edge_labels[order])) + 1
+    for edges in np.split(order, bounds):
+        comp_rows, row_local = np.unique(rows[edges], return_inverse=True)
+        comp_cols, comp_col_local = np.unique(cols[edges], return_inverse=True)
+        stats['components'] += 1
+
+        if len(comp_rows) * len(comp_cols) > max_cells:
+            part_idx, part_score = greedy_assignment(
+                row_local, comp_col_local, scores[edges], len(comp_rows))
+            stats['greedy_components'] += 1
+            assigned = part_idx >= 0
+            match_idx[comp_rows[assigned]] = comp_cols[part_idx[assigned]]
+            match_score[comp_rows[assigned]] = part_score[assigned]
+            continue
+
+        weights = np.zeros((len(comp_rows), len(comp_cols)))
+        weights[row_local, comp_col_local] = scores[edges]
+        assigned_rows, assigned_cols = linear_sum_assignment(
+            weights, maximize=True)
+        keep = weights[assigned_rows, assigned_cols] > 0
+        assigned_rows, assigned_cols = assigned_rows[keep], assigned_cols[keep]
+        match_idx[comp_rows[assigned_rows]] = comp_cols[assigned_cols]
+        match_score[comp_rows[assigned_rows]] = weights[assigned_rows, assigned_cols]
+
+    return match_idx, match_score, stats
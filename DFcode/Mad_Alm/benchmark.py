@@ -0,0 +1,356 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from rapidfuzz import process, fuzz
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from Merge_1 import normalize_text, prepare_subjects, match_queries
+
+
+# 生成测试数据用的词库，贴近ALM不符合现象/Redmine主题的写法
+COMPONENTS = ['车机', '中控屏', '仪表', '导航', '蓝牙', '语音助手', '空调面板', '行车记录仪',
+              '后视镜', '方向盘按键', 'QQ音乐', '喜马拉雅', '倒车影像', '座椅调节', '盲区监测']
+SYMPTOMS = ['黑屏', '花屏', '卡顿', '无反应', '自动重启', '闪退', '无声音', '功能失效',
+            '连接失败', '显示异常', '自动暂停播放', '提示摄像头故障', '无法正常播放歌曲']
+CONTEXTS = ['车辆行驶过程中', '点检时', '停车断负极后', '泊车过程中', '冷启动后',
+            '车辆信号流量正常', '分屏模式下', '在没有人为干预的情况下', '重启后']
+VERSIONS = ['IVI 0725', 'IVI 0809', 'IVI 0811', '']
+
+# 默认测试规模(ALM行数，Issues行数相同)，100000行需用--sizes显式指定
+DEFAULT_SIZES = [1000, 10000]
+
+# 等待子进程结果时检查其是否存活的间隔(秒)
+POLL_SECONDS = 1.0
+
+
+def random_description(rnd):
+    """
+    随机生成一条故障描述
+    """
+    parts = [rnd.choice(CONTEXTS)]
+    for _ in range(rnd.randint(1, 3)):
+        parts.append(f"{rnd.choice(COMPONENTS)}{rnd.choice(SYMPTOMS)}")
+    return "，".join(parts)
+
+
+def add_noise(text, rnd, noise):
+    """
+    按noise比例随机替换/删除字符，模拟人工转录时的差异
+    """
+    chars = list(text)
+    for _ in range(int(len(chars) * noise)):
+        if not chars:
+            break
+        pos = rnd.randrange(len(chars))
+        if rnd.random() < 0.5:
+            del chars[pos]
+        else:
+            chars[pos] = rnd.choice(SYMPTOMS)[0]
+    return "".join(chars)
+
+
+def generate_data(n_alm, n_issues, seed=0, noise=0.05, match_rate=0.7, duplicate_rate=0.1):
+    """
+    生成可复现的ALM/Issues测试数据
+
+    参数:
+    n_alm -- ALM行数
+    n_issues -- Issues行数
+    seed -- 随机种子 (默认: 0)
+    noise -- 对应Issue主题的ALM描述中被扰动的字符比例 (默认: 0.05)
+    match_rate -- 有对应Issue的ALM行比例 (默认: 0.7)
+    duplicate_rate -- 与之前某行描述完全相同的ALM行比例 (默认: 0.1)
+    返回 (alm_df, issues_df)
+    """
+    rnd = random.Random(seed)
+    descriptions = []
+    subjects = []
+    for i in range(n_issues):
+        desc = random_description(rnd)
+        car = f"{rnd.randint(300, 330)}#"
+        stamp = f"{rnd.randint(0, 23):02d}：{rnd.randint(0, 59):02d}"
+        descriptions.append((stamp, car, desc))
+        subjects.append(
+            f"【QIS】【S{rnd.randint(2, 4)}】{car} 2025-08-{rnd.randint(1, 28):02d} {stamp},{car},{desc}\n"
+            f"【软件版本】{rnd.choice(VERSIONS)}")
+
+    nonconformities = []
+    for i in range(n_alm):
+        if nonconformities and rnd.random() < duplicate_rate:
+            nonconformities.append(rnd.choice(nonconformities))
+        elif n_issues and rnd.random() < match_rate:
+            stamp, car, desc = rnd.choice(descriptions)
+            nonconformities.append(
+                f"{stamp}|{car}|{add_noise(desc, rnd, noise)} 【软件版本】{rnd.choice(VERSIONS)}")
+        else:
+            nonconformities.append(
+                f"{rnd.randint(0, 23):02d}：{rnd.randint(0, 59):02d}|{random_description(rnd)}")
+
+    alm_df = pd.DataFrame({
+        '编号': [f"ALM{i:07d}" for i in range(n_alm)],
+        '不符合现象': nonconformities,
+        '重要度': [rnd.choice(['A', 'B', 'C']) for _ in range(n_alm)],
+    })
+    issues_df = pd.DataFrame({
+        '#': np.arange(100000, 100000 + n_issues),
+        '主题': subjects,
+        '状态': [rnd.choice(['新建', '进行中', '已解决']) for _ in range(n_issues)],
+    })
+    return alm_df, issues_df
+
+
+def bench_preprocess(n_alm, n_issues, seed=0, threshold=75, workers=1):
+    """
+    比较直接用原文打分与预处理(exact)后打分的耗时，并校验两者结果一致
+    """
+    alm_df, issues_df = generate_data(n_alm, n_issues, seed)
+    queries = alm_df['不符合现象'].astype(str).tolist()
+    subjects = issues_df['主题'].tolist()
+
+    t0 = time.perf_counter()
+    scores = process.cdist(queries, subjects, scorer=fuzz.token_set_ratio,
+                           score_cutoff=threshold, workers=workers)
+    raw_idx = scores.argmax(axis=1)
+    raw_score = scores[np.arange(len(queries)), raw_idx]
+    raw_idx = np.where(raw_score >= threshold, raw_idx, -1)
+    raw_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    _, forms, positions = prepare_subjects(subjects)
+    prepared = [normalize_text(q) for q in queries]
+    prep_time = time.perf_counter() - t0
+    prep_idx, prep_score, _, _ = match_queries(
+        prepared, forms, threshold, workers, subject_positions=positions)
+    total_time = time.perf_counter() - t0
+
+    same = np.array_equal(raw_idx, prep_idx) and np.allclose(
+        np.where(raw_idx >= 0, raw_score, 0), prep_score)
+    print(f"ALM {n_alm} 行 x Issues {n_issues} 行 (seed={seed})")
+    print(f"  原文直接打分:   {raw_time:.2f} s")
+    print(f"  预处理后打分:   {total_time:.2f} s (其中预处理 {prep_time:.2f} s)")
+    print(f"  加速比:         {raw_time / total_time:.2f}x")
+    print(f"  结果一致:       {'是' if same else '否'}")
+    return same
+
+
+def peak_rss_mb():
+    """
+    当前进程及已结束子进程(pool工作进程)的峰值常驻内存(MB)，Linux下ru_maxrss单位为KB
+    没有resource模块的平台(Windows)用psutil取本进程的峰值工作集，不含子进程；
+    两者都不可用时返回None
+    """
+    if resource is not None:
+        scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                    resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        return usage / scale
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    return None
+
+
+def run_case(impl, alm_path, issues_path, output_path, threshold, n_workers, result_queue):
+    """
+    在独立进程中运行一次合并，峰值内存互不影响，结果放入result_queue
+
+    参数:
+    impl -- 'merge'(merge.py) 或 'batch'/'pool'(Merge_1.py的匹配引擎)
+    """
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if impl == 'merge':
+                import merge
+                start = time.perf_counter()
+                merge.merge_alm_issues(alm_path, issues_path, output_path,
+                                       'utf-8', 'utf-8', threshold)
+            else:
+                import Merge_1
+                start = time.perf_counter()
+                Merge_1.merge_alm_issues(alm_path, issues_path, output_path, 'utf-8', 'utf-8',
+                                         threshold, n_workers, engine=impl)
+            wall_time = time.perf_counter() - start
+        result_queue.put({'wall_time': wall_time, 'peak_rss_mb': peak_rss_mb()})
+    except Exception as e:
+        result_queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def measure_case(impl, alm_path, issues_path, output_path, threshold, n_workers, timeout=None):
+    """
+    用spawn方式启动新进程运行run_case，返回耗时和峰值内存
+    子进程异常退出(内存不足被杀等)或超过timeout秒时返回 {'error': ...}，不会一直等待
+    """
+    ctx = multiprocessing.get_context('spawn')
+    result_queue = ctx.Queue()
+    proc = ctx.Process(target=run_case, args=(
+        impl, alm_path, issues_path, output_path, threshold, n_workers, result_queue))
+    proc.start()
+    start = time.perf_counter()
+    while True:
+        try:
+            result = result_queue.get(timeout=POLL_SECONDS)
+            break
+        except queue.Empty:
+            pass
+        if not proc.is_alive():
+            # 子进程可能在退出前刚放入结果，再取一次
+            try:
+                result = result_queue.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                result = {'error': f"子进程异常退出 (exitcode={proc.exitcode})"}
+            break
+        if timeout is not None and time.perf_counter() - start > timeout:
+            proc.terminate()
+            result = {'error': f"超过 {timeout} 秒未完成，已终止"}
+            break
+    proc.join()
+    return result
+
+
+def read_matches(output_path):
+    """
+    读取合并结果中每行ALM匹配到的Issue编号，未匹配为-1
+    """
+    merged_df = pd.read_csv(output_path, encoding='utf_8_sig')
+    issue_ids = pd.to_numeric(merged_df['Issues_#'], errors='coerce')
+    return issue_ids.fillna(-1).astype(np.int64).to_numpy()
+
+
+def bench_suite(sizes, seed=0, noise=0.05, match_rate=0.7, threshold=75, workers=(1,),
+                engines=('batch', 'pool'), legacy_max_rows=1000, output_json=None, workdir=None,
+                case_timeout=None):
+    """
+    对merge.py和Merge_1.py(各引擎、各进程数)做同一批数据的对比测试
+
+    每个规模生成一份可复现数据，逐个实现在独立进程中运行，记录耗时、每秒行数、峰值内存，
+    并以第一个运行的实现为基准统计匹配结果一致的行比例。
+
+    参数:
+    sizes -- 测试规模列表(ALM行数，Issues行数相同)
+    seed -- 随机种子 (默认: 0)
+    noise -- ALM描述的扰动比例 (默认: 0.05)
+    match_rate -- 有对应Issue的ALM行比例 (默认: 0.7)
+    threshold -- 模糊匹配阈值 (默认: 75)
+    workers -- Merge_1.py要测试的进程/线程数列表 (默认: (1,))
+    engines -- Merge_1.py要测试的匹配引擎 (默认: ('batch', 'pool'))
+    legacy_max_rows -- merge.py逐对比较太慢，超过该行数时跳过 (默认: 1000)
+    output_json -- 结果JSON路径，为None时只打印 (默认: None)
+    workdir -- 存放测试数据和输出的目录 (默认: 临时目录)
+    case_timeout -- 单个用例的最长秒数，超时记为失败 (默认: None，不限制)
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workdir = workdir or tmpdir
+        os.makedirs(workdir, exist_ok=True)
+        for size in sizes:
+            alm_df, issues_df = generate_data(size, size, seed, noise, match_rate)
+            alm_path = os.path.join(workdir, f"alm_{size}.csv")
+            issues_path = os.path.join(workdir, f"issues_{size}.csv")
+            alm_df.to_csv(alm_path, index=False, encoding='utf-8')
+            issues_df.to_csv(issues_path, index=False, encoding='utf-8')
+
+            cases = [(engine, n) for engine in engines for n in workers]
+            if size <= legacy_max_rows:
+                cases.append(('merge', 1))
+
+            reference = None
+            for impl, n_workers in cases:
+                output_path = os.path.join(workdir, f"out_{size}_{impl}_{n_workers}.csv")
+                print(f"[{size} 行] {impl} (n_workers={n_workers}) ...", flush=True)
+                record = {
+                    'rows': size,
+                    'implementation': 'merge.py' if impl == 'merge' else 'Merge_1.py',
+                    'engine': 'fuzzywuzzy' if impl == 'merge' else impl,
+                    'n_workers': n_workers,
+                }
+                record.update(measure_case(impl, alm_path, issues_path,
+                                           output_path, threshold, n_workers, case_timeout))
+                if 'error' not in record:
+                    matches = read_matches(output_path)
+                    if reference is None:
+                        reference = (record['engine'], n_workers, matches)
+                    record['rows_per_sec'] = size / record['wall_time']
+                    record['matched_rows'] = int((matches >= 0).sum())
+                    record['agreement'] = float((matches == reference[2]).mean())
+                    record['agreement_base'] = f"{reference[0]}/{reference[1]}"
+                    peak = record['peak_rss_mb']
+                    print(f"  耗时 {record['wall_time']:.2f} s，{record['rows_per_sec']:.0f} 行/秒，"
+                          f"峰值内存 {'未知' if peak is None else f'{peak:.0f} MB'}，"
+                          f"与基准一致 {record['agreement']:.2%}")
+                else:
+                    print(f"  失败: {record['error']}")
+                results.append(record)
+
+    report = {
+        'meta': {
+            'seed': seed,
+            'noise': noise,
+            'match_rate': match_rate,
+            'threshold': threshold,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        },
+        'results': results,
+    }
+    if output_json:
+        with open(output_json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存至: {output_json}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ALM/Issues匹配性能测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='测试规模(ALM与Issues行数) (默认: 1000 10000，更大规模如100000需显式指定)')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+    parser.add_argument('--noise', type=float, default=0.05, help='ALM描述的扰动比例 (默认: 0.05)')
+    parser.add_argument('--match-rate', type=float, default=0.7, help='有对应Issue的ALM行比例 (默认: 0.7)')
+    parser.add_argument('-t', '--threshold', type=int, default=75, help='模糊匹配阈值 (默认: 75)')
+    parser.add_argument('-n', '--n-workers', type=int, nargs='+', default=[1],
+                        help='Merge_1.py的进程/线程数，可指定多个 (默认: 1)')
+    parser.add_argument('--engines', nargs='+', choices=['batch', 'pool'], default=['batch', 'pool'],
+                        help='Merge_1.py的匹配引擎 (默认: batch pool)')
+    parser.add_argument('--legacy-max-rows', type=int, default=1000,
+                        help='merge.py只测试不超过该行数的规模 (默认: 1000)')
+    parser.add_argument('-o', '--output', default=None, help='结果JSON路径 (默认: 只打印)')
+    parser.add_argument('--workdir', default=None, help='保留测试数据和输出的目录 (默认: 临时目录)')
+    parser.add_argument('--case-timeout', type=float, default=None,
+                        help='单个用例的最长秒数，超时记为失败 (默认: 不限制)')
+    parser.add_argument('--preprocess', action='store_true',
+                        help='只比较原文打分与预处理后打分 (使用--sizes的第一个规模)')
+    args = parser.parse_args()
+
+    if args.preprocess:
+        bench_preprocess(args.sizes[0], args.sizes[0], args.seed,
+                         args.threshold, args.n_workers[0])
+        return
+
+    bench_suite(args.sizes, args.seed, args.noise, args.match_rate, args.threshold,
+                args.n_workers, args.engines, args.legacy_max_rows, args.output, args.workdir,
+                args.case_timeout)
+
+
+if __name__ == "__main__":
+    main()
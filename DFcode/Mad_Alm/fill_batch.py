@@ -0,0 +1,206 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from FILL_ import process_column_mapping, WRITE_ENGINES
+from table_io import read_table
+from vlookup import LOOKUP_MODES
+
+
+# 工作进程共享的数据源，由init_worker设置
+_shared = {}
+
+# 失败任务在报告中保留的日志行数
+FAILURE_LOG_LINES = 20
+
+
+def load_jobs(jobs_path, default_mapping=None, default_sheet='一元问题表'):
+    """
+    读取任务列表(JSON数组)，每个任务为 {"template": 模板, "output": 输出, "sheet": 工作表, "mapping": 映射文件}
+    sheet和mapping可省略，省略时使用默认值；相对路径相对于任务文件所在目录
+    """
+    with open(jobs_path, 'r', encoding='utf-8') as f:
+        raw_jobs = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(jobs_path))
+    # 命令行指定的默认映射文件相对于当前目录
+    default_mapping = os.path.abspath(default_mapping) if default_mapping else None
+    jobs = []
+    for i, raw in enumerate(raw_jobs):
+        job = {'sheet': default_sheet, 'mapping': default_mapping, **raw}
+        missing = [key for key in ('template', 'output', 'mapping') if not job.get(key)]
+        if missing:
+            raise ValueError(f"第{i + 1}个任务缺少: {', '.join(missing)}")
+        for key in ('template', 'output', 'mapping'):
+            job[key] = os.path.normpath(os.path.join(base_dir, job[key]))
+        job['id'] = i + 1
+        jobs.append(job)
+
+    outputs = [job['output'] for job in jobs]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError("多个任务的输出文件相同")
+    return jobs
+
+
+def init_worker(source_df, write_engine, lookup_mode, header_containment=False):
+    """
+    工作进程初始化：fork方式下数据源随进程继承(不序列化)，spawn方式下每个进程只传一次
+    """
+    _shared['source_df'] = source_df
+    _shared['write_engine'] = write_engine
+    _shared['lookup_mode'] = lookup_mode
+    _shared['header_containment'] = header_containment
+
+
+def run_job(job):
+    """
+    在工作进程中完成一个填表任务，输出写入内存避免各任务的日志交错，返回任务报告
+    """
+    log = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            success = process_column_mapping(
+                mapping_file_path=job['mapping'],
+                csv_file_path=None,
+                excel_file_path=job['template'],
+                output_file_path=job['output'],
+                sheet_name=job['sheet'],
+                write_engine=_shared['write_engine'],
+                lookup_mode=_shared['lookup_mode'],
+                source_df=_shared['source_df'],
+                header_containment=_shared['header_containment']
+            )
+        # process_column_mapping自行捕获异常并打印，从日志中取出错误信息
+        errors = [line for line in log.getvalue().splitlines() if line.startswith('处理过程中发生错误')]
+        error = None if success else (errors[-1] if errors else '填表失败')
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    report = {
+        'id': job['id'],
+        'template': job['template'],
+        'sheet': job['sheet'],
+        'output': job['output'],
+        'success': error is None,
+        'seconds': round(time.perf_counter() - start, 3),
+        'pid': os.getpid(),
+        'error': error,
+    }
+    if error is not None:
+        report['log_tail'] = log.getvalue().splitlines()[-FAILURE_LOG_LINES:]
+    return report
+
+
+def fill_batch(data_path, jobs, n_workers=None, write_engine='xml', lookup_mode='formula', report_path=None, header_containment=False):
+    """
+    用同一份合并结果并行填写多个模板：数据只读取一次，在进程池中共享
+
+    支持fork的平台上工作进程继承父进程中的数据，不必序列化和传输；
+    但dtype=str读入的是object列，工作进程读取字符串时会更新引用计数，写到的内存页随之被复制，
+    所以内存并不是全部共享，省下的主要是序列化和传输的时间。
+    Windows(spawn)下通过进程池初始化参数每个进程传递一次。
+    返回任务报告列表(按任务顺序)
+
+    参数:
+    data_path -- 合并结果路径(CSV/Parquet/Feather)
+    jobs -- load_jobs返回的任务列表
+    n_workers -- 进程数 (默认: CPU核心数，不超过任务数)
+    write_engine -- 写入方式，见FILL_.WRITE_ENGINES (默认: 'xml')
+    lookup_mode -- VLOOKUP公式列的写法，见vlookup.LOOKUP_MODES (默认: 'formula')
+    report_path -- 报告JSON的输出路径 (默认: None，只打印)
+    header_containment -- 找不到的表头是否按包含关系匹配 (默认: False)
+    """
+    start = time.perf_counter()
+    print(f"正在读取数据源: {data_path}")
+    source_df = read_table(data_path, dtype=str)
+    load_seconds = time.perf_counter() - start
+    print(f"数据源包含 {len(source_df)} 行 {len(source_df.columns)} 列，读取耗时 {load_seconds:.2f} 秒")
+
+    n_workers = max(1, min(n_workers or os.cpu_count() or 1, len(jobs)))
+    method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+    ctx = multiprocessing.get_context(method)
+    print(f"开始处理 {len(jobs)} 个任务，进程数: {n_workers} ({method})")
+
+    reports = []
+    with ctx.Pool(n_workers, initializer=init_worker,
+                  initargs=(source_df, write_engine, lookup_mode, header_containment)) as pool:
+        for report in pool.imap_unordered(run_job, jobs):
+            status = '✅' if report['success'] else '❌'
+            print(f"  {status} [{report['id']}] {report['template']} ({report['sheet']}) -> "
+                  f"{report['output']}  {report['seconds']:.2f} 秒")
+            if report['error']:
+                print(f"     {report['error']}")
+            reports.append(report)
+    reports.sort(key=lambda report: report['id'])
+    total_seconds = time.perf_counter() - start
+
+    failed = [report for report in reports if not report['success']]
+    job_seconds = [report['seconds'] for report in reports]
+    print("\n" + "=" * 50)
+    print(f"完成任务: {len(reports) - len(failed)}/{len(reports)}，失败: {len(failed)}")
+    print(f"总耗时: {total_seconds:.2f} 秒 (读取数据 {load_seconds:.2f} 秒)，"
+          f"单任务最长 {max(job_seconds):.2f} 秒，累计 {sum(job_seconds):.2f} 秒")
+    for report in failed:
+        print(f"\n❌ [{report['id']}] {report['template']}: {report['error']}")
+        for line in report['log_tail']:
+            print(f"     {line}")
+
+    if report_path:
+        summary = {
+            'data': data_path,
+            'rows': len(source_df),
+            'workers': n_workers,
+            'start_method': method,
+            'load_seconds': round(load_seconds, 3),
+            'total_seconds': round(total_seconds, 3),
+            'jobs': reports,
+        }
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"\n任务报告已保存至: {report_path}")
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量列映射填表(多个模板并行)')
+    parser.add_argument('-d', '--data', required=True,
+                        help='合并结果路径(CSV/Parquet/Feather)，所有任务共用')
+    parser.add_argument('-j', '--jobs', required=True,
+                        help='任务列表JSON: [{"template": ..., "output": ..., "sheet": ..., "mapping": ...}]')
+    parser.add_argument('-m', '--mapping', default=None,
+                        help='任务未指定mapping时使用的映射文件')
+    parser.add_argument('--sheet', default='一元问题表',
+                        help='任务未指定sheet时使用的工作表 (默认: 一元问题表)')
+    parser.add_argument('-n', '--n-workers', type=int, default=None,
+                        help='进程数 (默认: CPU核心数，不超过任务数)')
+    parser.add_argument('--write-engine', choices=list(WRITE_ENGINES), default='xml',
+                        help='写入方式: xml/stream/openpyxl (默认: xml)')
+    parser.add_argument('--lookup-mode', choices=list(LOOKUP_MODES), default='formula',
+                        help='VLOOKUP列: formula/value/both (默认: formula)')
+    parser.add_argument('--header-containment', action='store_true',
+                        help='表头精确和清理后都找不到时按包含关系匹配')
+    parser.add_argument('-r', '--report', default=None, help='任务报告JSON路径 (默认: 只打印)')
+    args = parser.parse_args()
+
+    try:
+        jobs = load_jobs(args.jobs, args.mapping, args.sheet)
+        reports = fill_batch(args.data, jobs, args.n_workers, args.write_engine,
+                             args.lookup_mode, args.report, args.header_containment)
+    except Exception as e:
+        print(f"\n[ERROR] 批量填表失败: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    if not all(report['success'] for report in reports):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import re
+
+
+# Excel表头清理：去除换行符、空格等
+CLEAN_RE = re.compile(r'[\n\r\s]+')
+# CSV列名包含匹配时额外忽略下划线
+LOOSE_RE = re.compile(r'[_\s]+')
+
+
+def clean_header(name):
+    """
+    清理表头：去除换行符、空格等空白字符
+    """
+    return CLEAN_RE.sub('', name)
+
+
+class HeaderIndex:
+    """
+    表头解析索引：精确 -> 清理后 (-> 包含) 逐级匹配
+
+    建立时对全部表头只清理一次，并建立两个索引：
+    - exact: 原始表头 -> 列
+    - cleaned: 清理后的表头 -> 列(同名时以后出现的为准，与逐列赋值的字典一致)
+    包含匹配(FILL_2的宽松规则)默认关闭，找不到的列照常报告为缺失；开启时按表头顺序扫描，
+    返回第一个与查询互相包含的表头，表头数量很少，不需要额外的索引。
+    """
+
+    def __init__(self, headers, clean=clean_header, loose=clean_header, containment=False):
+        """
+        参数:
+        headers -- [(键, 表头名称)]，键为Excel列号或CSV列名，按表头顺序排列
+        clean -- 第二级匹配使用的清理函数 (默认: clean_header)
+        loose -- 包含匹配使用的清理函数 (默认: clean_header)
+        containment -- 是否启用包含匹配 (默认: False)
+        """
+        self.clean = clean
+        self.loose = loose
+        self.containment = containment
+        self.keys = [key for key, _ in headers]
+        self.names = [name for _, name in headers]
+        self.exact = {}
+        self.cleaned = {}
+        self.loose_names = None     # 第一次包含匹配时才计算
+        for pos, name in enumerate(self.names):
+            self.exact[name] = pos
+            self.cleaned[clean(name)] = pos
+
+    def resolve(self, query):
+        """
+        解析一个表头名称，返回(键, 匹配到的表头, 匹配方式)，找不到时返回(None, None, None)
+        匹配方式为 '精确'/'清理'/'包含'
+        """
+        for how, index, key in (('精确', self.exact, query),
+                                ('清理', self.cleaned, self.clean(query))):
+            if key in index:
+                pos = index[key]
+                return self.keys[pos], self.names[pos], how
+
+        loose_query = self.loose(query) if self.containment else ''
+        if not loose_query:
+            return None, None, None
+        if self.loose_names is None:
+            self.loose_names = [self.loose(name) for name in self.names]
+        for pos, loose_name in enumerate(self.loose_names):
+            if loose_name and (loose_query in loose_name or loose_name in loose_query):
+                return self.keys[pos], self.names[pos], '包含'
+        return None, None, None
+
+
+def excel_header_index(excel_headers, containment=False):
+    """
+    Excel表头索引：清理和包含匹配都忽略换行符、空格等空白字符
+
+    参数:
+    excel_headers -- [(Excel列号, 表头名称)]
+    containment -- 是否启用包含匹配 (默认: False)
+    """
+    return HeaderIndex(excel_headers, containment=containment)
+
+
+def csv_header_index(csv_columns, containment=False):
+    """
+    CSV列名索引：第二级匹配去除空格，包含匹配再忽略下划线
+    """
+    return HeaderIndex([(col, col) for col in csv_columns],
+                       clean=lambda name: name.replace(' ', ''),
+                       loose=lambda name: LOOSE_RE.sub('', name),
+                       containment=containment)
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from header_index import excel_header_index, csv_header_index
+from vlookup import parse_vlookup
+
+
+# 映射计划的操作类型
+# copy     -- 复制CSV列:            Excel列 --> CSV列名
+# constant -- 每行写入同一个常量:   Excel列 --> "文本"
+# skip     -- 不写入:               Excel列 --> null
+# formula  -- 按行号生成的公式:     Excel列 --> =VLOOKUP(Ci,QIS表格!D:G,4,0)  (列号后的i或{i}为当前行号)
+#             精确查找的VLOOKUP解析出lookup参数，可选在Python中计算(见vlookup.py)
+# sequence -- 序号(从1开始):        Excel列 --> <序号>；没有规则写第1列时自动在第1列生成序号
+# 公式模板中的行号占位符
+ROW_PLACEHOLDER = '{row}'
+# 公式中紧跟列字母的i表示当前行号，如 Ci、AB{i}
+ROW_MARKER_RE = re.compile(r'(?<![A-Za-z_$])(\$?[A-Z]{1,3})(?:i|\{i\})(?![A-Za-z0-9_])')
+# 公式结尾的括号之后的文字视为注释，如 "=VLOOKUP(...) i为当前行号"
+FORMULA_NOTE_RE = re.compile(r'^(=.*\))\s*(\S.*)?$')
+SHEET_REF_RE = re.compile(r"(?:'([^']+)'|([^\s(),!=+\-*/&<>']+))!")
+
+SEQUENCE_TOKENS = ('<序号>', '<seq>')
+SKIP_TOKENS = ('null', 'none', '')
+
+# 映射计划缓存文件中最多保留的计划个数(不同模板/CSV表头各一份)
+PLAN_CACHE_SIZE = 32
+# 计划结构变化时递增，使旧的缓存失效
+PLAN_VERSION = 3
+# 映射计划缓存目录，为空时缓存文件与映射文件放在一起
+PLAN_CACHE_DIR = os.environ.get('DFCODE_PLAN_CACHE_DIR')
+
+
+def parse_mapping_file(mapping_file_path):
+    """
+    读取映射文件中的 "Excel列 --> 来源" 规则，同一Excel列出现多次时以最后一条为准
+    """
+    mapping_rules = {}
+    with open(mapping_file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            cleaned = line.strip()
+            if '-->' in cleaned and not cleaned.startswith('#'):
+                excel_col, source = cleaned.split('-->', 1)
+                mapping_rules[excel_col.strip()] = source.strip()
+    return mapping_rules
+
+
+def compile_rule(excel_col, source):
+    """
+    把一条规则编译为带类型的操作(字典)，CSV列和Excel列在compile_mapping中解析
+    """
+    rule = {'target': excel_col, 'source': source}
+    if source.lower() in SKIP_TOKENS:
+        rule['op'] = 'skip'
+    elif source in SEQUENCE_TOKENS:
+        rule['op'] = 'sequence'
+    elif len(source) >= 2 and source[0] == source[-1] and source[0] in '"\'':
+        rule['op'] = 'constant'
+        rule['value'] = source[1:-1]
+    elif source.startswith('='):
+        match = FORMULA_NOTE_RE.match(source)
+        formula = match.group(1) if match else source
+        rule['op'] = 'formula'
+        rule['template'] = ROW_MARKER_RE.sub(r'\1' + ROW_PLACEHOLDER, formula)
+        rule['note'] = match.group(2) if match and match.group(2) else ''
+        rule['sheets'] = sorted({quoted or bare for quoted, bare in SHEET_REF_RE.findall(formula)})
+        # 精确查找的VLOOKUP可以在Python中计算
+        rule['lookup'] = parse_vlookup(rule['template'])
+    else:
+        rule['op'] = 'copy'
+    return rule
+
+
+def compile_mapping(mapping_rules, excel_headers, csv_columns, sheet_names=None, containment=False):
+    """
+    编译并校验映射规则，返回映射计划
+
+    计划中的每个操作都已解析出Excel列号(excel_idx)，copy操作解析出CSV列名(csv_column)。
+    无法执行的操作记录在error中；公式引用了模板中不存在的工作表时记录在warning中(仍然写入)。
+
+    参数:
+    mapping_rules -- {Excel列名: 来源}
+    excel_headers -- [(Excel列号, 表头名称)]
+    csv_columns -- CSV列名列表
+    sheet_names -- 模板中的工作表名称，用于校验公式引用 (默认: None，不校验)
+    containment -- 精确和清理后都找不到时是否按包含关系匹配表头(FILL_2的宽松规则) (默认: False)
+    """
+    excel_index = excel_header_index(excel_headers, containment)
+    csv_index = csv_header_index(csv_columns, containment)
+
+    operations = []
+    for excel_col, source in mapping_rules.items():
+        rule = compile_rule(excel_col, source)
+        rule.update({'excel_idx': None, 'excel_header': None, 'excel_match': None,
+                     'csv_column': None, 'csv_match': None, 'error': None, 'warning': None})
+        if rule['op'] != 'skip':
+            rule['excel_idx'], rule['excel_header'], rule['excel_match'] = excel_index.resolve(excel_col)
+            if rule['excel_idx'] is None:
+                rule['error'] = f"Excel中未找到列: {excel_col}"
+
+        if rule['op'] == 'copy' and rule['error'] is None:
+            rule['csv_column'], _, rule['csv_match'] = csv_index.resolve(source)
+            if rule['csv_column'] is None:
+                rule['error'] = f"CSV中未找到列: {source}"
+        elif rule['op'] == 'formula' and sheet_names is not None:
+            missing = [name for name in rule['sheets'] if name not in sheet_names]
+            if missing:
+                rule['warning'] = f"公式引用的工作表不在模板中: {', '.join(missing)}"
+        operations.append(rule)
+
+    # 没有规则写第1列时保持原有行为：第1列写序号
+    if not any(rule['excel_idx'] == 1 and rule['error'] is None for rule in operations):
+        operations.insert(0, {
+            'target': excel_headers[0][1] if excel_headers else '序号',
+            'source': '<序号>', 'op': 'sequence', 'excel_idx': 1,
+            'excel_header': excel_headers[0][1] if excel_headers else None, 'excel_match': '默认',
+            'csv_column': None, 'csv_match': None, 'error': None, 'warning': None,
+        })
+    return operations
+
+
+def plan_cache_path(mapping_file_path, cache_dir=None):
+    """
+    映射计划缓存文件：默认为映射文件旁的 <映射文件>.plan.json(已在.gitignore中忽略)；
+    指定cache_dir或环境变量DFCODE_PLAN_CACHE_DIR时放在该目录下，
+    文件名附带映射文件完整路径的哈希，不同目录下的同名映射文件互不覆盖
+    """
+    cache_dir = cache_dir or PLAN_CACHE_DIR
+    if not cache_dir:
+        return f"{mapping_file_path}.plan.json"
+    digest = hashlib.blake2b(os.path.abspath(mapping_file_path).encode('utf-8'), digest_size=8).hexdigest()
+    return os.path.join(cache_dir, f"{os.path.basename(mapping_file_path)}.{digest}.plan.json")
+
+
+def plan_key(mapping_rules, excel_headers, csv_columns, sheet_names, containment=False):
+    """
+    映射规则、Excel表头、CSV列名、工作表名称和是否包含匹配都相同时，编译结果一定相同
+    """
+    raw = json.dumps([PLAN_VERSION, list(mapping_rules.items()), list(excel_headers), list(csv_columns),
+                      None if sheet_names is None else list(sheet_names), containment], ensure_ascii=False)
+    return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def load_mapping_plan(mapping_file_path, mapping_rules, excel_headers, csv_columns, sheet_names=None, use_cache=True, cache_dir=None, containment=False):
+    """
+    返回编译后的映射计划，优先使用缓存
+    返回(映射计划, 是否命中缓存)
+
+    参数:
+    mapping_file_path -- 映射文件路径，缓存位置见plan_cache_path
+    mapping_rules -- parse_mapping_file读取的映射规则
+    excel_headers -- [(Excel列号, 表头名称)]
+    csv_columns -- CSV列名列表
+    sheet_names -- 模板中的工作表名称 (默认: None)
+    use_cache -- 是否使用缓存 (默认: True)
+    cache_dir -- 缓存目录 (默认: None，见plan_cache_path)
+    containment -- 是否启用表头包含匹配，见compile_mapping (默认: False)
+    """
+    if not use_cache:
+        return compile_mapping(mapping_rules, excel_headers, csv_columns, sheet_names, containment), False
+
+    key = plan_key(mapping_rules, excel_headers, csv_columns, sheet_names, containment)
+    cache_path = plan_cache_path(mapping_file_path, cache_dir)
+    plans = {}
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                plans = json.load(f).get('plans', {})
+        except (OSError, ValueError):
+            plans = {}
+    if key in plans:
+        return plans[key], True
+
+    plan = compile_mapping(mapping_rules, excel_headers, csv_columns, sheet_names, containment)
+    plans[key] = plan
+    for old_key in list(plans)[:-PLAN_CACHE_SIZE]:
+        del plans[old_key]
+
+    # 先写临时文件再替换，多个进程同时写入时也不会读到半个文件
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'plans': plans}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # 缓存目录不可写时只是不缓存
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return plan, False
+
+
+def render_formula(template, first_row, n_rows):
+    """
+    整列生成公式：按占位符拆开模板，与行号数组一次拼接
+    """
+    rows = np.arange(first_row, first_row + n_rows).astype(str).astype(object)
+    parts = template.split(ROW_PLACEHOLDER)
+    column = np.full(n_rows, parts[0], dtype=object)
+    for part in parts[1:]:
+        column = column + rows + part
+    return column.tolist()
+
+
+def text_column(series):
+    """
+    数据源的一列转换为文本列表，空值为''
+
+    直接使用内存中的合并结果时，数值列按to_csv的写法转为文本，与写出CSV再按文本读回的结果一致
+    """
+    return ['' if value is None or value is pd.NA or (isinstance(value, float) and value != value)
+            else value if type(value) is str else str(value)
+            for value in series.tolist()]
+
+
+def source_columns(plan):
+    """
+    映射计划实际读取的数据源列(按计划顺序，不重复)，读取数据源时只需加载这些列
+    """
+    columns = []
+    for rule in plan:
+        if rule['op'] == 'copy' and not rule['error'] and rule['csv_column'] not in columns:
+            columns.append(rule['csv_column'])
+    return columns
+
+
+def execute_plan(plan, csv_df, first_row=2):
+    """
+    执行映射计划，返回 {Excel列号: 整列的值}；后执行的操作覆盖先执行的同一列
+
+    参数:
+    plan -- compile_mapping返回的映射计划
+    csv_df -- 数据源，CSV按文本读入的表或内存中的合并结果(非文本列见text_column)
+    first_row -- 第一行数据所在的行号 (默认: 2)
+    """
+    n_rows = len(csv_df)
+    columns = {}
+    for rule in plan:
+        if rule['error'] or rule['op'] == 'skip':
+            continue
+        if rule['op'] == 'copy':
+            values = [value.strip() for value in text_column(csv_df[rule['csv_column']])]
+        elif rule['op'] == 'constant':
+            values = [rule['value']] * n_rows
+        elif rule['op'] == 'formula':
+            values = render_formula(rule['template'], first_row, n_rows)
+        elif rule['op'] == 'sequence':
+            values = np.arange(1, n_rows + 1)
+        else:
+            raise ValueError(f"不支持的映射操作: {rule['op']}")
+        columns[rule['excel_idx']] = values
+    return columns
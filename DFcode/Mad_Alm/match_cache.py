@@ -0,0 +1,251 @@
+import sqlite3
+import hashlib
+import time
+import numpy as np
+from collections import Counter
+from rapidfuzz import process, fuzz
+from text_normalize import NORMALIZE_VERSION, normalize_text
+
+
+def text_hash(text, digest_size=8):
+    """
+    计算文本的blake2b哈希，返回有符号64位整数(可直接存入SQLite INTEGER)
+    """
+    digest = hashlib.blake2b(str(text).encode(
+        'utf-8'), digest_size=digest_size).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def is_blank_subject(subject):
+    """
+    None/NaN主题不参与匹配(与process.extractOne的行为一致)
+    """
+    return subject is None or (isinstance(subject, float) and np.isnan(subject))
+
+
+def refine_with_subjects(queries, match_idx, match_score, issue_subjects, candidate_idx, threshold, score_dtype='float64'):
+    """
+    已知每个query在旧主题库上的最佳匹配时，只对新增/变化的主题打分并更新结果
+    新主题分数更高，或同分但位置更靠前时替换原结果(与全量扫描同分取第一个的规则一致)
+
+    参数:
+    queries -- 待校验的文本列表
+    match_idx -- 原匹配索引(按当前主题库的位置，未匹配为-1)
+    match_score -- 原匹配分数
+    issue_subjects -- 当前Issues主题列表
+    candidate_idx -- 需要比较的主题位置(新增或变化的主题)
+    threshold -- 模糊匹配阈值
+    score_dtype -- 分数类型，需与原结果一致 (默认: 'float64')
+    """
+    match_idx = np.array(match_idx, dtype=np.int64)
+    match_score = np.array(match_score, dtype=np.float64)
+    if len(queries) == 0 or len(candidate_idx) == 0:
+        return match_idx, match_score
+
+    candidate_idx = np.asarray(candidate_idx, dtype=np.int64)
+    scores = process.cdist(
+        queries,
+        [issue_subjects[i] for i in candidate_idx],
+        scorer=fuzz.token_set_ratio,
+        score_cutoff=threshold,
+        dtype=score_dtype,
+        workers=-1
+    )
+    best = scores.argmax(axis=1)
+    best_score = scores[np.arange(len(queries)), best].astype(np.float64)
+    best_idx = candidate_idx[best]
+
+    better = (best_score >= threshold) & (
+        (match_idx < 0) | (best_score > match_score) |
+        ((best_score == match_score) & (best_idx < match_idx)))
+    match_idx[better] = best_idx[better]
+    match_score[better] = best_score[better]
+    return match_idx, match_score
+
+
+class MatchCache:
+    """
+    ALM/Issues匹配结果的持久化缓存(SQLite)
+
+    matches表以 哈希(阈值, 分数类型, 预处理模式, 规范化后的不符合现象) 为键，保存最佳匹配主题的哈希和分数，
+    以及计算时所用的Issues主题库版本。subjects表保存上一次运行时的主题库(按原顺序的哈希)。
+
+    主题库变化时，对上一版本的缓存条目做增量校验：
+    - 缓存的最佳主题已被删除 -> 重新匹配
+    - 保留下来的主题首次出现的相对顺序发生变化(会影响同分时的选择) -> 全部重新匹配
+    - 否则只需对新增(或出现次数变多)的主题打分，与缓存结果比较后取最优
+    缓存条目数超过max_entries时，按最近使用时间淘汰最旧的条目。
+    """
+
+    # 每条SQL语句中IN(...)参数的最大个数
+    BATCH_SIZE = 500
+
+    def __init__(self, cache_path, max_entries=200000):
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.run_id = time.time()
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'evicted': 0}
+
+        self.conn = sqlite3.connect(cache_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS matches (
+                key TEXT PRIMARY KEY,
+                subject_hash INTEGER,
+                score REAL NOT NULL,
+                version TEXT NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_matches_last_used ON matches(last_used);
+            CREATE TABLE IF NOT EXISTS subjects (
+                pos INTEGER PRIMARY KEY,
+                hash INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def make_key(query, threshold, score_dtype, normalize='exact'):
+        """
+        生成缓存键：阈值、分数类型和预处理模式(及其规则版本)不同，匹配结果也可能不同
+        查询文本用与匹配相同的normalize_text规范化，规范形式相同的查询共用一个键
+        """
+        raw = (f"{threshold}|{score_dtype}|{normalize}@{NORMALIZE_VERSION}|"
+               f"{normalize_text(query, normalize)}")
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+    def sync_corpus(self, issue_subjects):
+        """
+        记录本次的Issues主题库，并与上一次运行时的主题库比较
+        """
+        self.subjects = issue_subjects
+        self.subject_hashes = np.array(
+            [0 if is_blank_subject(s) else text_hash(s) for s in issue_subjects], dtype=np.int64)
+        self.version = hashlib.blake2b(
+            self.subject_hashes.tobytes(), digest_size=16).hexdigest()
+
+        # 同一主题出现多次时，以第一次出现的位置为准(与同分取第一个的规则一致)
+        self.first_index = {}
+        for idx, h in enumerate(self.subject_hashes.tolist()):
+            if h != 0:
+                self.first_index.setdefault(h, idx)
+
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE name = 'version'").fetchone()
+        self.previous_version = row[0] if row else None
+        # subjects表中快照的版本；previous_version保持不变，流式模式的后续分块仍按上一次运行的版本做增量校验
+        self.stored_version = self.previous_version
+        previous = np.array([h for (h,) in self.conn.execute(
+            "SELECT hash FROM subjects ORDER BY pos")], dtype=np.int64)
+
+        previous_counts = Counter(h for h in previous.tolist() if h != 0)
+        current_counts = Counter(
+            h for h in self.subject_hashes.tolist() if h != 0)
+
+        # 新出现的主题，以及出现次数变多的主题(首次出现位置可能提前)，都需要与缓存结果比较
+        added = {h for h, cnt in current_counts.items()
+                 if cnt > previous_counts.get(h, 0)}
+        self.added_idx = np.array(
+            sorted(self.first_index[h] for h in added), dtype=np.int64)
+
+        # 其余保留主题首次出现的相对顺序不变时，旧条目才能只对新增主题做增量校验
+        kept_previous = [h for h in dict.fromkeys(previous_counts)
+                         if h in current_counts and h not in added]
+        kept_current = [h for h in self.first_index
+                        if h in previous_counts and h not in added]
+        self.order_kept = kept_previous == kept_current
+
+    def lookup(self, queries, threshold, score_dtype, normalize='exact'):
+        """
+        查询缓存，返回(命中掩码, 匹配索引, 匹配分数)，未命中的行需要重新匹配
+        queries和sync_corpus的主题需经过同一种预处理
+        """
+        keys = [self.make_key(q, threshold, score_dtype, normalize)
+                for q in queries]
+        hit = np.zeros(len(queries), dtype=bool)
+        match_idx = np.full(len(queries), -1, dtype=np.int64)
+        match_score = np.zeros(len(queries), dtype=np.float64)
+
+        entries = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for i in range(0, len(unique_keys), self.BATCH_SIZE):
+            batch = unique_keys[i:i+self.BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            for key, subject_hash, score, version in self.conn.execute(
+                    f"SELECT key, subject_hash, score, version FROM matches WHERE key IN ({placeholders})", batch):
+                entries[key] = (subject_hash, score, version)
+
+        # 需要与新增主题比较的条目
+        revalidate_rows = []
+        for row, key in enumerate(keys):
+            entry = entries.get(key)
+            if entry is None:
+                continue
+            subject_hash, score, version = entry
+            if subject_hash is not None and subject_hash not in self.first_index:
+                continue
+            cached_idx = -1 if subject_hash is None else self.first_index[subject_hash]
+
+            if version == self.version:
+                hit[row] = True
+                match_idx[row], match_score[row] = cached_idx, score
+            elif version == self.previous_version and self.order_kept:
+                match_idx[row], match_score[row] = cached_idx, score
+                revalidate_rows.append(row)
+
+        if revalidate_rows:
+            revalidate_rows = np.array(revalidate_rows)
+            match_idx[revalidate_rows], match_score[revalidate_rows] = refine_with_subjects(
+                [queries[row] for row in revalidate_rows],
+                match_idx[revalidate_rows],
+                match_score[revalidate_rows],
+                self.subjects,
+                self.added_idx,
+                threshold,
+                score_dtype
+            )
+            hit[revalidate_rows] = True
+            self.stats['revalidated'] += len(revalidate_rows)
+
+        self.stats['hits'] += int(hit.sum())
+        self.stats['misses'] += int((~hit).sum())
+        self.keys = keys
+        return hit, match_idx, match_score
+
+    def store(self, match_idx, match_score):
+        """
+        写回本次全部行的匹配结果(基于当前主题库版本)，更新主题库快照并按大小淘汰
+        """
+        rows = {}
+        for key, idx, score in zip(self.keys, match_idx.tolist(), match_score.tolist()):
+            subject_hash = int(self.subject_hashes[idx]) if idx >= 0 else None
+            rows[key] = (key, subject_hash, float(score),
+                         self.version, self.run_id)
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO matches (key, subject_hash, score, version, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows.values())
+            # 流式模式每个分块调用一次store，主题库快照只在第一次写入
+            if self.version != self.stored_version:
+                self.conn.execute("DELETE FROM subjects")
+                self.conn.executemany(
+                    "INSERT INTO subjects (pos, hash) VALUES (?, ?)",
+                    enumerate(self.subject_hashes.tolist()))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (self.version,))
+                self.stored_version = self.version
+
+            # 超出大小上限时淘汰最久未使用的条目
+            total = self.conn.execute(
+                "SELECT COUNT(*) FROM matches").fetchone()[0]
+            if total > self.max_entries:
+                excess = total - self.max_entries
+                self.conn.execute(
+                    "DELETE FROM matches WHERE key IN (SELECT key FROM matches ORDER BY last_used ASC LIMIT ?)", (excess,))
+                self.stats['evicted'] += excess
@@ -1,24 +1,26 @@
-import pandas as pd
+import numpy as np
 from fuzzywuzzy import fuzz
 from tqdm import tqdm
 import argparse
 import sys
+from table_io import read_csv_auto
+from merged_frame import assemble_merged_frame
 
 
-def merge_alm_issues(alm_path, issues_path, output_path, alm_encoding='ANSI', issues_encoding='ANSI', threshold=75):
+def merge_alm_issues(alm_path, issues_path, output_path, alm_encoding='auto', issues_encoding='auto', threshold=75):
     """
     合并ALM和Issues表格基于模糊匹配
     参数:
     alm_path -- ALM文件路径
     issues_path -- Issues文件路径
     output_path -- 输出文件路径
-    alm_encoding -- ALM文件编码 (默认: 'ANSI')
-    issues_encoding -- Issues文件编码 (默认: 'ANSI')
+    alm_encoding -- ALM文件编码，'auto'时按文件内容识别 (默认: 'auto')
+    issues_encoding -- Issues文件编码，'auto'时按文件内容识别 (默认: 'auto')
     threshold -- 模糊匹配阈值 (默认: 75)
     """
     # 读取两个CSV文件
-    alm_df = pd.read_csv(alm_path, encoding=alm_encoding)
-    issues_df = pd.read_csv(issues_path, encoding=issues_encoding)
+    alm_df = read_csv_auto(alm_path, alm_encoding)
+    issues_df = read_csv_auto(issues_path, issues_encoding)
 
     def find_best_match(query, choices, threshold=75):
         """
@@ -38,48 +40,20 @@ def merge_alm_issues(alm_path, issues_path, output_path, alm_encoding='ANSI', is
     # 为issues表创建主题列表用于匹配
     issue_subjects = issues_df['主题'].tolist()
 
-    # 创建合并结果DataFrame
-    merged_data = []
+    # 匹配结果只记录两个数组：issues行号(未匹配为-1)和匹配分数
+    match_idx = np.full(len(alm_df), -1, dtype=np.int64)
+    match_score = np.zeros(len(alm_df), dtype=np.int64)
 
     # 使用tqdm添加进度条
-    for i, alm_row in tqdm(alm_df.iterrows(), total=len(alm_df), desc="匹配进度"):
-        nonconformity = str(alm_row['不符合现象'])
+    for i, nonconformity in tqdm(enumerate(alm_df['不符合现象'].astype(str)), total=len(alm_df), desc="匹配进度"):
         # 查找最佳匹配
-        match_idx, match_score = find_best_match(
+        best_idx, best_score = find_best_match(
             nonconformity, issue_subjects, threshold)
+        if best_idx is not None:
+            match_idx[i], match_score[i] = best_idx, best_score
 
-        # 准备合并行数据
-        row_data = alm_row.to_dict()
-        # 添加匹配信息
-        row_data['匹配分数'] = match_score
-
-        # 如果找到匹配，添加issues表数据
-        if match_idx is not None:
-            matched_issue = issues_df.iloc[match_idx]
-            # 修改点：为所有issues列添加前缀（无论列名是否冲突）
-            for col in issues_df.columns:
-                # 添加"Issues_"前缀
-                row_data[f"Issues_{col}"] = matched_issue[col]
-            # 添加主题匹配结果（单独列出便于查看）
-            row_data['主题匹配结果'] = matched_issue['主题']
-            row_data['匹配状态'] = '成功匹配'
-        else:
-            # 未匹配时仍需添加issues列（保持结构一致）
-            for col in issues_df.columns:
-                row_data[f"Issues_{col}"] = ""
-            row_data['主题匹配结果'] = ""
-            row_data['匹配状态'] = '未找到匹配'
-
-        merged_data.append(row_data)
-
-    # 创建合并后的DataFrame
-    merged_df = pd.DataFrame(merged_data)
-
-    # 调整列顺序以便阅读（保持原有逻辑）
-    core_columns = ['编号', '匹配状态', '匹配分数', '不符合现象', '主题匹配结果']
-    other_columns = [
-        col for col in merged_df.columns if col not in core_columns]
-    merged_df = merged_df[core_columns + other_columns]
+    # 按列组装合并结果(与Merge_1共用)：所有issues列添加"Issues_"前缀，未匹配的行为空字符串
+    merged_df = assemble_merged_frame(alm_df, issues_df, match_idx, match_score)
 
     # 保存合并结果
     merged_df.to_csv(output_path, index=False, encoding='utf_8_sig')
@@ -104,7 +78,7 @@ if __name__ == "__main__":
         alm_path=alm_file,
         issues_path=issues_file,
         output_path=output_file,
-        alm_encoding='ANSI',
-        issues_encoding='ANSI',
+        alm_encoding='auto',
+        issues_encoding='auto',
         threshold=75
     )
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+
+# Issues表的主键列，候选匹配按它显示
+ISSUE_KEY = '#'
+
+
+def candidate_columns(issues_df, top_idx, top_score, matched, margin):
+    """
+    根据前top_k个候选生成"候选匹配"和"匹配歧义"两列
+    候选匹配形如 "#12345(88.0); #12346(85.0)"，匹配成功且第一、二名分差小于margin时标记为歧义
+
+    参数:
+    issues_df -- Issues表
+    top_idx -- 每行候选的issues行号，形状为(行数, top_k)，不足时为-1
+    top_score -- 每行候选的分数
+    matched -- 每行是否匹配成功
+    margin -- 判定歧义的分差
+    """
+    issue_ids = np.append(issues_df[ISSUE_KEY].astype(str).to_numpy(), "")
+    labels = np.where(
+        top_idx >= 0,
+        "#" + issue_ids[np.where(top_idx >= 0, top_idx, len(issues_df))].astype(object)
+        + "(" + np.char.mod('%.1f', top_score.astype(np.float64)).astype(object) + ")",
+        "")
+    candidates = ["; ".join(label for label in row if label) for row in labels]
+
+    ambiguous = matched & (top_idx[:, 1] >= 0) & (
+        top_score[:, 0].astype(np.float64) - top_score[:, 1] < margin)
+    return pd.DataFrame({
+        '候选匹配': candidates,
+        '匹配歧义': np.where(ambiguous, '是', '否'),
+    })
+
+
+def assemble_merged_frame(alm_df, issues_df, match_idx, match_score, candidates=None, margin=5):
+    """
+    按列组装合并结果：对加了"Issues_"前缀的issues表做一次take，再与ALM表按列拼接
+
+    参数:
+    alm_df -- ALM表
+    issues_df -- Issues表
+    match_idx -- 每行ALM对应的issues行号，未匹配为-1
+    match_score -- 每行ALM的匹配分数
+    candidates -- 前top_k个候选(top_idx, top_score)，指定后增加"候选匹配"和"匹配歧义"列 (默认: None)
+    margin -- 判定歧义的分差 (默认: 5)
+    """
+    match_idx = np.asarray(match_idx)
+    matched = match_idx >= 0
+
+    # 在末尾追加一行空字符串，未匹配的行统一取这一行，实现批量填充
+    prefixed = issues_df.add_prefix('Issues_').reset_index(drop=True)
+    blank_row = pd.DataFrame([[""] * len(prefixed.columns)],
+                             columns=prefixed.columns)
+    prefixed = pd.concat([prefixed, blank_row], ignore_index=True)
+    issue_part = prefixed.take(np.where(matched, match_idx, len(issues_df)))
+    issue_part = issue_part.reset_index(drop=True)
+
+    match_part = pd.DataFrame({
+        '匹配分数': np.where(matched, match_score, 0),
+        '主题匹配结果': issue_part['Issues_主题'],
+        '匹配状态': np.where(matched, '成功匹配', '未找到匹配'),
+    })
+    core_columns = ['编号', '匹配状态', '匹配分数', '不符合现象', '主题匹配结果']
+    if candidates is not None:
+        match_part = pd.concat(
+            [match_part, candidate_columns(issues_df, *candidates, matched, margin)], axis=1)
+        core_columns += ['候选匹配', '匹配歧义']
+    merged_df = pd.concat(
+        [alm_df.reset_index(drop=True), match_part, issue_part], axis=1)
+
+    # 调整列顺序以便阅读
+    other_columns = [
+        col for col in merged_df.columns if col not in core_columns]
+    return merged_df[core_columns + other_columns]
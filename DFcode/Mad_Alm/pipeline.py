@@ -0,0 +1,144 @@
+import argparse
+import sys
+import time
+
+from Merge_1 import merge_alm_issues, NORMALIZE_MODES
+from assignment import ASSIGNMENT_METHODS
+from FILL_ import process_column_mapping, WRITE_ENGINES
+from vlookup import LOOKUP_MODES
+
+
+def run_pipeline(alm_path, issues_path, mapping_file_path, excel_file_path, output_file_path, sheet_name='一元问题表', merged_path=None, write_engine='xml', lookup_mode='formula', use_plan_cache=True, plan_cache_dir=None, header_containment=False, **merge_options):
+    """
+    合并ALM/Issues后直接填表：合并结果以DataFrame在内存中传给列映射，不经过中间CSV
+    返回是否成功
+
+    参数:
+    alm_path -- ALM文件路径
+    issues_path -- Issues文件路径
+    mapping_file_path -- 映射文件路径
+    excel_file_path -- Excel模板路径
+    output_file_path -- 输出Excel路径
+    sheet_name -- 目标工作表名称 (默认: '一元问题表')
+    merged_path -- 合并结果留档路径，为None时不写出 (默认: None)
+    write_engine -- 填表写入方式，见FILL_.WRITE_ENGINES (默认: 'xml')
+    lookup_mode -- VLOOKUP公式列的写法，见vlookup.LOOKUP_MODES (默认: 'formula')
+    use_plan_cache -- 是否缓存编译后的映射计划 (默认: True)
+    plan_cache_dir -- 映射计划缓存目录 (默认: None，放在映射文件旁或环境变量DFCODE_PLAN_CACHE_DIR指定的目录)
+    header_containment -- 找不到的表头是否按包含关系匹配 (默认: False)
+    merge_options -- 其余参数传给merge_alm_issues(流式模式不适用)
+    """
+    if merge_options.get('stream_chunksize'):
+        raise ValueError("串联流程需要完整的合并结果，不支持流式模式")
+
+    start = time.perf_counter()
+    print("步骤1: 合并ALM和Issues")
+    print("=" * 50)
+    merged_df = merge_alm_issues(alm_path, issues_path, merged_path, **merge_options)
+    merge_seconds = time.perf_counter() - start
+
+    print("\n步骤2: 列映射填表")
+    print("=" * 50)
+    success = process_column_mapping(
+        mapping_file_path=mapping_file_path,
+        csv_file_path=None,
+        excel_file_path=excel_file_path,
+        output_file_path=output_file_path,
+        sheet_name=sheet_name,
+        write_engine=write_engine,
+        use_plan_cache=use_plan_cache,
+        lookup_mode=lookup_mode,
+        source_df=merged_df,
+        plan_cache_dir=plan_cache_dir,
+        header_containment=header_containment
+    )
+    total_seconds = time.perf_counter() - start
+    print(f"\n耗时: 合并 {merge_seconds:.2f} 秒，填表 {total_seconds - merge_seconds:.2f} 秒，"
+          f"共 {total_seconds:.2f} 秒")
+    return success
+
+
+def main():
+    # 创建命令行参数解析器
+    parser = argparse.ArgumentParser(description='ALM/Issues合并并填表(不经过中间CSV)')
+
+    # 合并参数
+    parser.add_argument('-a', '--alm', required=True, help='ALM文件路径')
+    parser.add_argument('-i', '--issues', required=True, help='Issues文件路径')
+    parser.add_argument('--alm-encoding', default='auto',
+                        help='ALM文件编码，auto按内容识别 (默认: auto)')
+    parser.add_argument('--issues-encoding', default='auto',
+                        help='Issues文件编码，auto按内容识别 (默认: auto)')
+    parser.add_argument('-t', '--threshold', type=int,
+                        default=75, help='模糊匹配阈值 (默认: 75)')
+    parser.add_argument('-n', '--n-workers', type=int, default=None,
+                        help='并行工作进程数 (默认: CPU核心数，最多8个)')
+    parser.add_argument('--engine', choices=['batch', 'pool'], default='batch',
+                        help='匹配引擎: batch为cdist分数矩阵, pool为多进程逐行匹配 (默认: batch)')
+    parser.add_argument('--normalize', choices=list(NORMALIZE_MODES), default='exact',
+                        help='文本预处理模式 (默认: exact)')
+    parser.add_argument('--one-to-one', nargs='?', const='auto', choices=list(ASSIGNMENT_METHODS), default=None,
+                        help='一对一分配: auto/hungarian/greedy (默认: 不启用)')
+    parser.add_argument('--cache', default=None,
+                        help='匹配结果缓存文件路径(SQLite)，不指定则不使用缓存')
+    parser.add_argument('--merged', default=None,
+                        help='合并结果留档路径(.parquet/.feather为列式格式，其余为CSV)，不指定则不写出')
+
+    # 填表参数
+    parser.add_argument('-m', '--mapping', required=True, help='映射文件路径')
+    parser.add_argument('-x', '--excel', required=True, help='Excel模板路径')
+    parser.add_argument('-o', '--output', required=True, help='输出Excel路径')
+    parser.add_argument('--sheet', default='一元问题表',
+                        help='目标工作表名称 (默认: 一元问题表)')
+    parser.add_argument('--write-engine', choices=list(WRITE_ENGINES), default='xml',
+                        help='写入方式: xml/stream/openpyxl (默认: xml)')
+    parser.add_argument('--lookup-mode', choices=list(LOOKUP_MODES), default='formula',
+                        help='VLOOKUP列: formula只写公式, value写查找结果, both写公式和缓存值 (默认: formula)')
+    parser.add_argument('--no-plan-cache', action='store_true',
+                        help='不缓存编译后的映射计划')
+    parser.add_argument('--plan-cache-dir', default=None,
+                        help='映射计划缓存目录 (默认: 映射文件旁，或环境变量DFCODE_PLAN_CACHE_DIR)')
+    parser.add_argument('--header-containment', action='store_true',
+                        help='表头精确和清理后都找不到时按包含关系匹配')
+
+    # 解析命令行参数
+    args = parser.parse_args()
+
+    try:
+        success = run_pipeline(
+            alm_path=args.alm,
+            issues_path=args.issues,
+            mapping_file_path=args.mapping,
+            excel_file_path=args.excel,
+            output_file_path=args.output,
+            sheet_name=args.sheet,
+            merged_path=args.merged,
+            write_engine=args.write_engine,
+            lookup_mode=args.lookup_mode,
+            use_plan_cache=not args.no_plan_cache,
+            plan_cache_dir=args.plan_cache_dir,
+            header_containment=args.header_containment,
+            alm_encoding=args.alm_encoding,
+            issues_encoding=args.issues_encoding,
+            threshold=args.threshold,
+            n_workers=args.n_workers,
+            engine=args.engine,
+            normalize=args.normalize,
+            one_to_one=args.one_to_one,
+            cache_path=args.cache
+        )
+    except Exception as e:
+        print(f"\n[ERROR] 处理失败: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    if success:
+        print("\n[SUCCESS] 合并并填表成功完成！")
+    else:
+        print("\n[ERROR] 填表失败！")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
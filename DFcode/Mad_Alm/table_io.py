@@ -0,0 +1,244 @@
+import os
+import json
+import codecs
+import numbers
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+except ImportError:  # 没有pyarrow时只能使用CSV
+    pa = feather = parquet = None
+
+
+# 合并结果等中间文件的格式，按扩展名选择，其余扩展名为CSV
+TABLE_FORMATS = {'.parquet': 'parquet', '.pq': 'parquet', '.feather': 'feather', '.arrow': 'feather'}
+
+
+# 编码自动识别：读取的样本字节数、候选编码(按顺序尝试)和BOM
+ENCODING_SAMPLE_BYTES = 1024 * 1024
+# GB18030是GBK的严格超集：只按样本判断时若选GBK，样本之后出现GB18030独有的字符会在读到一半时失败
+ENCODING_CANDIDATES = ('utf-8', 'gb18030')
+ENCODING_BOMS = ((codecs.BOM_UTF32_LE, 'utf_32'), (codecs.BOM_UTF32_BE, 'utf_32'),
+                 (codecs.BOM_UTF8, 'utf_8_sig'),
+                 (codecs.BOM_UTF16_LE, 'utf_16'), (codecs.BOM_UTF16_BE, 'utf_16'))
+# 识别结果可按(绝对路径, 修改时间, 大小)缓存，定时任务重复读取同一份导出时不再识别
+# 默认不缓存：设置环境变量DFCODE_ENCODING_CACHE(缓存文件路径)，或调用时传use_cache=True才写缓存文件
+ENCODING_CACHE_PATH = os.environ.get('DFCODE_ENCODING_CACHE')
+DEFAULT_ENCODING_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'dfcode', 'encodings.json')
+ENCODING_CACHE_SIZE = 256
+# 表示需要自动识别的编码参数；'ANSI'只在Windows上可用，其他平台上同样自动识别
+AUTO_ENCODINGS = ('auto', None)
+
+
+def sniff_encoding(path, sample_bytes=ENCODING_SAMPLE_BYTES):
+    """
+    根据字节内容识别文本文件的编码
+
+    先看BOM；没有BOM时跳过开头的纯ASCII部分(表头常是纯英文/数字)，取第一段含有非ASCII字节的样本，
+    依次尝试UTF-8、GB18030解码。样本末尾可能截断在多字节字符中间，用增量解码器忽略不完整的结尾。
+    Windows中文系统的"ANSI"编码(cp936/GBK)文件同样识别为GB18030：GB18030是GBK的超集(含四字节字符)，
+    GBK能解码的内容按GB18030解码结果相同，而样本之外的GB18030独有字符也不会在读到一半时出错。
+    全文都是ASCII时返回'utf-8'
+    """
+    with open(path, 'rb') as f:
+        head = f.read(4)
+        for bom, encoding in ENCODING_BOMS:
+            if head.startswith(bom):
+                return encoding
+        f.seek(0)
+        sample = b''
+        while True:
+            chunk = f.read(sample_bytes)
+            if not chunk:
+                return 'utf-8'
+            if not chunk.isascii():
+                # 从第一个非ASCII字节所在行开始取样本
+                first = next(i for i, byte in enumerate(chunk) if byte >= 0x80)
+                start = chunk.rfind(b'\n', 0, first) + 1
+                sample = chunk[start:] + f.read(max(sample_bytes - (len(chunk) - start), 0))
+                break
+
+    for encoding in ENCODING_CANDIDATES:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        except UnicodeDecodeError:
+            continue
+        return encoding
+    raise UnicodeError(f"无法识别文件编码(尝试了 {', '.join(ENCODING_CANDIDATES)}): {path}，请手动指定编码")
+
+
+def _load_encoding_cache(cache_path):
+    """
+    读取编码识别缓存，文件不存在或损坏时返回空字典
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def detect_encoding(path, use_cache=None):
+    """
+    识别文件编码，开启缓存时结果按(绝对路径, 修改时间, 大小)缓存在ENCODING_CACHE_PATH中
+
+    参数:
+    path -- 文件路径
+    use_cache -- 是否使用识别结果缓存，None时只在设置了DFCODE_ENCODING_CACHE时使用；
+                 True且未设置该环境变量时缓存在DEFAULT_ENCODING_CACHE_PATH (默认: None)
+    """
+    if use_cache is None:
+        use_cache = ENCODING_CACHE_PATH is not None
+    if not use_cache:
+        return sniff_encoding(path)
+    cache_path = ENCODING_CACHE_PATH or DEFAULT_ENCODING_CACHE_PATH
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    signature = [stat.st_mtime_ns, stat.st_size]
+    cache = _load_encoding_cache(cache_path)
+    entry = cache.get(key)
+    if entry and entry[:2] == signature:
+        return entry[2]
+
+    encoding = sniff_encoding(path)
+    cache.pop(key, None)
+    cache[key] = signature + [encoding]
+    for old_key in list(cache)[:-ENCODING_CACHE_SIZE]:
+        del cache[old_key]
+
+    # 先写临时文件再替换，多个进程同时写入时也不会读到半个文件
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # 缓存目录不可写时只是不缓存
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return encoding
+
+
+def resolve_encoding(path, encoding='auto'):
+    """
+    把编码参数解析为实际编码：'auto'/None以及当前平台不支持的编码名(如Linux上的'ANSI')自动识别
+    """
+    if encoding not in AUTO_ENCODINGS:
+        try:
+            codecs.lookup(encoding)
+            return encoding
+        except LookupError:
+            pass
+    return detect_encoding(path)
+
+
+def read_csv_auto(path, encoding='auto', **kwargs):
+    """
+    识别编码后用C解析器一次读入CSV，避免猜错编码后整表重读
+
+    参数:
+    path -- CSV文件路径
+    encoding -- 文件编码，'auto'时自动识别 (默认: 'auto')
+    kwargs -- 其余参数传给pd.read_csv
+    """
+    return pd.read_csv(path, encoding=resolve_encoding(path, encoding), engine='c', **kwargs)
+
+
+def table_format(path):
+    """
+    按扩展名判断中间文件格式: 'parquet'/'feather'/'csv'
+    """
+    return TABLE_FORMATS.get(os.path.splitext(str(path))[1].lower(), 'csv')
+
+
+def require_pyarrow(path):
+    """
+    没有安装pyarrow时给出明确的错误
+    """
+    if feather is None:
+        raise ImportError(f"读写Parquet/Feather文件需要安装pyarrow: {path}")
+
+
+def arrow_safe_frame(df):
+    """
+    列式格式要求每列类型一致：混有空文本和其他值的object列(如未匹配行填充''的Issues列)
+    按读回CSV时的类型推断转换——全是整数的列转为可空整数，全是数字的列转为浮点数，
+    其余按to_csv的写法转为文本，空值保留为空
+    """
+    mixed = [col for col in df.columns
+             if df[col].dtype == object and not all(type(v) is str for v in df[col].dropna())]
+    if not mixed:
+        return df
+    df = df.copy()
+    for col in mixed:
+        values = [None if v is None or v == '' or (isinstance(v, float) and v != v) else v
+                  for v in df[col].tolist()]
+        present = [v for v in values if v is not None]
+        if present and all(isinstance(v, numbers.Integral) and not isinstance(v, bool) for v in present):
+            df[col] = pd.array(values, dtype='Int64')
+        elif present and all(isinstance(v, numbers.Real) and not isinstance(v, bool) for v in present):
+            df[col] = [float('nan') if v is None else float(v) for v in values]
+        else:
+            df[col] = [v if v is None or type(v) is str else str(v) for v in values]
+    return df
+
+
+def write_table(df, path, encoding='utf_8_sig'):
+    """
+    按扩展名写出表格：Parquet/Feather为列式二进制格式，其余写CSV
+
+    参数:
+    df -- 要写出的表
+    path -- 输出路径
+    encoding -- CSV的编码 (默认: 'utf_8_sig')
+    """
+    fmt = table_format(path)
+    if fmt == 'csv':
+        df.to_csv(path, index=False, encoding=encoding)
+        return
+    require_pyarrow(path)
+    df = arrow_safe_frame(df.reset_index(drop=True))
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_feather(path)
+
+
+def read_table_columns(path, encoding='auto'):
+    """
+    只读取列名：Parquet/Feather读取文件中的schema，CSV只读表头
+    """
+    fmt = table_format(path)
+    if fmt == 'csv':
+        return list(read_csv_auto(path, encoding, nrows=0).columns)
+    require_pyarrow(path)
+    if fmt == 'parquet':
+        return parquet.read_schema(path).names
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).schema.names
+
+
+def read_table(path, columns=None, **csv_options):
+    """
+    按扩展名读取表格，只读取指定的列
+
+    Parquet/Feather按列读取并使用内存映射，列的类型保持写出时的类型；
+    CSV的读取参数(encoding、dtype等)通过csv_options传给read_csv_auto，编码默认自动识别
+
+    参数:
+    path -- 文件路径
+    columns -- 要读取的列，为None时读取全部 (默认: None)
+    """
+    fmt = table_format(path)
+    if fmt == 'csv':
+        return read_csv_auto(path, usecols=columns, **csv_options)
+    require_pyarrow(path)
+    if fmt == 'parquet':
+        table = parquet.read_table(path, columns=columns, memory_map=True)
+    else:
+        table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+from openpyxl import Workbook
+from openpyxl.styles import Font
+
+# 脚本按同目录模块互相导入(from table_io import ...)，测试时同样把上级目录加入搜索路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+from Merge_1 import find_best_match
+
+
+@pytest.fixture(scope='session')
+def merge_data():
+    """可复现的小规模ALM/Issues数据，含重复描述、空主题和无对应Issue的行"""
+    alm_df, issues_df = benchmark.generate_data(150, 90, seed=7)
+    issues_df.loc[5, '主题'] = None
+    return alm_df, issues_df
+
+
+@pytest.fixture(scope='session')
+def baseline_match():
+    """原版Merge_1的逐行全量扫描，作为各匹配引擎的参照，返回(匹配索引(未匹配为-1), 匹配分数)"""
+    def match(queries, issue_subjects, threshold=75):
+        results = [find_best_match(str(q), issue_subjects, threshold) for q in queries]
+        return ([-1 if idx is None else idx for idx, _ in results],
+                [score if idx is not None else 0 for idx, score in results])
+    return match
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    def write(df, name, encoding='utf_8_sig'):
+        path = tmp_path / name
+        df.to_csv(path, index=False, encoding=encoding)
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def xlsx_template(tmp_path):
+    """带表头、样式、未映射列和第二个工作表的小模板，第2-6行已有数据"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = '一元问题表'
+    ws.append(['编号', '描述', '分数', '公式', '备注'])
+    for r in range(2, 7):
+        ws.cell(r, 1, f'old{r}')
+        ws.cell(r, 2, 'old').font = Font(bold=True)
+        ws.cell(r, 5, f'keep{r}')
+    wb.create_sheet('说明')['A1'] = '不变'
+    path = tmp_path / 'template.xlsx'
+    wb.save(path)
+    return str(path)
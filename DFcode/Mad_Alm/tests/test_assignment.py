@@ -0,0 +1,83 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from assignment import candidate_edges, greedy_assignment, one_to_one_assignment
+from Merge_1 import merge_alm_issues
+
+
+def random_edges(rng, n_rows, n_cols, density=0.5):
+    mask = rng.random((n_rows, n_cols)) < density
+    rows, cols = np.nonzero(mask)
+    return rows, cols, rng.integers(75, 101, len(rows)).astype(np.float64)
+
+
+def best_total(rows, cols, scores, n_rows, n_cols):
+    """穷举全部一对一分配的最大总分"""
+    weights = np.zeros((n_rows, n_cols))
+    weights[rows, cols] = scores
+    best = 0.0
+    for perm in itertools.permutations(range(max(n_rows, n_cols)), n_rows):
+        best = max(best, sum(weights[r, c] for r, c in enumerate(perm) if c < n_cols))
+    return best
+
+
+def assert_one_to_one(match_idx, match_score, rows, cols, scores):
+    assigned = match_idx[match_idx >= 0]
+    assert len(assigned) == len(set(assigned.tolist()))
+    edges = {(r, c): s for r, c, s in zip(rows.tolist(), cols.tolist(), scores.tolist())}
+    for row, (col, score) in enumerate(zip(match_idx.tolist(), match_score.tolist())):
+        if col >= 0:
+            assert edges[(row, col)] == score
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_hungarian_is_optimal(seed):
+    rng = np.random.default_rng(seed)
+    n_rows, n_cols = (int(n) for n in rng.integers(1, 7, 2))
+    rows, cols, scores = random_edges(rng, n_rows, n_cols)
+    match_idx, match_score, stats = one_to_one_assignment(rows, cols, scores, n_rows, 'hungarian')
+    assert_one_to_one(match_idx, match_score, rows, cols, scores)
+    assert match_score.sum() == pytest.approx(best_total(rows, cols, scores, n_rows, n_cols))
+
+    greedy_idx, greedy_score = greedy_assignment(rows, cols, scores, n_rows)
+    assert_one_to_one(greedy_idx, greedy_score, rows, cols, scores)
+    assert greedy_score.sum() <= match_score.sum() + 1e-9
+
+
+def test_components_and_greedy_fallback():
+    rng = np.random.default_rng(1)
+    # 两个互不相连的分量：0-3行对0-3列，4-7行对10-13列
+    rows_a, cols_a, scores_a = random_edges(rng, 4, 4, 0.8)
+    rows_b, cols_b, scores_b = random_edges(rng, 4, 4, 0.8)
+    rows = np.concatenate([rows_a, rows_b + 4])
+    cols = np.concatenate([cols_a, cols_b + 10])
+    scores = np.concatenate([scores_a, scores_b])
+    match_idx, match_score, stats = one_to_one_assignment(rows, cols, scores, 9, 'hungarian')
+    assert stats['components'] == 2 and stats['greedy_components'] == 0
+    assert match_idx[8] == -1
+    expected = best_total(rows_a, cols_a, scores_a, 4, 4) + best_total(rows_b, cols_b, scores_b, 4, 4)
+    assert match_score.sum() == pytest.approx(expected)
+
+    _, _, stats = one_to_one_assignment(rows, cols, scores, 9, 'hungarian', max_cells=4)
+    assert stats['greedy_components'] == 2
+
+
+def test_candidate_edges_expand_duplicate_subjects():
+    top_idx = np.array([[0, 2], [0, -1]])
+    top_score = np.array([[90.0, 70.0], [80.0, 0.0]])
+    rows, cols, scores = candidate_edges(top_idx, top_score, 75, ['a', 'b', 'c', 'a'])
+    assert sorted(zip(rows.tolist(), cols.tolist(), scores.tolist())) == \
+        [(0, 0, 90.0), (0, 3, 90.0), (1, 0, 80.0), (1, 3, 80.0)]
+
+
+def test_merge_one_to_one_uses_each_issue_once(merge_data, write_csv):
+    alm_df, issues_df = merge_data
+    alm_path, issues_path = write_csv(alm_df, 'alm.csv'), write_csv(issues_df, 'issues.csv')
+    free = merge_alm_issues(alm_path, issues_path, None, n_workers=1)
+    assigned = merge_alm_issues(alm_path, issues_path, None, n_workers=1, one_to_one='hungarian')
+    keys = assigned.loc[assigned['匹配状态'] == '成功匹配', 'Issues_#']
+    assert keys.is_unique
+    assert free['Issues_#'][free['匹配状态'] == '成功匹配'].duplicated().any()
+    assert (assigned['匹配分数'] >= 75).sum() == len(keys)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from Merge_1 import batch_match, match_queries, prepare_subjects, top_k_from_scores
+
+
+@pytest.mark.parametrize('threshold', [50, 75, 90])
+def test_batch_match_equals_baseline(merge_data, baseline_match, threshold):
+    alm_df, issues_df = merge_data
+    subjects = issues_df['主题'].fillna('').tolist()
+    queries = alm_df['不符合现象'].tolist()
+
+    match_idx, match_score, candidates = batch_match(queries, subjects, threshold, workers=1)
+    expected_idx, expected_score = baseline_match(queries, subjects, threshold)
+    assert match_idx.tolist() == expected_idx
+    assert match_score.tolist() == expected_score
+    assert candidates is None
+
+
+def test_match_queries_maps_back_to_issue_rows(merge_data, baseline_match):
+    alm_df, issues_df = merge_data
+    subjects = issues_df['主题'].tolist()
+    _, forms, positions = prepare_subjects(subjects)
+    queries = alm_df['不符合现象'].tolist()
+
+    match_idx, match_score, pool_stats, _ = match_queries(
+        queries, forms, 75, 1, 'batch', subject_positions=positions)
+    expected_idx, expected_score = baseline_match(queries, subjects, 75)
+    assert match_idx.tolist() == expected_idx
+    assert match_score.tolist() == expected_score
+    assert pool_stats is None
+
+
+def test_empty_inputs():
+    match_idx, match_score, _ = batch_match([], ['a'], 75)
+    assert len(match_idx) == 0 and len(match_score) == 0
+    match_idx, _, _ = batch_match(['a'], [], 75)
+    assert match_idx.tolist() == [-1]
+
+
+def test_top_k_from_scores_orders_by_score_then_column():
+    rng = np.random.default_rng(3)
+    scores = rng.choice([0, 60, 75, 80, 100], size=(30, 12)).astype(np.float64)
+    top_idx, top_score = top_k_from_scores(scores, 4)
+    for row, idx, score in zip(scores, top_idx, top_score):
+        expected = sorted(((-s, c) for c, s in enumerate(row) if s > 0))[:4]
+        expected += [(0, -1)] * (4 - len(expected))
+        assert idx.tolist() == [c for _, c in expected]
+        assert score.tolist() == [-s for s, _ in expected]
@@ -0,0 +1,35 @@
+import pandas as pd
+
+import benchmark
+
+
+def test_generate_data_is_reproducible():
+    alm_a, issues_a = benchmark.generate_data(200, 50, seed=3)
+    alm_b, issues_b = benchmark.generate_data(200, 50, seed=3)
+    pd.testing.assert_frame_equal(alm_a, alm_b)
+    pd.testing.assert_frame_equal(issues_a, issues_b)
+    assert len(alm_a) == 200 and len(issues_a) == 50
+    assert alm_a['编号'].is_unique and issues_a['#'].is_unique
+    assert alm_a['不符合现象'].duplicated().any()        # duplicate_rate
+    assert not benchmark.generate_data(200, 50, seed=4)[0].equals(alm_a)
+
+
+def test_measure_case_reports_results_and_errors(write_csv, tmp_path):
+    alm_df, issues_df = benchmark.generate_data(60, 30, seed=1)
+    alm_path, issues_path = write_csv(alm_df, 'alm.csv', 'utf-8'), write_csv(issues_df, 'issues.csv', 'utf-8')
+    output_path = str(tmp_path / 'out.csv')
+
+    result = benchmark.measure_case('batch', alm_path, issues_path, output_path, 75, 1, timeout=120)
+    assert result['wall_time'] > 0
+    assert result['peak_rss_mb'] is None or result['peak_rss_mb'] > 0
+    assert len(benchmark.read_matches(output_path)) == 60
+
+    result = benchmark.measure_case('batch', str(tmp_path / 'missing.csv'), issues_path, output_path, 75, 1)
+    assert 'error' in result
+
+
+def test_measure_case_timeout_terminates(write_csv, tmp_path):
+    alm_df, issues_df = benchmark.generate_data(3000, 3000, seed=1)
+    alm_path, issues_path = write_csv(alm_df, 'alm.csv', 'utf-8'), write_csv(issues_df, 'issues.csv', 'utf-8')
+    result = benchmark.measure_case('merge', alm_path, issues_path, str(tmp_path / 'out.csv'), 75, 1, timeout=0.5)
+    assert '已终止' in result['error']
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from Merge_1 import merge_alm_issues
+
+
+@pytest.fixture
+def changed_exports(merge_data):
+    """在上一次导出的基础上：修改、删除、新增ALM行，修改被匹配到的Issue主题并新增Issue"""
+    alm_df, issues_df = merge_data
+    new_alm = alm_df.copy()
+    new_alm.loc[3, '不符合现象'] = issues_df.loc[40, '主题']
+    new_alm = new_alm.drop(index=[7, 8])
+    new_alm = pd.concat([new_alm, pd.DataFrame({
+        '编号': ['ALM9000000'], '不符合现象': [issues_df.loc[41, '主题']], '重要度': ['A']})],
+        ignore_index=True)
+
+    new_issues = issues_df.copy()
+    new_issues.loc[12, '主题'] = '完全不同的主题 12'
+    new_issues = pd.concat([new_issues, pd.DataFrame({
+        '#': [200000], '主题': [alm_df.loc[20, '不符合现象']], '状态': ['新建']})], ignore_index=True)
+    return new_alm, new_issues
+
+
+def test_delta_equals_full_merge(merge_data, changed_exports, write_csv, tmp_path):
+    alm_df, issues_df = merge_data
+    new_alm, new_issues = changed_exports
+    old_issues_path = write_csv(issues_df, 'issues_old.csv')
+    previous_path = str(tmp_path / 'previous.csv')
+    merge_alm_issues(write_csv(alm_df, 'alm_old.csv'), old_issues_path, previous_path, n_workers=1)
+
+    alm_path, issues_path = write_csv(new_alm, 'alm.csv'), write_csv(new_issues, 'issues.csv')
+    changelog_path = str(tmp_path / 'changes.csv')
+    delta = merge_alm_issues(alm_path, issues_path, str(tmp_path / 'delta.csv'), n_workers=1,
+                             previous_result_path=previous_path, previous_issues_path=old_issues_path,
+                             changelog_path=changelog_path)
+    full = merge_alm_issues(alm_path, issues_path, str(tmp_path / 'full.csv'), n_workers=1)
+    pd.testing.assert_frame_equal(delta, full)
+    assert (tmp_path / 'delta.csv').read_bytes() == (tmp_path / 'full.csv').read_bytes()
+
+    changes = pd.read_csv(changelog_path, dtype=str)
+    assert {'ALM0000007', 'ALM0000008', 'ALM0000003', 'ALM9000000'} <= set(changes['编号'])
+
+
+def test_duplicate_keys_are_rejected(merge_data, write_csv, tmp_path):
+    alm_df, issues_df = merge_data
+    issues_path = write_csv(issues_df, 'issues.csv')
+    previous_path = str(tmp_path / 'previous.csv')
+    merge_alm_issues(write_csv(alm_df, 'alm.csv'), issues_path, previous_path, n_workers=1)
+    duplicated = pd.concat([alm_df, alm_df.iloc[:1]], ignore_index=True)
+    with pytest.raises(ValueError, match='不唯一'):
+        merge_alm_issues(write_csv(duplicated, 'dup.csv'), issues_path, None, n_workers=1,
+                         previous_result_path=previous_path)
@@ -0,0 +1,87 @@
+import codecs
+import os
+
+import pytest
+
+import table_io
+from table_io import detect_encoding, read_csv_auto, resolve_encoding, sniff_encoding
+
+CSV_TEXT = 'id,subject\n' + ''.join(f'{i},ascii row\n' for i in range(50)) + '51,车机黑屏\n'
+
+
+def write(tmp_path, data, name='data.csv'):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def no_cache_env(tmp_path, monkeypatch):
+    """没有设置DFCODE_ENCODING_CACHE，默认缓存位置指向临时目录"""
+    default_path = str(tmp_path / 'home' / '.cache' / 'dfcode' / 'encodings.json')
+    monkeypatch.setattr(table_io, 'ENCODING_CACHE_PATH', None)
+    monkeypatch.setattr(table_io, 'DEFAULT_ENCODING_CACHE_PATH', default_path)
+    return default_path
+
+
+@pytest.mark.parametrize('data, expected', [
+    (codecs.BOM_UTF8 + CSV_TEXT.encode('utf-8'), 'utf_8_sig'),
+    (CSV_TEXT.encode('utf-16'), 'utf_16'),
+    (CSV_TEXT.encode('utf-8'), 'utf-8'),
+    (CSV_TEXT.encode('gbk'), 'gb18030'),                        # GBK(ANSI)文件按其超集读取
+    ((CSV_TEXT + '52,𠀀\n').encode('gb18030'), 'gb18030'),      # GBK中没有的四字节字符
+    (b'id,subject\n1,abc\n', 'utf-8'),
+])
+def test_sniff_encoding(tmp_path, data, expected):
+    path = write(tmp_path, data)
+    assert sniff_encoding(path) == expected
+    assert read_csv_auto(path)['subject'].iloc[-1] == data.decode(expected).splitlines()[-1].split(',')[1]
+
+
+def test_sample_cut_inside_a_character(tmp_path):
+    # 样本在多字节字符中间截断时不能误判为其他编码
+    path = write(tmp_path, ('a\n' + '黑屏' * 100).encode('utf-8'))
+    assert sniff_encoding(path, sample_bytes=8) == 'utf-8'
+
+
+def test_gb18030_character_after_the_sample(tmp_path):
+    # 样本内全是GBK也能解码的字符，GB18030独有的字符在样本之后出现
+    rows = ''.join(f'{i},车机黑屏\n' for i in range(table_io.ENCODING_SAMPLE_BYTES // 10))
+    path = write(tmp_path, ('id,subject\n' + rows + 'x,㐀\n').encode('gb18030'))
+    assert os.path.getsize(path) > table_io.ENCODING_SAMPLE_BYTES
+    assert sniff_encoding(path) == 'gb18030'
+    assert read_csv_auto(path)['subject'].iloc[-1] == '㐀'
+
+
+def test_undecodable_file_raises(tmp_path):
+    with pytest.raises(UnicodeError):
+        sniff_encoding(write(tmp_path, b'a\n\xff\xff\xff\xff'))
+
+
+def test_explicit_encoding_wins(tmp_path):
+    path = write(tmp_path, CSV_TEXT.encode('gbk'))
+    assert resolve_encoding(path, 'gb18030') == 'gb18030'
+    assert resolve_encoding(path, 'ANSI-not-here') == 'gb18030'
+
+
+def test_no_cache_by_default(tmp_path, no_cache_env):
+    path = write(tmp_path, CSV_TEXT.encode('gbk'))
+    assert detect_encoding(path) == 'gb18030'
+    assert not os.path.exists(no_cache_env)
+    assert detect_encoding(path, use_cache=True) == 'gb18030'
+    assert os.path.exists(no_cache_env)
+
+
+def test_cache_via_environment(tmp_path, no_cache_env, monkeypatch):
+    cache_path = str(tmp_path / 'encodings.json')
+    monkeypatch.setattr(table_io, 'ENCODING_CACHE_PATH', cache_path)
+    path = write(tmp_path, CSV_TEXT.encode('gbk'))
+    assert detect_encoding(path) == 'gb18030'
+    assert os.path.exists(cache_path) and not os.path.exists(no_cache_env)
+
+    # 命中缓存时不再识别；文件变化后重新识别
+    monkeypatch.setattr(table_io, 'sniff_encoding', lambda *args: pytest.fail('缓存未命中'))
+    assert detect_encoding(path) == 'gb18030'
+    monkeypatch.setattr(table_io, 'sniff_encoding', sniff_encoding)
+    write(tmp_path, CSV_TEXT.encode('utf-8') + b'more\n')
+    assert detect_encoding(path) == 'utf-8'
@@ -0,0 +1,88 @@
+import json
+import os
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from FILL_ import process_column_mapping
+from fill_batch import fill_batch, load_jobs
+
+
+def write_jobs(tmp_path, jobs):
+    path = tmp_path / 'jobs.json'
+    path.write_text(json.dumps(jobs, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def sheet_rows(path):
+    return list(openpyxl.load_workbook(path).active.iter_rows(values_only=True))
+
+
+def test_load_jobs_paths_and_defaults(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'sub').mkdir()
+    jobs_path = write_jobs(tmp_path / 'sub', [{'template': 'a.xlsx', 'output': 'out/a.xlsx'},
+                                              {'template': '/abs/b.xlsx', 'output': 'b.xlsx', 'sheet': 'S', 'mapping': 'm.txt'}])
+    jobs = load_jobs(jobs_path, default_mapping='default.txt')
+    assert jobs[0] == {'id': 1, 'sheet': '一元问题表', 'mapping': str(tmp_path / 'default.txt'),
+                       'template': str(tmp_path / 'sub' / 'a.xlsx'), 'output': str(tmp_path / 'sub' / 'out' / 'a.xlsx')}
+    assert jobs[1]['template'] == '/abs/b.xlsx' and jobs[1]['sheet'] == 'S'
+    assert jobs[1]['mapping'] == str(tmp_path / 'sub' / 'm.txt')
+
+
+def test_load_jobs_validation(tmp_path):
+    with pytest.raises(ValueError, match='第1个任务缺少: mapping'):
+        load_jobs(write_jobs(tmp_path, [{'template': 'a.xlsx', 'output': 'a_out.xlsx'}]))
+    with pytest.raises(ValueError, match='输出文件相同'):
+        load_jobs(write_jobs(tmp_path, [{'template': 'a.xlsx', 'output': 'x.xlsx'},
+                                        {'template': 'b.xlsx', 'output': './x.xlsx'}]), 'm.txt')
+
+
+def test_fill_batch_matches_single_fill(tmp_path):
+    data = pd.DataFrame({'不符合现象': ['黑屏', '', '无声'], 'Issues_#': ['1', '', '3']})
+    data.to_csv(tmp_path / 'merged.csv', index=False, encoding='utf_8_sig')
+    (tmp_path / 'mapping.txt').write_text('描述 --> 不符合现象\n单号 --> Issues_#\n', encoding='utf-8')
+    for name, headers in (('a', ['序号', '描述', '单号']), ('b', ['序号', '单号', '其他', '描述']), ('bad', ['序号'])):
+        wb = openpyxl.Workbook()
+        wb.active.title = '一元问题表'
+        wb.active.append(headers)
+        wb.save(tmp_path / f'{name}.xlsx')
+    jobs = load_jobs(write_jobs(tmp_path, [{'template': f'{name}.xlsx', 'output': f'{name}_out.xlsx'}
+                                           for name in ('a', 'b', 'bad')] +
+                                [{'template': 'a.xlsx', 'output': 'nosheet_out.xlsx', 'sheet': '不存在'}]),
+                     str(tmp_path / 'mapping.txt'))
+
+    reports = fill_batch(str(tmp_path / 'merged.csv'), jobs, n_workers=2, report_path=str(tmp_path / 'report.json'))
+    assert [report['id'] for report in reports] == [1, 2, 3, 4]
+    assert [report['success'] for report in reports] == [True, True, True, False]
+    assert reports[3]['error'] and reports[3]['log_tail']
+    assert json.loads((tmp_path / 'report.json').read_text(encoding='utf-8'))['rows'] == 3
+
+    for name in ('a', 'b'):
+        expected = str(tmp_path / f'{name}_single.xlsx')
+        process_column_mapping(str(tmp_path / 'mapping.txt'), str(tmp_path / 'merged.csv'),
+                               str(tmp_path / f'{name}.xlsx'), expected, use_plan_cache=False)
+        assert sheet_rows(tmp_path / f'{name}_out.xlsx') == sheet_rows(expected)
+    assert os.path.exists(tmp_path / 'bad_out.xlsx')
+
+
+def test_header_containment_reaches_workers(tmp_path):
+    pd.DataFrame({'Issues_主题': ['黑屏', '无声']}).to_csv(tmp_path / 'merged.csv', index=False, encoding='utf_8_sig')
+    (tmp_path / 'mapping.txt').write_text('描述 --> 主题\n', encoding='utf-8')
+    wb = openpyxl.Workbook()
+    wb.active.title = '一元问题表'
+    wb.active.append(['序号', '问题描述'])
+    wb.save(tmp_path / 'a.xlsx')
+    jobs = load_jobs(write_jobs(tmp_path, [{'template': 'a.xlsx', 'output': 'a_out.xlsx'}]),
+                     str(tmp_path / 'mapping.txt'))
+
+    fill_batch(str(tmp_path / 'merged.csv'), jobs, n_workers=1)
+    assert [row[1] for row in sheet_rows(tmp_path / 'a_out.xlsx')[1:]] == [None, None]
+    fill_batch(str(tmp_path / 'merged.csv'), jobs, n_workers=1, header_containment=True)
+    assert [row[1] for row in sheet_rows(tmp_path / 'a_out.xlsx')[1:]] == ['黑屏', '无声']
+
+    single = str(tmp_path / 'single.xlsx')
+    assert process_column_mapping(str(tmp_path / 'mapping.txt'), str(tmp_path / 'merged.csv'),
+                                  str(tmp_path / 'a.xlsx'), single, header_containment=True)
+    assert sheet_rows(single) == sheet_rows(tmp_path / 'a_out.xlsx')
@@ -0,0 +1,31 @@
+from header_index import clean_header, csv_header_index, excel_header_index, HeaderIndex
+
+
+def test_clean_header():
+    assert clean_header(' 问题\n描述 \r') == '问题描述'
+
+
+def test_exact_before_cleaned():
+    index = excel_header_index([(1, '编号'), (2, '问题\n描述'), (3, '问题描述')])
+    assert index.resolve('问题\n描述') == (2, '问题\n描述', '精确')
+    assert index.resolve('问题 描述') == (3, '问题描述', '清理')     # 同名时以后出现的为准
+    assert index.resolve('编 号') == (1, '编号', '清理')
+
+
+def test_containment_is_off_by_default():
+    headers = [(1, '编号'), (2, '问题描述(必填)')]
+    assert excel_header_index(headers).resolve('问题描述') == (None, None, None)
+    assert excel_header_index(headers, containment=True).resolve('问题描述') == (2, '问题描述(必填)', '包含')
+    assert excel_header_index(headers, containment=True).resolve('状态') == (None, None, None)
+
+
+def test_csv_index_ignores_underscores_only_for_containment():
+    columns = ['issue_id', 'Issue Subject']
+    assert csv_header_index(columns).resolve('IssueSubject') == ('Issue Subject', 'Issue Subject', '清理')
+    assert csv_header_index(columns).resolve('issueid') == (None, None, None)
+    assert csv_header_index(columns, containment=True).resolve('issueid') == ('issue_id', 'issue_id', '包含')
+
+
+def test_empty_query_never_matches_by_containment():
+    index = HeaderIndex([(1, 'a')], containment=True)
+    assert index.resolve(' ') == (None, None, None)
@@ -0,0 +1,104 @@
+import os
+
+import pandas as pd
+
+import mapping_plan
+from mapping_plan import compile_mapping, execute_plan, load_mapping_plan, parse_mapping_file, plan_cache_path
+
+EXCEL_HEADERS = [(1, '序号'), (2, '问题\n描述'), (3, '分数'), (4, '状态'), (5, '查找'), (6, '备注')]
+CSV_COLUMNS = ['ALM编号', 'Issue Subject', '匹配分数']
+MAPPING = '''# 注释行
+问题描述 --> Issue Subject
+分数 --> 匹配 分数
+状态 --> "待确认"
+查找 --> =VLOOKUP(Ci,QIS表格!D:G,4,0) i为当前行号
+备注 --> null
+不存在 --> ALM编号
+'''
+
+
+def write_mapping(tmp_path, text=MAPPING, name='mapping.txt'):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+def test_compile_and_execute(tmp_path):
+    rules = parse_mapping_file(write_mapping(tmp_path))
+    plan = compile_mapping(rules, EXCEL_HEADERS, CSV_COLUMNS, sheet_names=['一元问题表'])
+    ops = {rule['target']: rule for rule in plan}
+    assert plan[0]['op'] == 'sequence' and plan[0]['excel_match'] == '默认'
+    assert ops['问题描述']['excel_idx'] == 2 and ops['问题描述']['excel_match'] == '清理'
+    assert ops['分数']['csv_column'] == '匹配分数'
+    assert ops['查找']['template'] == '=VLOOKUP(C{row},QIS表格!D:G,4,0)' and ops['查找']['note'] == 'i为当前行号'
+    assert 'QIS表格' in ops['查找']['warning']
+    assert ops['备注']['op'] == 'skip'
+    assert ops['不存在']['error'] == 'Excel中未找到列: 不存在'
+
+    df = pd.DataFrame({'ALM编号': ['1', '2'], 'Issue Subject': [' a ', None], '匹配分数': [90.5, 80]})
+    columns = execute_plan(plan, df, first_row=2)
+    assert sorted(columns) == [1, 2, 3, 4, 5]
+    assert list(columns[1]) == [1, 2]
+    assert columns[2] == ['a', ''] and columns[3] == ['90.5', '80.0'] and columns[4] == ['待确认'] * 2
+    assert columns[5] == ['=VLOOKUP(C2,QIS表格!D:G,4,0)', '=VLOOKUP(C3,QIS表格!D:G,4,0)']
+
+
+def test_plan_cache_reuse_and_invalidation(tmp_path):
+    mapping_path = write_mapping(tmp_path)
+    rules = parse_mapping_file(mapping_path)
+    plan, hit = load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS)
+    assert not hit and os.path.exists(f'{mapping_path}.plan.json')
+    cached, hit = load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS)
+    assert hit and cached == plan
+
+    # 映射规则或表头变化时重新编译
+    rules['状态'] = '"已关闭"'
+    assert not load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS)[1]
+    assert not load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS + ['新列'])[1]
+    assert load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS)[1]
+    assert not load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS, use_cache=False)[1]
+
+
+def test_corrupt_cache_is_recompiled(tmp_path):
+    mapping_path = write_mapping(tmp_path)
+    with open(f'{mapping_path}.plan.json', 'w', encoding='utf-8') as f:
+        f.write('{not json')
+    rules = parse_mapping_file(mapping_path)
+    assert not load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS)[1]
+    assert load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS)[1]
+
+
+def test_cache_dir(tmp_path, monkeypatch):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    path_a = write_mapping(tmp_path, name='a/mapping.txt')
+    path_b = write_mapping(tmp_path, name='b/mapping.txt')
+    cache_dir = str(tmp_path / 'cache')
+    # 不同目录下的同名映射文件互不覆盖
+    assert plan_cache_path(path_a, cache_dir) != plan_cache_path(path_b, cache_dir)
+    assert os.path.dirname(plan_cache_path(path_a, cache_dir)) == cache_dir
+
+    rules = parse_mapping_file(path_a)
+    load_mapping_plan(path_a, rules, EXCEL_HEADERS, CSV_COLUMNS, cache_dir=cache_dir)
+    assert os.path.exists(plan_cache_path(path_a, cache_dir))
+    assert not os.path.exists(f'{path_a}.plan.json')
+
+    monkeypatch.setattr(mapping_plan, 'PLAN_CACHE_DIR', cache_dir)
+    assert plan_cache_path(path_b) == plan_cache_path(path_b, cache_dir)
+    assert load_mapping_plan(path_a, rules, EXCEL_HEADERS, CSV_COLUMNS)[1]
+
+
+def test_header_containment_opt_in(tmp_path):
+    mapping_path = write_mapping(tmp_path, '描述 --> Subject\n')
+    rules = parse_mapping_file(mapping_path)
+    strict, hit = load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS)
+    assert not hit and strict[-1]['error'] == 'Excel中未找到列: 描述'
+
+    # 开启包含匹配时单独缓存，不会复用严格模式的计划
+    loose, hit = load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS, containment=True)
+    assert not hit
+    rule = loose[-1]
+    assert rule['error'] is None and rule['excel_idx'] == 2 and rule['excel_match'] == '包含'
+    assert rule['csv_column'] == 'Issue Subject' and rule['csv_match'] == '包含'
+    assert load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS, containment=True) == (loose, True)
+    assert load_mapping_plan(mapping_path, rules, EXCEL_HEADERS, CSV_COLUMNS) == (strict, True)
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from match_cache import MatchCache
+from text_normalize import normalize_text
+from Merge_1 import merge_alm_issues
+
+
+def run_with_cache(cache_path, queries, subjects, baseline_match, threshold=75, max_entries=200000):
+    """查缓存，未命中的行用全量扫描补齐后写回，返回(结果, 命中掩码, 统计)"""
+    cache = MatchCache(cache_path, max_entries)
+    cache.sync_corpus(subjects)
+    hit, match_idx, match_score = cache.lookup(queries, threshold, 'float64')
+    todo = np.flatnonzero(~hit)
+    todo_idx, todo_score = baseline_match([queries[i] for i in todo], subjects, threshold)
+    match_idx[todo], match_score[todo] = todo_idx, todo_score
+    cache.store(match_idx, match_score)
+    stats = cache.stats
+    cache.close()
+    return (match_idx.tolist(), match_score.tolist()), hit, stats
+
+
+def test_second_run_is_all_hits(merge_data, baseline_match, tmp_path):
+    alm_df, issues_df = merge_data
+    queries, subjects = alm_df['不符合现象'].tolist(), issues_df['主题'].tolist()
+    cache_path = str(tmp_path / 'cache.db')
+    first, hit, _ = run_with_cache(cache_path, queries, subjects, baseline_match)
+    assert not hit.any()
+    second, hit, _ = run_with_cache(cache_path, queries, subjects, baseline_match)
+    assert hit.all()
+    assert first == second == tuple(baseline_match(queries, subjects))
+
+
+def test_key_includes_match_settings():
+    assert MatchCache.make_key('a b', 75, 'float64') != MatchCache.make_key('a b', 80, 'float64')
+    assert MatchCache.make_key('a b', 75, 'float64') != MatchCache.make_key('a b', 75, 'uint8')
+    assert MatchCache.make_key('a b', 75, 'float64') != MatchCache.make_key('a b', 75, 'float64', 'cjk')
+    # token_set_ratio只看token集合，顺序和重复不同的文本共用一个条目
+    assert normalize_text('b a a') == normalize_text(' a  b')
+    assert MatchCache.make_key('b a a', 75, 'float64') == MatchCache.make_key('a b', 75, 'float64')
+
+
+def test_key_follows_matcher_normalization():
+    # 缓存键与匹配使用同一个normalize_text：规范形式相同则共用条目，否则不共用
+    for mode in ('exact', 'cjk'):
+        for a, b in [('ＡＢ，显示', 'ab 显示'), ('屏幕 闪烁', '闪烁屏幕'), ('b a a', 'a b')]:
+            same = normalize_text(a, mode) == normalize_text(b, mode)
+            assert (MatchCache.make_key(a, 75, 'float64', mode) ==
+                    MatchCache.make_key(b, 75, 'float64', mode)) == same
+    assert normalize_text('ＡＢ，显示', 'cjk') == normalize_text('ab 显示', 'cjk')
+    assert normalize_text('ＡＢ，显示') != normalize_text('ab 显示')
+    # 已规范化的查询(Merge_1传入的形式)与原文得到相同的键
+    raw = 'ＡＢ，显示 闪烁'
+    assert (MatchCache.make_key(normalize_text(raw, 'cjk'), 75, 'float64', 'cjk') ==
+            MatchCache.make_key(raw, 75, 'float64', 'cjk'))
+
+
+def test_changed_corpus_equals_fresh_match(merge_data, baseline_match, tmp_path):
+    alm_df, issues_df = merge_data
+    queries, subjects = alm_df['不符合现象'].tolist(), issues_df['主题'].tolist()
+    cache_path = str(tmp_path / 'cache.db')
+    run_with_cache(cache_path, queries, subjects, baseline_match)
+
+    # 新增与某些ALM描述完全相同的主题(分数更高)，并删除若干被匹配到的主题
+    changed = subjects[10:] + queries[:5]
+    result, hit, stats = run_with_cache(cache_path, queries, changed, baseline_match)
+    assert result == tuple(baseline_match(queries, changed))
+    assert stats['revalidated'] > 0 and not hit.all()
+
+
+def test_reordered_corpus_is_rematched(merge_data, baseline_match, tmp_path):
+    alm_df, issues_df = merge_data
+    queries, subjects = alm_df['不符合现象'].tolist(), issues_df['主题'].tolist()
+    cache_path = str(tmp_path / 'cache.db')
+    run_with_cache(cache_path, queries, subjects, baseline_match)
+    reordered = subjects[::-1]
+    result, hit, _ = run_with_cache(cache_path, queries, reordered, baseline_match)
+    assert not hit.any()
+    assert result == tuple(baseline_match(queries, reordered))
+
+
+def test_eviction_keeps_max_entries(merge_data, baseline_match, tmp_path):
+    alm_df, issues_df = merge_data
+    queries, subjects = alm_df['不符合现象'].tolist(), issues_df['主题'].tolist()
+    cache_path = str(tmp_path / 'cache.db')
+    _, _, stats = run_with_cache(cache_path, queries, subjects, baseline_match, max_entries=20)
+    cache = MatchCache(cache_path)
+    assert cache.conn.execute('SELECT COUNT(*) FROM matches').fetchone()[0] == 20
+    assert stats['evicted'] == len(set(map(normalize_text, queries))) - 20
+    cache.close()
+
+
+def test_merge_with_cache_equals_without(merge_data, write_csv, tmp_path):
+    alm_df, issues_df = merge_data
+    alm_path = write_csv(alm_df, 'alm.csv')
+    cache_path = str(tmp_path / 'cache.db')
+    merge_alm_issues(alm_path, write_csv(issues_df, 'issues.csv'), None, cache_path=cache_path, n_workers=1)
+
+    new_issues = pd.concat([issues_df.iloc[3:], issues_df.iloc[:2]], ignore_index=True)
+    new_issues_path = write_csv(new_issues, 'issues2.csv')
+    cached = merge_alm_issues(alm_path, new_issues_path, None, cache_path=cache_path, n_workers=1)
+    fresh = merge_alm_issues(alm_path, new_issues_path, None, n_workers=1)
+    pd.testing.assert_frame_equal(cached, fresh)
+
+
+def test_subjects_snapshot_written_once_per_run(merge_data, baseline_match, tmp_path):
+    alm_df, issues_df = merge_data
+    queries, subjects = alm_df['不符合现象'].tolist(), issues_df['主题'].tolist()
+    cache_path = str(tmp_path / 'cache.db')
+    run_with_cache(cache_path, queries, subjects, baseline_match)
+
+    # 主题库变化后按分块查询和写回(流式模式)，快照只写一次，后续分块仍做增量校验
+    changed = subjects + queries[:3]
+    cache = MatchCache(cache_path)
+    statements = []
+    cache.conn.set_trace_callback(statements.append)
+    cache.sync_corpus(changed)
+    chunks = [queries[i:i + 40] for i in range(0, len(queries), 40)]
+    results = ([], [])
+    for chunk in chunks:
+        hit, match_idx, match_score = cache.lookup(chunk, 75, 'float64')
+        todo = np.flatnonzero(~hit)
+        match_idx[todo], match_score[todo] = baseline_match([chunk[i] for i in todo], changed)
+        cache.store(match_idx, match_score)
+        results[0].extend(match_idx.tolist())
+        results[1].extend(match_score.tolist())
+    cache.close()
+    assert len(chunks) > 1
+    assert sum(s.startswith('DELETE FROM subjects') for s in statements) == 1
+    assert sum(s.startswith('INSERT INTO subjects') for s in statements) == len(changed)
+    assert cache.stats['misses'] == 0 and cache.stats['revalidated'] > 0
+    assert results == tuple(baseline_match(queries, changed))
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import merge
+from merged_frame import assemble_merged_frame
+from Merge_1 import merge_alm_issues
+
+
+def baseline_merged_frame(alm_df, issues_df, match_idx, match_score):
+    """原版Merge_1逐行拼字典的组装方式"""
+    rows = []
+    for (_, alm_row), idx, score in zip(alm_df.iterrows(), match_idx, match_score):
+        row = alm_row.to_dict()
+        row['匹配分数'] = score
+        matched = issues_df.iloc[idx] if idx >= 0 else None
+        for col in issues_df.columns:
+            row[f"Issues_{col}"] = matched[col] if matched is not None else ""
+        row['主题匹配结果'] = matched['主题'] if matched is not None else ""
+        row['匹配状态'] = '成功匹配' if matched is not None else '未找到匹配'
+        rows.append(row)
+    merged = pd.DataFrame(rows)
+    core = ['编号', '匹配状态', '匹配分数', '不符合现象', '主题匹配结果']
+    return merged[core + [col for col in merged.columns if col not in core]]
+
+
+def as_csv_text(df, path):
+    df.to_csv(path, index=False, encoding='utf_8_sig')
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def test_assemble_equals_row_wise(merge_data, tmp_path):
+    alm_df, issues_df = merge_data
+    rng = np.random.default_rng(0)
+    match_idx = rng.integers(-1, len(issues_df), len(alm_df))
+    match_score = np.where(match_idx >= 0, rng.integers(75, 101, len(alm_df)), 0)
+
+    merged = assemble_merged_frame(alm_df, issues_df, match_idx, match_score)
+    expected = baseline_merged_frame(alm_df, issues_df, match_idx, match_score)
+    assert list(merged.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(as_csv_text(merged, tmp_path / 'a.csv'),
+                                  as_csv_text(expected, tmp_path / 'b.csv'))
+
+
+@pytest.mark.parametrize('engine', ['batch', 'pool'])
+def test_merge_file_equals_baseline(merge_data, baseline_match, write_csv, tmp_path, engine):
+    alm_df, issues_df = merge_data
+    alm_path, issues_path = write_csv(alm_df, 'alm.csv'), write_csv(issues_df, 'issues.csv', 'gbk')
+    output_path = str(tmp_path / 'merged.csv')
+    merge_alm_issues(alm_path, issues_path, output_path, threshold=75, n_workers=2, engine=engine)
+
+    issues_read = pd.read_csv(issues_path, encoding='gbk')
+    match_idx, match_score = baseline_match(alm_df['不符合现象'], issues_read['主题'].tolist(), 75)
+    expected = baseline_merged_frame(pd.read_csv(alm_path), issues_read, match_idx, match_score)
+    pd.testing.assert_frame_equal(pd.read_csv(output_path, dtype=str, keep_default_na=False),
+                                  as_csv_text(expected, tmp_path / 'expected.csv'))
+
+
+def test_both_entry_points_share_the_layout(merge_data, write_csv, tmp_path):
+    # merge.py用fuzzywuzzy逐行匹配，分数与rapidfuzz不同；列顺序和未匹配行的写法与Merge_1一致
+    alm_df, issues_df = merge_data
+    alm_path, issues_path = write_csv(alm_df.head(40), 'alm.csv'), write_csv(issues_df, 'issues.csv')
+    merge.merge_alm_issues(alm_path, issues_path, str(tmp_path / 'merge.csv'))
+    merge_alm_issues(alm_path, issues_path, str(tmp_path / 'merge_1.csv'))
+    merged = pd.read_csv(tmp_path / 'merge.csv', dtype=str, keep_default_na=False)
+    assert list(merged.columns) == list(pd.read_csv(tmp_path / 'merge_1.csv', nrows=0).columns)
+
+    matched = merged['匹配状态'] == '成功匹配'
+    assert matched.any() and (~matched).any()
+    issue_columns = [col for col in merged.columns if col.startswith('Issues_')]
+    assert (merged.loc[~matched, issue_columns] == '').all().all()
+    assert (merged.loc[~matched, '匹配分数'] == '0').all()
+    assert (merged.loc[matched, '主题匹配结果'] == merged.loc[matched, 'Issues_主题']).all()
@@ -0,0 +1,32 @@
+import numpy as np
+from rapidfuzz import fuzz
+
+from Merge_1 import normalize_text, prepare_subjects
+
+
+def test_exact_forms_keep_token_set_ratio(merge_data):
+    alm_df, issues_df = merge_data
+    subjects = issues_df['主题'].dropna().tolist()[:30]
+    for query in alm_df['不符合现象'][:30]:
+        q = normalize_text(query)
+        for subject in subjects:
+            assert fuzz.token_set_ratio(q, normalize_text(subject), processor=None) == \
+                fuzz.token_set_ratio(query, subject)
+
+
+def test_exact_form_is_sorted_unique_tokens():
+    assert normalize_text('b  a\nb\ta') == 'a b'
+    assert normalize_text('   ') == ''
+
+
+def test_cjk_mode():
+    assert normalize_text('ＡＢ，车机黑屏！', 'cjk') == 'ab 屏 机 车 黑'
+
+
+def test_prepare_subjects_dedups_to_first_position():
+    subjects = ['b a', None, 'a b', float('nan'), 'c', '  ', 'c']
+    normalized, forms, first_idx = prepare_subjects(subjects)
+    assert normalized == ['a b', None, 'a b', None, 'c', '', 'c']
+    assert forms == ['a b', 'c']
+    assert first_idx.tolist() == [0, 4]
+    assert first_idx.dtype == np.int64
@@ -0,0 +1,53 @@
+import openpyxl
+import pytest
+
+from FILL_ import process_column_mapping
+from pipeline import run_pipeline
+
+HEADERS = ['序号', '描述', '重要度', 'redmine单号', 'redmine状态', '匹配', '固定']
+MAPPING = '''描述 --> 不符合现象
+重要度 --> 重要度
+redmine单号 --> Issues_#
+redmine状态 --> Issues_状态
+匹配 --> =IF(Di="","未匹配","已匹配")
+固定 --> "ALM"
+'''
+
+
+@pytest.fixture
+def fill_inputs(tmp_path, merge_data, write_csv):
+    alm_df, issues_df = merge_data
+    wb = openpyxl.Workbook()
+    wb.active.title = '一元问题表'
+    wb.active.append(HEADERS)
+    wb.save(tmp_path / 'template.xlsx')
+    (tmp_path / 'mapping.txt').write_text(MAPPING, encoding='utf-8')
+    return (write_csv(alm_df, 'alm.csv'), write_csv(issues_df, 'issues.csv'),
+            str(tmp_path / 'mapping.txt'), str(tmp_path / 'template.xlsx'))
+
+
+def sheet_values(path):
+    return [list(row) for row in openpyxl.load_workbook(path)['一元问题表'].iter_rows(values_only=True)]
+
+
+@pytest.mark.parametrize('write_engine', ['xml', 'openpyxl'])
+def test_pipeline_equals_merge_then_fill(fill_inputs, tmp_path, write_engine):
+    alm_path, issues_path, mapping_path, template_path = fill_inputs
+    merged_path = str(tmp_path / 'merged.csv')
+    assert run_pipeline(alm_path, issues_path, mapping_path, template_path, str(tmp_path / 'pipeline.xlsx'),
+                        merged_path=merged_path, write_engine=write_engine, use_plan_cache=False)
+    assert process_column_mapping(mapping_path, merged_path, template_path, str(tmp_path / 'fill.xlsx'),
+                                  write_engine=write_engine, use_plan_cache=False)
+
+    rows = sheet_values(tmp_path / 'pipeline.xlsx')
+    assert rows == sheet_values(tmp_path / 'fill.xlsx')
+    assert len(rows) == 151 and rows[0] == HEADERS
+    assert [row[0] for row in rows[1:4]] == [1, 2, 3]
+    assert any(row[3] for row in rows[1:]) and all(row[6] == 'ALM' for row in rows[1:])
+
+
+def test_pipeline_rejects_stream_mode(fill_inputs, tmp_path):
+    alm_path, issues_path, mapping_path, template_path = fill_inputs
+    with pytest.raises(ValueError):
+        run_pipeline(alm_path, issues_path, mapping_path, template_path, str(tmp_path / 'out.xlsx'),
+                     stream_chunksize=10)
@@ -0,0 +1,24 @@
+import pickle
+
+import pytest
+
+from Merge_1 import SubjectIndex, match_queries, prepare_subjects
+
+
+@pytest.mark.parametrize('use_index', [True, False])
+def test_pool_engine_equals_baseline(merge_data, baseline_match, use_index):
+    alm_df, issues_df = merge_data
+    subjects = issues_df['主题'].tolist()
+    _, forms, positions = prepare_subjects(subjects)
+    queries = alm_df['不符合现象'].tolist()
+    index = SubjectIndex(forms) if use_index else None
+
+    match_idx, match_score, pool_stats, _ = match_queries(
+        queries, forms, 75, 2, 'pool', subject_index=index, subject_positions=positions)
+    expected_idx, expected_score = baseline_match(queries, subjects, 75)
+    assert match_idx.tolist() == expected_idx
+    assert match_score.tolist() == expected_score
+
+    # 每块只传行号范围，主题库每个工作进程只传一次
+    assert pool_stats['chunk_bytes'] < 100
+    assert pool_stats['shared_bytes'] >= len(pickle.dumps(forms))
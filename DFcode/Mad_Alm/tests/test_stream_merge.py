@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from Merge_1 import SubjectIndex, create_match_pool, match_queries, merge_alm_issues, prepare_subjects
+
+
+@pytest.mark.parametrize('engine', ['batch', 'pool'])
+def test_stream_equals_in_memory(merge_data, write_csv, tmp_path, engine):
+    alm_df, issues_df = merge_data
+    alm_path, issues_path = write_csv(alm_df, 'alm.csv'), write_csv(issues_df, 'issues.csv')
+    merge_alm_issues(alm_path, issues_path, str(tmp_path / 'full.csv'), n_workers=2, engine=engine)
+    merge_alm_issues(alm_path, issues_path, str(tmp_path / 'stream.csv'), n_workers=2, engine=engine,
+                     stream_chunksize=40)
+    read = lambda name: pd.read_csv(tmp_path / name, dtype=str, keep_default_na=False)
+    pd.testing.assert_frame_equal(read('stream.csv'), read('full.csv'))
+
+
+def test_shared_pool_across_chunks(merge_data):
+    alm_df, issues_df = merge_data
+    _, forms, positions = prepare_subjects(issues_df['主题'].tolist())
+    index = SubjectIndex(forms)
+    queries = alm_df['不符合现象'].tolist()
+    expected = match_queries(queries, forms, 75, 2, 'pool', subject_index=index,
+                             subject_positions=positions, top_k=3, margin=5)
+
+    with create_match_pool(forms, 75, 2, index, top_k=3, margin=5) as pool:
+        parts = [match_queries(queries[start:start + 40], forms, 75, 2, 'pool', subject_index=index,
+                               subject_positions=positions, top_k=3, margin=5, pool=pool)
+                 for start in range(0, len(queries), 40)]
+    assert sum((part[0].tolist() for part in parts), []) == expected[0].tolist()
+    assert sum((part[1].tolist() for part in parts), []) == expected[1].tolist()
+    assert sum((part[3][0].tolist() for part in parts), []) == expected[3][0].tolist()
+
+
+def test_stream_rejects_unsupported_options(write_csv, merge_data, tmp_path):
+    alm_df, issues_df = merge_data
+    alm_path, issues_path = write_csv(alm_df, 'alm.csv'), write_csv(issues_df, 'issues.csv')
+    with pytest.raises(ValueError):
+        merge_alm_issues(alm_path, issues_path, None, stream_chunksize=10)
+    with pytest.raises(ValueError):
+        merge_alm_issues(alm_path, issues_path, str(tmp_path / 'out.parquet'), stream_chunksize=10)
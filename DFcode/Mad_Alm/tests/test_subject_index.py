@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+from rapidfuzz import fuzz
+
+from Merge_1 import SubjectIndex, find_top_k
+
+
+@pytest.mark.parametrize('threshold', [0, 50, 75, 90])
+def test_index_matches_full_scan(merge_data, baseline_match, threshold):
+    alm_df, issues_df = merge_data
+    subjects = issues_df['主题'].tolist()
+    index = SubjectIndex(subjects)
+    queries = alm_df['不符合现象'].tolist()
+
+    found = [index.find_best_match(q, threshold) for q in queries]
+    expected_idx, expected_score = baseline_match(queries, subjects, threshold)
+    assert [-1 if idx is None else idx for idx, _ in found] == expected_idx
+    assert [score if idx is not None else 0 for idx, score in found] == expected_score
+
+
+def test_upper_bound_never_below_score(merge_data):
+    alm_df, issues_df = merge_data
+    subjects = issues_df['主题'].tolist()
+    index = SubjectIndex(subjects)
+    for query in alm_df['不符合现象'][:40]:
+        bounds = index.upper_bounds(query)
+        for idx, subject in enumerate(subjects):
+            if pd.isna(subject):      # 空主题不参与匹配
+                assert bounds[idx] < 0
+            else:
+                assert bounds[idx] >= fuzz.token_set_ratio(query, subject) - SubjectIndex.EPS
+
+
+def test_top_k_matches_full_scan(merge_data):
+    alm_df, issues_df = merge_data
+    subjects = issues_df['主题'].tolist()
+    index = SubjectIndex(subjects)
+    for query in alm_df['不符合现象'][:60]:
+        assert index.find_top_k(query, 60, 3) == find_top_k(query, subjects, 60, 3)
+
+
+def test_ties_pick_first_subject():
+    index = SubjectIndex(['b a', 'a b', 'c'])
+    assert index.find_best_match('a b', 75) == (0, 100)
@@ -0,0 +1,67 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from FILL_ import process_column_mapping
+from Merge_1 import merge_alm_issues
+from table_io import arrow_safe_frame, read_table, read_table_columns, table_format, write_table
+
+pytest.importorskip('pyarrow')
+
+
+def merged_like():
+    # 未匹配行的Issues列填充''，与合并结果一致
+    return pd.DataFrame({
+        '编号': ['ALM1', 'ALM2', 'ALM3'],
+        'Issues_#': [101, '', 103],
+        'Issues_分数': [90.5, '', 80],
+        'Issues_主题': ['屏幕黑屏', '', 7],
+        '重要度': [np.nan, 'A', 'B'],
+    })
+
+
+def test_table_format():
+    assert [table_format(p) for p in ('a.parquet', 'A.PQ', 'a.feather', 'a.arrow', 'a.csv', 'a')] == \
+        ['parquet', 'parquet', 'feather', 'feather', 'csv', 'csv']
+
+
+def test_arrow_safe_frame():
+    df = arrow_safe_frame(merged_like())
+    assert str(df['Issues_#'].dtype) == 'Int64' and df['Issues_#'].isna().tolist() == [False, True, False]
+    assert df['Issues_分数'].tolist()[::2] == [90.5, 80.0]
+    assert df['Issues_主题'].isna().tolist() == [False, True, False] and df['Issues_主题'][2] == '7'
+
+
+@pytest.mark.parametrize('name', ['merged.parquet', 'merged.feather'])
+def test_columnar_round_trip_matches_csv(tmp_path, name):
+    df = merged_like()
+    write_table(df, tmp_path / 'merged.csv')
+    write_table(df, tmp_path / name)
+    assert read_table_columns(tmp_path / name) == list(df.columns)
+
+    # 按文本读回时与CSV的内容一致(空值为NaN)
+    csv_text = read_table(tmp_path / 'merged.csv', dtype=str)
+    columnar = read_table(tmp_path / name)
+    assert columnar['Issues_#'].astype('string').fillna('').tolist() == csv_text['Issues_#'].fillna('').tolist()
+    assert columnar['Issues_主题'].fillna('').tolist() == csv_text['Issues_主题'].fillna('').tolist()
+    assert read_table(tmp_path / name, columns=['重要度']).columns.tolist() == ['重要度']
+
+
+def test_fill_from_parquet_equals_fill_from_csv(tmp_path, merge_data, write_csv):
+    alm_path, issues_path = write_csv(merge_data[0], 'alm.csv'), write_csv(merge_data[1], 'issues.csv')
+    wb = openpyxl.Workbook()
+    wb.active.title = '一元问题表'
+    wb.active.append(['序号', '描述', 'redmine单号', '主题'])
+    wb.save(tmp_path / 'template.xlsx')
+    (tmp_path / 'mapping.txt').write_text('描述 --> 不符合现象\nredmine单号 --> Issues_#\n主题 --> Issues_主题\n',
+                                          encoding='utf-8')
+
+    sheets = []
+    for name in ('merged.csv', 'merged.parquet'):
+        merge_alm_issues(alm_path, issues_path, str(tmp_path / name))
+        output = str(tmp_path / f'{name}.xlsx')
+        assert process_column_mapping(str(tmp_path / 'mapping.txt'), str(tmp_path / name),
+                                      str(tmp_path / 'template.xlsx'), output, use_plan_cache=False)
+        sheets.append(list(openpyxl.load_workbook(output).active.iter_rows(values_only=True)))
+    assert sheets[0] == sheets[1] and len(sheets[0]) == 151
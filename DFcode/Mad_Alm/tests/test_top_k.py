@@ -0,0 +1,52 @@
+import re
+
+import pandas as pd
+import pytest
+
+from Merge_1 import merge_alm_issues
+
+CANDIDATE_RE = re.compile(r'#(\d+)\(([\d.]+)\)')
+
+
+@pytest.fixture
+def top_k_frames(merge_data, write_csv):
+    alm_df, issues_df = merge_data
+    alm_path, issues_path = write_csv(alm_df, 'alm.csv'), write_csv(issues_df, 'issues.csv')
+    return {engine: merge_alm_issues(alm_path, issues_path, None, n_workers=2, engine=engine,
+                                     top_k=3, ambiguity_margin=5)
+            for engine in ('batch', 'pool')}
+
+
+def test_engines_agree(top_k_frames):
+    pd.testing.assert_frame_equal(top_k_frames['batch'], top_k_frames['pool'])
+
+
+def test_candidates_and_ambiguity(top_k_frames, merge_data):
+    merged = top_k_frames['batch']
+    _, issues_df = merge_data
+    for _, row in merged.iterrows():
+        found = [(int(key), float(score)) for key, score in CANDIDATE_RE.findall(row['候选匹配'])]
+        assert len(found) <= 3
+        assert [score for _, score in found] == sorted((score for _, score in found), reverse=True)
+        assert all(score >= 75 - 5 for _, score in found)
+        if row['匹配状态'] == '成功匹配':
+            assert found[0] == (int(row['Issues_#']), round(float(row['匹配分数']), 1))
+        if len(found) < 2 or abs(found[0][1] - found[1][1] - 5) > 0.1:     # 候选分数只保留一位小数
+            ambiguous = row['匹配状态'] == '成功匹配' and len(found) > 1 and found[0][1] - found[1][1] < 5
+            assert row['匹配歧义'] == ('是' if ambiguous else '否')
+
+
+def test_close_candidates_are_ambiguous(write_csv):
+    alm_df = pd.DataFrame({'编号': ['A1', 'A2'], '不符合现象': ['车机 黑屏 重启', '仪表 花屏']})
+    issues_df = pd.DataFrame({'#': [1, 2, 3], '主题': ['车机 黑屏 重启 A', '车机 黑屏 重启 B', '仪表 花屏']})
+    merged = merge_alm_issues(write_csv(alm_df, 'alm.csv'), write_csv(issues_df, 'issues.csv'), None,
+                              n_workers=1, top_k=2)
+    assert merged['匹配歧义'].tolist() == ['是', '否']
+    assert merged['候选匹配'][0] == '#1(100.0); #2(100.0)'
+    assert merged['Issues_#'].tolist() == [1, 3]
+
+
+def test_top_k_one_keeps_original_columns(merge_data, write_csv):
+    alm_df, issues_df = merge_data
+    merged = merge_alm_issues(write_csv(alm_df, 'alm.csv'), write_csv(issues_df, 'issues.csv'), None, n_workers=1)
+    assert '候选匹配' not in merged.columns
@@ -0,0 +1,67 @@
+import datetime
+
+import openpyxl
+import pytest
+
+import vlookup
+from mapping_plan import compile_mapping
+from vlookup import evaluate_lookups, iter_sheet_columns, lookup_key, parse_vlookup
+
+
+@pytest.fixture
+def lookup_workbook(tmp_path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = '一元问题表'
+    ws.append(['序号', '编号', '结果'])
+    qis = wb.create_sheet('QIS表格')
+    for row in (['k1', None, None, 'first'], ['K1', None, None, 'second'], [2, None, None, 'two'],
+                ['空', None, None, None], ['公式', None, None, '=1+1'], ['日期', None, None, datetime.date(2024, 1, 2)],
+                ['长文本&<>', None, None, 'x' * 50]):
+        qis.append([None, None, None] + row)
+    path = tmp_path / 'lookup.xlsx'
+    wb.save(path)
+    return str(path)
+
+
+def test_parse_vlookup():
+    assert parse_vlookup('=VLOOKUP(B{row},QIS表格!D:G,4,0)') == \
+        {'key_col': 2, 'sheet': 'QIS表格', 'key_idx': 4, 'value_idx': 7}
+    assert parse_vlookup("=vlookup($B{row},'my sheet'!$D$1:$G$99,2,FALSE)")['sheet'] == 'my sheet'
+    assert parse_vlookup('=VLOOKUP(B{row},QIS表格!D:G,4,1)') is None         # 近似查找
+    assert parse_vlookup('=VLOOKUP(B{row},QIS表格!D:G,5,0)') is None         # 超出区域，#REF!
+    assert parse_vlookup('=B{row}*2') is None
+
+
+def test_lookup_key():
+    assert lookup_key('ABC') == lookup_key('abc')
+    assert lookup_key(2) == lookup_key(2.0) != lookup_key('2')
+    assert lookup_key('') == lookup_key(None) == ('blank', None)
+    assert lookup_key('a*') is None and lookup_key('=A1') is None
+
+
+def test_first_exact_match_and_missing(lookup_workbook):
+    plan = compile_mapping({'结果': '=VLOOKUP(Bi,QIS表格!D:G,4,0)'}, [(1, '序号'), (2, '编号'), (3, '结果')], [])
+    keys = ['K1', 2, '2', 'none', '空', '公式', '日期', '长文本&<>', 'k?', '']
+    results, stats = evaluate_lookups(plan, {2: keys}, lookup_workbook)
+    assert results[3] == ['first', 'two', '#N/A', '#N/A', 0, None,
+                          float(openpyxl.utils.datetime.to_excel(datetime.date(2024, 1, 2))), 'x' * 50, None, '#N/A']
+    assert stats[3] == {'found': 5, 'missing': 3, 'formula': 2, 'index_size': 6}
+
+
+def test_missing_key_column_or_sheet_is_not_evaluated(lookup_workbook):
+    headers = [(1, '序号'), (2, '编号'), (3, '结果')]
+    plan = compile_mapping({'结果': '=VLOOKUP(Bi,QIS表格!D:G,4,0)'}, headers, [])
+    assert evaluate_lookups(plan, {1: [1]}, lookup_workbook) == ({}, {})
+    plan = compile_mapping({'结果': '=VLOOKUP(Bi,其他表!D:G,4,0)'}, headers, [])
+    assert evaluate_lookups(plan, {2: ['k1']}, lookup_workbook) == ({}, {})
+
+
+def test_sheet_reader_matches_openpyxl(lookup_workbook, monkeypatch):
+    monkeypatch.setattr(vlookup, 'SHEET_READ_CHARS', 16)       # 行跨越读取块
+    rows = list(iter_sheet_columns(lookup_workbook, 'QIS表格', {4, 7}))
+    ws = openpyxl.load_workbook(lookup_workbook)['QIS表格']
+    assert [row.get(4) for row in rows] == [ws.cell(r, 4).value for r in range(1, ws.max_row + 1)]
+    assert [row.get(7) for row in rows[:4]] == ['first', 'second', 'two', None]
+    assert rows[4][7] is vlookup.PENDING_FORMULA        # 没有保存计算结果的公式
+    assert rows[6][7] == 'x' * 50
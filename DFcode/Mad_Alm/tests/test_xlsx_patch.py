@@ -0,0 +1,76 @@
+import re
+import zipfile
+
+import numpy as np
+import openpyxl
+
+from xlsx_patch import find_sheet_part, patch_sheet_columns, NON_FINITE_ERROR
+
+SHEET = '一元问题表'
+
+
+def patch_and_load(template, tmp_path, columns, **kwargs):
+    output = str(tmp_path / 'out.xlsx')
+    patch_sheet_columns(template, output, SHEET, columns, **kwargs)
+    return openpyxl.load_workbook(output)
+
+
+def add_shared_formulas(template, path):
+    """把D2:D6写成共享公式(主单元格D2)，openpyxl自己不会生成共享公式"""
+    with zipfile.ZipFile(template) as src:
+        part = find_sheet_part(src, SHEET)
+        xml = src.read(part).decode()
+
+        def add(match):
+            r = int(match.group(1))
+            formula = '<f t="shared" ref="D2:D6" si="0">B2&amp;"x"</f>' if r == 2 else '<f t="shared" si="0"/>'
+            return re.sub(r'<c r="E', f'<c r="D{r}">{formula}</c><c r="E', match.group(0), count=1)
+        xml = re.sub(r'<row r="([2-6])".*?</row>', add, xml, flags=re.S)
+        with zipfile.ZipFile(path, 'w') as dst:
+            for info in src.infolist():
+                dst.writestr(info, xml if info.filename == part else src.read(info.filename))
+    return str(path)
+
+
+def test_round_trip_types(xlsx_template, tmp_path):
+    columns = {
+        1: ['a', 'b&<c>', '=A1&"x"', '#N/A', None, 'f'],
+        2: [True, 1.5, np.nan, 7, None, 'x\x01y'],
+        3: [1.5, np.inf, -np.inf, np.nan, 2, 3],
+    }
+    wb = patch_and_load(xlsx_template, tmp_path, columns)
+    ws = wb[SHEET]
+    assert [c.value for c in ws[1]] == ['编号', '描述', '分数', '公式', '备注']
+    assert [ws.cell(r, 1).value for r in range(2, 8)] == ['a', 'b&<c>', '=A1&"x"', '#N/A', None, 'f']
+    assert ws['A5'].data_type == 'e'
+    assert [ws.cell(r, 2).value for r in range(2, 8)] == [True, 1.5, None, 7, None, 'xy']
+    assert [ws.cell(r, 3).value for r in range(2, 8)] == [1.5, NON_FINITE_ERROR, NON_FINITE_ERROR, None, 2, 3]
+    # 未映射的列、样式和其他工作表保持不变
+    assert [ws.cell(r, 5).value for r in range(2, 7)] == [f'keep{r}' for r in range(2, 7)]
+    assert ws['B2'].font.bold and ws['B4'].font.bold and ws['B4'].value is None
+    assert wb['说明']['A1'].value == '不变'
+    assert ws.max_row == 7
+
+
+def test_cached_formula_values(xlsx_template, tmp_path):
+    wb = patch_and_load(xlsx_template, tmp_path, {4: ['=C2*2', '=C3*2']}, cached_values={4: [3, None]})
+    assert wb[SHEET]['D2'].value == '=C2*2' and wb[SHEET]['D3'].value == '=C3*2'
+    output = str(tmp_path / 'out.xlsx')
+    cached = openpyxl.load_workbook(output, data_only=True)[SHEET]
+    assert cached['D2'].value == 3 and cached['D3'].value is None
+
+
+def test_overwritten_shared_formula_master_is_unshared(xlsx_template, tmp_path):
+    template = add_shared_formulas(xlsx_template, tmp_path / 'shared.xlsx')
+    for chunk_rows in (None, 1):
+        ws = patch_and_load(template, tmp_path, {4: [5]}, chunk_rows=chunk_rows)[SHEET]
+        assert ws['D2'].value == 5
+        assert [ws.cell(r, 4).value for r in range(3, 7)] == [f'=B{r}&"x"' for r in range(3, 7)]
+
+
+def test_untouched_shared_formulas_stay_shared(xlsx_template, tmp_path):
+    template = add_shared_formulas(xlsx_template, tmp_path / 'shared.xlsx')
+    patch_and_load(template, tmp_path, {1: ['n'] * 5})
+    with zipfile.ZipFile(tmp_path / 'out.xlsx') as zf:
+        xml = zf.read(find_sheet_part(zf, SHEET)).decode()
+    assert xml.count('t="shared"') == 5
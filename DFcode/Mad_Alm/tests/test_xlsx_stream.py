@@ -0,0 +1,52 @@
+import io
+import zipfile
+
+import openpyxl
+
+import xlsx_patch
+from xlsx_patch import find_sheet_part, iter_sheet_parts, patch_sheet_columns, patch_sheet_xml
+
+SHEET = '一元问题表'
+
+
+def sheet_xml(path):
+    with zipfile.ZipFile(path) as zf:
+        return zf.read(find_sheet_part(zf, SHEET)).decode()
+
+
+def test_stream_output_equals_in_memory(xlsx_template, tmp_path):
+    columns = {2: [f'值{i}' for i in range(9)], 3: list(range(9))}
+    patch_sheet_columns(xlsx_template, str(tmp_path / 'memory.xlsx'), SHEET, columns)
+    expected = sheet_xml(tmp_path / 'memory.xlsx')
+    for chunk_rows in (1, 2, 4, 100):
+        patch_sheet_columns(xlsx_template, str(tmp_path / 'stream.xlsx'), SHEET, columns, chunk_rows=chunk_rows)
+        assert sheet_xml(tmp_path / 'stream.xlsx') == expected
+
+
+def test_rows_split_across_reads(xlsx_template, monkeypatch):
+    xml = sheet_xml(xlsx_template).replace('old', '旧值')    # 多字节字符也会被读取块截断
+    columns = {3: [1, 2, 3]}
+    expected = patch_sheet_xml(xml, columns)
+    monkeypatch.setattr(xlsx_patch.iter_text, '__defaults__', (7,))     # XML_READ_SIZE=7
+    assert ''.join(xlsx_patch.iter_sheet_xml(io.BytesIO(xml.encode()), columns, chunk_rows=2)) == expected
+    rows = [p[1] for p in iter_sheet_parts(io.BytesIO(xml.encode())) if p[0] == 'row']
+    assert rows == [1, 2, 3, 4, 5, 6]
+
+
+def test_template_rows_beyond_data_are_kept(xlsx_template, tmp_path):
+    output = str(tmp_path / 'out.xlsx')
+    patch_sheet_columns(xlsx_template, output, SHEET, {2: ['a', 'b']}, chunk_rows=1)
+    ws = openpyxl.load_workbook(output)[SHEET]
+    assert [ws.cell(r, 2).value for r in range(2, 7)] == ['a', 'b', 'old', 'old', 'old']
+    assert [ws.cell(r, 1).value for r in range(2, 7)] == [f'old{r}' for r in range(2, 7)]
+    assert ws.max_row == 6
+
+
+def test_empty_sheet_data(tmp_path):
+    wb = openpyxl.Workbook()
+    wb.active.title = SHEET
+    wb.save(tmp_path / 'empty.xlsx')
+    output = str(tmp_path / 'out.xlsx')
+    patch_sheet_columns(str(tmp_path / 'empty.xlsx'), output, SHEET, {1: ['x', 'y']}, chunk_rows=1)
+    ws = openpyxl.load_workbook(output)[SHEET]
+    assert ws['A2'].value == 'x' and ws['A3'].value == 'y'
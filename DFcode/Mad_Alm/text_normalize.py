@@ -0,0 +1,29 @@
+import re
+import unicodedata
+
+
+# 文本预处理模式，见normalize_text
+NORMALIZE_MODES = ('exact', 'cjk')
+PUNCT_RE = re.compile(r'[^\w\s]')
+CJK_RE = re.compile(r'([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff])')
+
+# 预处理规则的版本号，写入匹配缓存的键；修改normalize_text的规则时需递增，使旧缓存失效
+NORMALIZE_VERSION = 1
+
+
+def normalize_text(text, mode='exact'):
+    """
+    将文本整理成token_set_ratio内部使用的形式：按空白切分、去重、排序后用空格拼接
+    预处理后的文本可直接交给scorer(processor=None)，不必每次比较都重新切分排序
+    token_set_ratio只依赖这个token集合，因此规范形式相同的文本匹配结果也一定相同
+
+    mode -- 'exact': 只做上述整理，分数与直接比较原文完全一致
+            'cjk': 另外做全角转半角(NFKC)、转小写、去除标点，并把每个汉字作为单独的token，
+                   分数与原文比较不同，适合措辞差异较大的中文描述
+    """
+    text = str(text)
+    if mode == 'cjk':
+        text = unicodedata.normalize('NFKC', text).lower()
+        text = PUNCT_RE.sub(' ', text)
+        text = CJK_RE.sub(r' \1 ', text)
+    return " ".join(sorted(set(text.split())))
@@ -0,0 +1,252 @@
+import io
+import re
+import datetime
+import numbers
+import zipfile
+import xml.etree.ElementTree as ET
+from html import unescape
+
+from openpyxl.utils import column_index_from_string, get_column_letter
+from openpyxl.utils.datetime import to_excel
+
+from xlsx_patch import NS_MAIN, find_sheet_part
+
+
+# 可在Python中计算的公式：=VLOOKUP(C{row},QIS表格!D:G,4,0)，即按当前行某一列的值精确查找
+VLOOKUP_RE = re.compile(
+    r"^=VLOOKUP\(\s*\$?([A-Z]{1,3})\{row\}\s*,"
+    r"\s*(?:'([^']+)'|([^\s'!(),]+))!\$?([A-Z]{1,3})(?:\$?\d+)?:\$?([A-Z]{1,3})(?:\$?\d+)?\s*,"
+    r"\s*(\d+)\s*,\s*(?:0|FALSE)\s*\)$", re.I)
+
+# 精确查找时Excel把文本中的 * ? ~ 当作通配符，含有这些字符的值不在Python中计算
+WILDCARD_CHARS = ('*', '?', '~')
+
+# VLOOKUP公式的计算方式
+# formula -- 只写公式，由Excel打开时计算
+# value   -- 只写查找结果(无法计算的单元格仍写公式)
+# both    -- 写公式并附带缓存的查找结果
+LOOKUP_MODES = ('formula', 'value', 'both')
+
+# 查找表中没有保存计算结果的公式单元格，查找到它时不在Python中计算
+PENDING_FORMULA = object()
+
+# 读取查找表XML用到的正则
+ROW_XML_RE = re.compile(r'<row\b[^>]*?(?:/>|>.*?</row>)', re.S)
+SHEET_CELL_RE = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+CELL_COLUMN_RE = re.compile(r'\br="([A-Z]+)\d+"')
+CELL_TYPE_RE = re.compile(r'\bt="(\w+)"')
+VALUE_RE = re.compile(r'<v>(.*?)</v>', re.S)
+INLINE_TEXT_RE = re.compile(r'<t\b[^>]*>(.*?)</t>', re.S)
+# 每次从查找表XML读取的字符数
+SHEET_READ_CHARS = 4 * 1024 * 1024
+
+
+def parse_vlookup(template):
+    """
+    解析公式模板，是精确查找的VLOOKUP时返回查找参数，否则返回None
+
+    返回 {'key_col': 当前表中查找值所在列号, 'sheet': 查找表名称,
+          'key_idx': 查找表中键列号, 'value_idx': 查找表中结果列号}
+    """
+    match = VLOOKUP_RE.match(template or '')
+    if not match:
+        return None
+    key_col, quoted, bare, first_col, last_col, col_index = match.groups()
+    first_idx = column_index_from_string(first_col.upper())
+    last_idx = column_index_from_string(last_col.upper())
+    col_index = int(col_index)
+    # 结果列超出查找区域时Excel返回#REF!，交给Excel处理
+    if not 1 <= col_index <= last_idx - first_idx + 1:
+        return None
+    return {'key_col': column_index_from_string(key_col.upper()), 'sheet': quoted or bare,
+            'key_idx': first_idx, 'value_idx': first_idx + col_index - 1}
+
+
+def lookup_key(value):
+    """
+    按Excel精确查找的规则生成键：文本不区分大小写，数字与文本不相等
+    空值返回('blank', None)，无法在Python中计算的值(公式、通配符)返回None
+    """
+    if value is PENDING_FORMULA:
+        return None
+    if value is None or value == '':
+        return ('blank', None)
+    if isinstance(value, bool):
+        return ('b', value)
+    if isinstance(value, numbers.Number):
+        return ('n', float(value))
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return ('n', float(to_excel(value)))
+    text = str(value)
+    if text.startswith('=') or any(char in text for char in WILDCARD_CHARS):
+        return None
+    return ('s', text.casefold())
+
+
+def lookup_result(value):
+    """
+    查找结果转换为单元格的值：空单元格返回0，日期时间转换为Excel序列号(与Excel在常规格式下的显示一致)
+    没有计算结果的公式返回None(保留公式)
+    """
+    if value is PENDING_FORMULA:
+        return None
+    if value is None:
+        return 0
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return float(to_excel(value))
+    return value
+
+
+def read_shared_strings(zf):
+    """
+    读取共享字符串表(没有时返回空列表)，富文本取各段文字拼接，忽略注音
+    """
+    if 'xl/sharedStrings.xml' not in zf.namelist():
+        return []
+    strings = []
+    with zf.open('xl/sharedStrings.xml') as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == f'{{{NS_MAIN}}}si':
+                strings.append(''.join(t.text or '' for t in elem.iter(f'{{{NS_MAIN}}}t')
+                                       if t not in elem.findall(f'{{{NS_MAIN}}}rPh/{{{NS_MAIN}}}t')))
+                elem.clear()
+    return strings
+
+
+def cell_value(attrs, inner, shared_strings):
+    """
+    按单元格类型取出<c>元素的值；公式单元格取保存的计算结果，与openpyxl的data_only一致
+    """
+    if not inner:
+        return None
+    type_match = CELL_TYPE_RE.search(attrs)
+    cell_type = type_match.group(1) if type_match else 'n'
+    if cell_type == 'inlineStr':
+        return unescape(''.join(INLINE_TEXT_RE.findall(inner.split('<rPh', 1)[0])))
+    value_match = VALUE_RE.search(inner)
+    # openpyxl保存的公式单元格带有空的<v></v>，同样视为没有计算结果
+    if not value_match or not value_match.group(1):
+        return PENDING_FORMULA if '<f' in inner else None
+    raw = value_match.group(1)
+    if cell_type == 's':
+        return shared_strings[int(raw)]
+    if cell_type in ('str', 'e'):
+        return unescape(raw)
+    if cell_type == 'b':
+        return raw == '1'
+    number = float(raw)
+    return int(number) if number.is_integer() and '.' not in raw and 'E' not in raw.upper() else number
+
+
+def iter_sheet_columns(excel_path, sheet_name, col_indices):
+    """
+    按行读取工作表中指定几列的值，每行返回 {列号: 值}(空单元格不出现)
+
+    直接用正则扫描工作表XML并只解析需要的列，比openpyxl逐个创建单元格快一个数量级；
+    分块读取，内存与工作表大小无关。工作表不存在时抛出ValueError
+    """
+    wanted = {get_column_letter(col_idx): col_idx for col_idx in col_indices}
+    with zipfile.ZipFile(excel_path) as zf:
+        shared_strings = read_shared_strings(zf)
+        with io.TextIOWrapper(zf.open(find_sheet_part(zf, sheet_name)), encoding='utf-8') as f:
+            pending = ''
+            while True:
+                chunk = f.read(SHEET_READ_CHARS)
+                text = pending + chunk
+                # 只处理到最后一个完整的行，剩余部分与下一块拼接
+                cut = text.rfind('</row>') + len('</row>') if chunk else len(text)
+                if cut < len('</row>'):
+                    pending = text
+                    continue
+                text, pending = text[:cut], text[cut:]
+                for row in ROW_XML_RE.findall(text):
+                    values = {}
+                    for attrs, inner in SHEET_CELL_RE.findall(row):
+                        ref = CELL_COLUMN_RE.search(attrs)
+                        if ref and ref.group(1) in wanted:
+                            values[wanted[ref.group(1)]] = cell_value(attrs, inner, shared_strings)
+                    yield values
+                if not chunk:
+                    break
+
+
+def build_lookup_indexes(excel_path, lookups):
+    """
+    为每个(查找表, 键列, 结果列)建立 {键: 结果} 哈希索引，每张查找表只读取一遍
+    键列中同一个键出现多次时保留第一次出现的结果，与VLOOKUP一致
+    查找表不存在时不建立索引
+
+    参数:
+    excel_path -- 包含查找表的xlsx路径
+    lookups -- parse_vlookup返回的查找参数列表
+    """
+    by_sheet = {}
+    for lookup in lookups:
+        by_sheet.setdefault(lookup['sheet'], set()).add((lookup['key_idx'], lookup['value_idx']))
+
+    indexes = {}
+    for sheet, pairs in by_sheet.items():
+        col_indices = {col_idx for pair in pairs for col_idx in pair}
+        sheet_indexes = {pair: {} for pair in pairs}
+        try:
+            for row in iter_sheet_columns(excel_path, sheet, col_indices):
+                for (key_idx, value_idx), index in sheet_indexes.items():
+                    key = lookup_key(row.get(key_idx))
+                    if key is not None and key[0] != 'blank' and key not in index:
+                        index[key] = row.get(value_idx)
+        except ValueError:
+            continue
+        for pair, index in sheet_indexes.items():
+            indexes[(sheet, *pair)] = index
+    return indexes
+
+
+def evaluate_lookups(plan, columns, excel_path):
+    """
+    在Python中计算映射计划里的VLOOKUP公式列
+
+    查找值取自同一行写入的映射列；该列没有写入、查找表不在模板中时整列不计算。
+    返回({Excel列号: 每行的结果(无法计算的单元格为None)}, {Excel列号: 统计信息})
+
+    参数:
+    plan -- compile_mapping返回的映射计划
+    columns -- execute_plan返回的 {Excel列号: 整列的值}
+    excel_path -- 包含查找表的模板xlsx路径
+    """
+    # 与execute_plan一致：同一列以最后执行的操作为准
+    final_rules = {}
+    for rule in plan:
+        if not rule['error'] and rule['op'] != 'skip':
+            final_rules[rule['excel_idx']] = rule
+
+    targets = {}
+    for col_idx, rule in final_rules.items():
+        lookup = rule.get('lookup') if rule['op'] == 'formula' else None
+        if lookup and lookup['key_col'] in columns:
+            targets[col_idx] = lookup
+    if not targets:
+        return {}, {}
+
+    indexes = build_lookup_indexes(excel_path, targets.values())
+    results, stats = {}, {}
+    for col_idx, lookup in targets.items():
+        index = indexes.get((lookup['sheet'], lookup['key_idx'], lookup['value_idx']))
+        if index is None:
+            continue
+        values = []
+        found = missing = 0
+        for value in columns[lookup['key_col']]:
+            key = lookup_key(value)
+            result = lookup_result(index[key]) if key in index else '#N/A'
+            if key is None or result is None:
+                values.append(None)
+            elif key in index:
+                values.append(result)
+                found += 1
+            else:
+                values.append('#N/A')
+                missing += 1
+        results[col_idx] = values
+        stats[col_idx] = {'found': found, 'missing': missing,
+                          'formula': len(values) - found - missing, 'index_size': len(index)}
+    return results, stats
@@ -0,0 +1,432 @@
+import codecs
+import math
+import re
+import numbers
+import posixpath
+import shutil
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, unescape
+
+import numpy as np
+import pandas as pd
+from openpyxl.cell.cell import ERROR_CODES
+from openpyxl.formula.translate import Translator
+from openpyxl.utils import get_column_letter, column_index_from_string
+
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+ROW_RE = re.compile(r'<row\b[^>]*?(?:/>|>.*?</row>)', re.S)
+ROW_NUM_RE = re.compile(r'<row\b[^>]*?\br="(\d+)"')
+CELL_RE = re.compile(r'<c\b[^>]*?(?:/>|>.*?</c>)', re.S)
+CELL_REF_RE = re.compile(r'<c\b[^>]*?\br="([A-Z]+)(\d+)"')
+CELL_STYLE_RE = re.compile(r'\bs="(\d+)"')
+DIMENSION_RE = re.compile(r'<dimension ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"\s*/>')
+SPACE_RE = re.compile(r'\s*')
+SHARED_FORMULA_RE = re.compile(r'<f\b([^>]*?\bt="shared"[^>]*?)(?:/>|>(.*?)</f>)', re.S)
+SHARED_INDEX_RE = re.compile(r'\bsi="(\d+)"')
+
+# Excel不能保存inf，写成与Excel溢出时相同的错误值
+NON_FINITE_ERROR = '#NUM!'
+
+# 流式读取模板工作表XML时每次读取的字节数
+XML_READ_SIZE = 1024 * 1024
+
+# XML不允许的控制字符(\x00单独处理，用作整列转义时的分隔符)
+ILLEGAL_XML_RE = re.compile(r'[\x01-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def escape_xml_column(texts):
+    """
+    整列转义：用\x00把整列拼成一个字符串，一次完成实体替换和非法字符删除后再拆开
+    """
+    if not texts:
+        return []
+    joined = '\x00'.join(texts)
+    if joined.count('\x00') != len(texts) - 1:
+        # 文本本身含有\x00，逐个去掉后再整列处理
+        return escape_xml_column([t.replace('\x00', '') for t in texts])
+    joined = ILLEGAL_XML_RE.sub('', joined.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;'))
+    return joined.split('\x00')
+
+
+def find_sheet_part(zf, sheet_name):
+    """
+    根据工作表名称，从workbook.xml及其关系文件中找到对应的sheet XML路径
+    """
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target')
+               for rel in rels.iter(f'{{{NS_PKG_REL}}}Relationship')}
+
+    for sheet in workbook.iter(f'{{{NS_MAIN}}}sheet'):
+        if sheet.get('name') == sheet_name:
+            target = targets[sheet.get(f'{{{NS_REL}}}id')]
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join('xl', target))
+    raise ValueError(f"Excel文件中不存在工作表: {sheet_name}")
+
+
+def is_finite(value):
+    """
+    数值是否可以写入<v>：inf/nan(包括numpy和Decimal的)不行，超出float范围的整数照常写出
+    """
+    try:
+        return math.isfinite(value)
+    except (TypeError, OverflowError):
+        return True
+
+
+def cell_parts(value):
+    """
+    单元格值对应的(类型, 文本)：类型为None(空)、'n'数字、'b'布尔、'e'错误值、'f'公式、'str'文本
+    nan为空单元格，inf写成错误值#NUM!
+    """
+    if value is None or value == '' or (isinstance(value, float) and value != value):
+        return None, ''
+    if isinstance(value, (bool, np.bool_)):
+        return 'b', '1' if value else '0'
+    if isinstance(value, numbers.Number):
+        if not is_finite(value):
+            return (None, '') if value != value else ('e', NON_FINITE_ERROR)
+        return 'n', str(value)
+    text = str(value)
+    if text in ERROR_CODES:
+        return 'e', text
+    if len(text) > 1 and text[0] == '=':
+        return 'f', text
+    return 'str', text
+
+
+def typed_cells_xml(values, letter, first_row, cached=None):
+    """
+    逐个判断类型生成<c>元素：用于混合类型的列，以及带缓存计算结果的公式列
+    """
+    parts = [cell_parts(v) for v in values]
+    cached_parts = [cell_parts(v) for v in cached] if cached is not None else [(None, '')] * len(parts)
+    escaped = escape_xml_column([t for _, t in parts] + [t for _, t in cached_parts])
+    texts, cached_texts = escaped[:len(parts)], escaped[len(parts):]
+
+    cells = []
+    for r, (kind, _), x, (cached_kind, _), cx in zip(
+            range(first_row, first_row + len(parts)), parts, texts, cached_parts, cached_texts):
+        ref = f'{letter}{r}'
+        if kind is None:
+            cells.append('')
+        elif kind == 'n':
+            cells.append(f'<c r="{ref}"><v>{x}</v></c>')
+        elif kind in ('b', 'e'):
+            cells.append(f'<c r="{ref}" t="{kind}"><v>{x}</v></c>')
+        elif kind == 'str':
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{x}</t></is></c>')
+        elif cached_kind is None:
+            cells.append(f'<c r="{ref}"><f>{x[1:]}</f></c>')
+        else:
+            # 公式的缓存结果：文本结果的类型为str，以"="开头的文本也按文本缓存
+            cell_type = '' if cached_kind == 'n' else \
+                f' t="{cached_kind}"' if cached_kind in ('b', 'e') else ' t="str"'
+            cells.append(f'<c r="{ref}"{cell_type}><f>{x[1:]}</f><v>{cx}</v></c>')
+    return cells
+
+
+def column_cells_xml(values, col_idx, first_row, cached=None):
+    """
+    把一整列的值一次性生成为<c>元素字符串列表，空值对应空字符串(不写单元格)
+
+    数值列写成数字(nan为空，inf为#NUM!)；文本写成内联字符串，以"="开头的文本写成公式(与openpyxl的规则一致)，
+    错误值(#N/A等)写成错误。cached为公式列每行的缓存计算结果，写入<v>后Excel打开时不必重新计算。
+    """
+    letter = get_column_letter(col_idx)
+    rows = range(first_row, first_row + len(values))
+
+    series = pd.Series(values)
+    if cached is None and pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return ['' if pd.isna(v) else
+                f'<c r="{letter}{r}"><v>{v}</v></c>' if is_finite(v) else
+                f'<c r="{letter}{r}" t="e"><v>{NON_FINITE_ERROR}</v></c>'
+                for r, v in zip(rows, series.tolist())]
+
+    raw = series.tolist()
+    if cached is not None or not all(type(t) is str for t in raw):
+        return typed_cells_xml(raw, letter, first_row, cached)
+    return ['' if not t else
+            f'<c r="{letter}{r}"><f>{x[1:]}</f></c>' if len(t) > 1 and t[0] == '=' else
+            f'<c r="{letter}{r}" t="e"><v>{x}</v></c>' if t in ERROR_CODES else
+            f'<c r="{letter}{r}" t="inlineStr"><is><t xml:space="preserve">{x}</t></is></c>'
+            for r, t, x in zip(rows, raw, escape_xml_column(raw))]
+
+
+def build_rows_xml(columns, first_row, start=0, stop=None, cached_values=None):
+    """
+    按列生成单元格后按行拼接，返回每行的<row>元素字符串列表
+
+    参数:
+    columns -- {列号(从1开始): 该列从first_row开始的全部值}
+    first_row -- 第一行数据所在的行号
+    start, stop -- 只生成第start到stop条数据(流式写出时分块调用) (默认: 全部)
+    cached_values -- {公式列号: 每行公式的缓存计算结果(None表示不缓存)} (默认: None)
+    """
+    cached_values = cached_values or {}
+    n_rows = max((len(values) for values in columns.values()), default=0)
+    stop = n_rows if stop is None else min(stop, n_rows)
+    cell_columns = []
+    for col_idx in sorted(columns):
+        cached = cached_values[col_idx][start:stop] if col_idx in cached_values else None
+        cells = column_cells_xml(columns[col_idx][start:stop], col_idx, first_row + start, cached)
+        cell_columns.append(cells + [''] * (stop - start - len(cells)))
+    return [f'<row r="{r}">{"".join(cells)}</row>'
+            for r, cells in zip(range(first_row + start, first_row + stop), zip(*cell_columns))]
+
+
+def cell_style(cell):
+    """
+    取出<c>元素的样式编号，没有样式时返回None
+    """
+    match = CELL_STYLE_RE.search(cell.split('>', 1)[0])
+    return match.group(1) if match else None
+
+
+def unshare_formulas(row_xml, shared_masters):
+    """
+    共享公式的主单元格被覆盖后，把同组的其余单元格改写为普通公式(按各自的位置平移引用)
+
+    参数:
+    row_xml -- 模板行XML
+    shared_masters -- {共享公式组号si: (主单元格公式, 主单元格位置)}，已被覆盖的主单元格
+    """
+    if not shared_masters or 't="shared"' not in row_xml:
+        return row_xml
+
+    def unshare(cell_match):
+        cell = cell_match.group(0)
+        formula = SHARED_FORMULA_RE.search(cell)
+        index = SHARED_INDEX_RE.search(formula.group(1)) if formula else None
+        if index is None or index.group(1) not in shared_masters:
+            return cell
+        text, origin = shared_masters[index.group(1)]
+        ref = ''.join(CELL_REF_RE.match(cell).groups())
+        translated = Translator('=' + text, origin=origin).translate_formula(ref)[1:]
+        return cell[:formula.start()] + f'<f>{escape(translated)}</f>' + cell[formula.end():]
+    return CELL_RE.sub(unshare, row_xml)
+
+
+def merge_template_row(template_row, new_row, columns, shared_masters=None):
+    """
+    模板中已存在的数据行：保留行属性和未被覆盖的单元格，被覆盖的单元格沿用模板的样式
+    被覆盖的单元格是共享公式的主单元格时记入shared_masters，同组的其余单元格改写为普通公式
+    """
+    shared_masters = {} if shared_masters is None else shared_masters
+    head = template_row[:template_row.index('>') + 1]
+    if head.endswith('/>'):
+        head = head[:-2] + '>'
+    row_num = ROW_NUM_RE.match(template_row).group(1)
+
+    cells = {}
+    for cell in CELL_RE.findall(template_row):
+        cells[column_index_from_string(CELL_REF_RE.match(cell).group(1))] = cell
+    new_cells = {}
+    for cell in CELL_RE.findall(new_row):
+        new_cells[column_index_from_string(CELL_REF_RE.match(cell).group(1))] = cell
+
+    for col_idx in columns:
+        formula = SHARED_FORMULA_RE.search(cells.get(col_idx, ''))
+        if formula and 'ref="' in formula.group(1):
+            shared_masters[SHARED_INDEX_RE.search(formula.group(1)).group(1)] = (
+                unescape(formula.group(2) or ''), ''.join(CELL_REF_RE.match(cells[col_idx]).groups()))
+        style = cell_style(cells[col_idx]) if col_idx in cells else None
+        if col_idx in new_cells:
+            cell = new_cells[col_idx]
+            if style is not None:
+                cell = cell.replace('<c ', f'<c s="{style}" ', 1)
+            cells[col_idx] = cell
+        elif style is not None:
+            # 新值为空：清空内容但保留样式
+            cells[col_idx] = f'<c r="{get_column_letter(col_idx)}{row_num}" s="{style}"/>'
+        else:
+            cells.pop(col_idx, None)
+    return unshare_formulas(head + ''.join(cells[c] for c in sorted(cells)) + '</row>', shared_masters)
+
+
+def iter_text(source, size=XML_READ_SIZE):
+    """
+    str原样返回；二进制文件对象(如zipfile.open的返回值)按块读取并增量解码为UTF-8文本
+    """
+    if isinstance(source, str):
+        yield source
+        return
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for data in iter(lambda: source.read(size), b''):
+        yield decoder.decode(data)
+    yield decoder.decode(b'', final=True)
+
+
+def iter_sheet_parts(source):
+    """
+    逐段解析工作表XML，缓冲区只保留尚未解析的一小段，不把整个工作表读入内存
+    依次产出('head', <sheetData>之前的文本)、每个模板行('row', 行号, 行XML)、('tail', </sheetData>之后的文本)
+
+    参数:
+    source -- 工作表XML字符串，或按字节读取的文件对象
+    """
+    chunks = iter_text(source)
+    buf, pos = '', 0
+
+    def fill():
+        nonlocal buf, pos
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError("工作表XML不完整: 缺少sheetData")
+        buf, pos = buf[pos:] + chunk, 0
+
+    while True:
+        start = buf.find('<sheetData')
+        end = buf.find('>', start) if start >= 0 else -1
+        if end >= 0:
+            break
+        fill()
+    yield 'head', buf[:start]
+    empty = buf[end - 1] == '/'
+    pos = end + 1
+
+    while not empty:
+        pos = SPACE_RE.match(buf, pos).end()
+        match = ROW_RE.match(buf, pos)
+        if match:
+            row = match.group(0)
+            yield 'row', int(ROW_NUM_RE.match(row).group(1)), row
+            pos = match.end()
+        elif buf.startswith('</sheetData>', pos):
+            pos += len('</sheetData>')
+            break
+        else:
+            fill()      # 行跨越了读取块的边界
+    yield 'tail', buf[pos:] + ''.join(chunks)
+
+
+def iter_sheet_xml(sheet_xml, columns, first_row=2, chunk_rows=None, cached_values=None):
+    """
+    逐段生成写入整列数据后的工作表XML：first_row之前的行(表头)原样保留，只重新生成数据行
+    模板按块读取，模板行按行号升序出现(xlsx规范的要求)，与新数据行逐块合并
+
+    参数:
+    sheet_xml -- 模板工作表XML字符串，或按字节读取的文件对象
+    columns -- {列号(从1开始): 该列从first_row开始的全部值}
+    first_row -- 第一行数据所在的行号 (默认: 2)
+    chunk_rows -- 每段生成的数据行数，为None时一次生成全部 (默认: None)
+    cached_values -- {公式列号: 每行公式的缓存计算结果} (默认: None)
+    """
+    parts = iter_sheet_parts(sheet_xml)
+    head = next(parts)[1]
+
+    n_rows = max((len(values) for values in columns.values()), default=0)
+    last_row = first_row + n_rows - 1
+
+    # 更新dimension，使其覆盖新写入的区域(模板行在dimension之后才读到，沿用模板原有的范围)
+    match = DIMENSION_RE.search(head)
+    if match and columns:
+        top_left = f"{match.group(1)}{match.group(2)}"
+        end_col = max(column_index_from_string(match.group(3) or match.group(1)), max(columns))
+        end_row = max(int(match.group(4) or match.group(2)), last_row)
+        head = head.replace(
+            match.group(0), f'<dimension ref="{top_left}:{get_column_letter(end_col)}{end_row}"/>', 1)
+
+    yield head + '<sheetData>'
+    part = next(parts)
+    header_rows = []
+    while part[0] == 'row' and part[1] < first_row:
+        header_rows.append(part[2])
+        part = next(parts)
+    yield ''.join(header_rows)
+
+    chunk_rows = chunk_rows or max(n_rows, 1)
+    shared_masters = {}
+    for chunk_start in range(0, n_rows, chunk_rows):
+        new_rows = build_rows_xml(columns, first_row, chunk_start, chunk_start + chunk_rows, cached_values)
+        chunk_last = first_row + chunk_start + len(new_rows) - 1
+        template_rows = {}
+        while part[0] == 'row' and part[1] <= chunk_last:
+            template_rows[part[1]] = part[2]
+            part = next(parts)
+        for i, row_num in enumerate(range(first_row + chunk_start, chunk_last + 1)):
+            if row_num in template_rows:
+                new_rows[i] = merge_template_row(template_rows[row_num], new_rows[i], columns, shared_masters)
+        yield ''.join(new_rows)
+
+    while part[0] == 'row':
+        yield unshare_formulas(part[2], shared_masters)
+        part = next(parts)
+    yield '</sheetData>' + part[1]
+
+
+def patch_sheet_xml(sheet_xml, columns, first_row=2, cached_values=None):
+    """
+    在工作表XML中写入整列数据，返回完整的工作表XML
+    """
+    return ''.join(iter_sheet_xml(sheet_xml, columns, first_row, cached_values=cached_values))
+
+
+# 引用了calcChain.xml的部件
+CALC_CHAIN_REFS = ('xl/_rels/workbook.xml.rels', '[Content_Types].xml')
+
+# 流式拷贝部件时每次读写的字节数
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def drop_calc_chain(name, data):
+    """
+    计算链(calcChain.xml)引用了单元格位置，改写工作表后删除，Excel打开时会重新生成
+    """
+    if name == 'xl/_rels/workbook.xml.rels':
+        return re.sub(rb'<Relationship\b[^>]*?Target="[^"]*calcChain\.xml"[^>]*/>', b'', data)
+    if name == '[Content_Types].xml':
+        return re.sub(rb'<Override\b[^>]*?PartName="/xl/calcChain\.xml"[^>]*/>', b'', data)
+    return data
+
+
+def patch_sheet_columns(excel_path, output_path, sheet_name, columns, first_row=2, chunk_rows=None, cached_values=None):
+    """
+    直接改写xlsx中目标工作表的XML，把整列数据写入模板，其余部件原样复制
+
+    不经过openpyxl的单元格对象，模板的格式、其他工作表和未映射的列保持不变。
+    指定chunk_rows时为流式模式：模板工作表按块读取、与新数据逐块合并后直接写入输出zip，
+    其余部件按块拷贝，内存占用只与写入的数据(columns)和块大小有关，与模板的大小无关。
+
+    参数:
+    excel_path -- 模板xlsx路径
+    output_path -- 输出xlsx路径
+    sheet_name -- 目标工作表名称
+    columns -- {列号(从1开始): 该列从first_row开始的全部值}
+    first_row -- 第一行数据所在的行号 (默认: 2，第1行是表头)
+    chunk_rows -- 流式模式每块生成的行数，为None时整体在内存中生成 (默认: None)
+    cached_values -- {公式列号: 每行公式的缓存计算结果(None表示不缓存)} (默认: None)
+    """
+    with zipfile.ZipFile(excel_path) as zin:
+        sheet_part = find_sheet_part(zin, sheet_name)
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                if info.filename == 'xl/calcChain.xml':
+                    continue
+                out_info = zipfile.ZipInfo(info.filename, info.date_time)
+                out_info.compress_type = zipfile.ZIP_DEFLATED
+                out_info.external_attr = info.external_attr
+
+                if info.filename == sheet_part:
+                    with zin.open(info) as src:
+                        pieces = iter_sheet_xml(src, columns, first_row, chunk_rows, cached_values)
+                        if chunk_rows:
+                            with zout.open(out_info, 'w', force_zip64=True) as dst:
+                                for piece in pieces:
+                                    dst.write(piece.encode('utf-8'))
+                        else:
+                            zout.writestr(out_info, ''.join(pieces).encode('utf-8'))
+                elif chunk_rows and not info.is_dir() and info.filename not in CALC_CHAIN_REFS:
+                    # 未改动的部件(包括其他工作表)按块拷贝，不整体读入内存
+                    with zin.open(info) as src, zout.open(out_info, 'w', force_zip64=True) as dst:
+                        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+                else:
+                    zout.writestr(out_info, drop_calc_chain(
+                        info.filename, zin.read(info.filename)))
@@ -1,13 +1,9 @@
 import re
-from urllib.request import urlopen
+from fetcher import urlopen     # keep-alive, compressed drop-in for urllib's urlopen
 
 # if has Chinese, apply decode()
-<<<<<<< HEAD
 html = urlopen(
     "https://mofanpy.com/static/scraping/basic-structure.html").read().decode('utf-8')
-=======
-html = urlopen("https://mofanpy.com/static/scraping/basic-structure.html").read().decode('utf-8')
->>>>>>> 501e9862249d3bb00ae77026ff1b4eeb4b4a48fb
 print(html)
 
 
@@ -26,8 +22,4 @@ print("\nPage paragraph is: ", res[0])
 
 res = re.findall(r'href="(.*?)"', html)
 print("\nAll links: ", res)
-<<<<<<< HEAD
 # All links:  ['https://mofanpy.com/static/img/description/tab_icon.png', 'https://mofanpy.com/', 'https://mofanpy.com/tutorials/scraping']
-=======
-# All links:  ['https://mofanpy.com/static/img/description/tab_icon.png', 'https://mofanpy.com/', 'https://mofanpy.com/tutorials/scraping']
->>>>>>> 501e9862249d3bb00ae77026ff1b4eeb4b4a48fb
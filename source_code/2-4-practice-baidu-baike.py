@@ -1,5 +1,5 @@
 from bs4 import BeautifulSoup
-from urllib.request import urlopen
+from fetcher import urlopen     # keep-alive, compressed drop-in for urllib's urlopen
 import re
 import random
 
@@ -1,29 +1,196 @@
-from urllib.request import urlopen, urljoin
+from urllib.error import HTTPError
+from urllib.request import urljoin
 from bs4 import BeautifulSoup
+from collections import deque
+from fetcher import urlopen
+from frontier import Frontier
+from politeness import PolitenessScheduler, RETRY_STATUSES, ROBOTS_POLL
+import math
 import multiprocessing as mp
+import queue
 import re
+import sys
 import time
 
+MAX_RETRIES = 3       # per url, for 429/503 answers
+SCAN_LIMIT = 64       # waiting urls looked at per dispatch round
+CHECKPOINT_EVERY = 100  # pages between frontier checkpoints
+WORKER_CHECK_SECONDS = 1.0  # how often the coordinator checks that its workers are alive
+JOIN_SECONDS = 5.0    # wait for a worker to finish before terminating it
+
 
 def crawl(url):
+    # each fetch process keeps its own keep-alive session; pacing is left to the scheduler
     response = urlopen(url)
-    time.sleep(0.1)             # slightly delay for downloading
     return response.read().decode()
 
 
-def parse(html):
+def parse(html, page_url):
     soup = BeautifulSoup(html, 'lxml')
     urls = soup.find_all('a', {"href": re.compile('^/.+?/$')})
     title = soup.find('h1').get_text().strip()
-    page_urls = set([urljoin(base_url, url['href'])
+    page_urls = set([urljoin(page_url, url['href'])
                     for url in urls])   # remove duplication
     url = soup.find('meta', {'property': "og:url"})['content']
     return title, page_urls, url
 
 
+def fetch_worker(url_queue, html_queue, result_queue):
+    # fetch stage: download pages until a None arrives
+    while True:
+        url = url_queue.get()
+        if url is None:
+            break
+        try:
+            html = crawl(url)
+        except HTTPError as e:
+            if e.code in RETRY_STATUSES:    # the host asks us to back off
+                result_queue.put(('retry', url, e.headers.get('Retry-After')))
+            else:
+                result_queue.put(('error', url, 'fetch: %r' % e))
+            continue
+        except Exception as e:
+            result_queue.put(('error', url, 'fetch: %r' % e))
+            continue
+        result_queue.put(('fetched', url))  # frees the host slot before parsing
+        html_queue.put((url, html))     # blocks when the parsers fall behind
+
+
+def parse_worker(html_queue, result_queue):
+    # parse stage: report titles and new links as soon as each page is parsed
+    while True:
+        item = html_queue.get()
+        if item is None:
+            break
+        url, html = item
+        try:
+            result_queue.put(('ok', url) + parse(html, url))
+        except Exception as e:
+            result_queue.put(('error', url, 'parse: %r' % e))
+
+
+def pipeline_crawl(base_url, n_fetchers=4, n_parsers=2, queue_size=16, max_pages=None, scheduler=None,
+                   frontier_path=None):
+    """
+    Pipelined crawler: fetch and parse run in separate processes, connected by bounded queues.
+    New links go back to the fetchers as soon as a page is parsed, so no worker waits for
+    a whole level of the crawl to finish.
+    The coordinator hands a url to the fetchers only when its host's politeness slot is free
+    (token bucket, per-host concurrency, Retry-After, robots.txt), see politeness.py.
+    Seen urls and the queue live in a Frontier (frontier.py); with frontier_path the crawl is
+    checkpointed there and an interrupted crawl resumes from it.
+    """
+    scheduler = scheduler or PolitenessScheduler()
+    frontier = Frontier(frontier_path)
+    if frontier.resumed:
+        print('resuming: %d pages done, %d queued' % (frontier.n_done, len(frontier)))
+    frontier.add(base_url, 0)           # priority = link depth, so the crawl stays breadth first
+    url_queue = mp.Queue(queue_size)
+    html_queue = mp.Queue(queue_size)
+    result_queue = mp.Queue()           # unbounded, so workers never block on the coordinator
+    # daemon workers never keep the interpreter alive after the coordinator is gone
+    workers = [mp.Process(target=fetch_worker, args=(url_queue, html_queue, result_queue), daemon=True)
+               for _ in range(n_fetchers)]
+    workers += [mp.Process(target=parse_worker, args=(html_queue, result_queue), daemon=True)
+                for _ in range(n_parsers)]
+    for w in workers:
+        w.start()
+
+    try:
+        held = deque()                      # popped from the frontier, waiting for their host
+        retries = {}
+        in_flight, dispatched, count = 0, 0, frontier.n_done + 1
+        last_checkpoint = frontier.n_done
+        next_check = time.monotonic() + WORKER_CHECK_SECONDS
+        while held or len(frontier) or in_flight:
+            # checked on a timer, not only when results stop: a dead worker takes its url (or a
+            # queue lock) with it, and the others would keep the crawl busy until the very end
+            if time.monotonic() >= next_check:
+                dead = [w for w in workers if not w.is_alive()]
+                if dead:
+                    raise RuntimeError('crawl worker %s exited with code %s' % (dead[0].name, dead[0].exitcode))
+                next_check = time.monotonic() + WORKER_CHECK_SECONDS
+            # failures and robots.txt rejections count too, so compare with the last checkpoint
+            if frontier_path and frontier.n_done - last_checkpoint >= CHECKPOINT_EVERY:
+                frontier.checkpoint()
+                last_checkpoint = frontier.n_done
+            # hand out every url whose host is ready, never blocking on the fetch queue
+            wait, waiting = math.inf, []
+            while (held or len(frontier)) and in_flight < queue_size and len(waiting) < SCAN_LIMIT \
+                    and (max_pages is None or dispatched < max_pages):
+                url = held.popleft() if held else frontier.pop()[0]
+                if not scheduler.robots_ready(url):     # loading in a thread, other hosts go on
+                    wait = min(wait, ROBOTS_POLL)
+                    waiting.append(url)
+                    continue
+                if not scheduler.allowed(url):
+                    print('robots.txt disallows', url)
+                    frontier.done(url)
+                    continue
+                delay = scheduler.try_acquire(url)
+                if delay:                   # host busy or out of tokens, try again later
+                    wait = min(wait, delay)
+                    waiting.append(url)
+                    continue
+                url_queue.put(url)
+                in_flight += 1
+                dispatched += 1
+            held.extendleft(reversed(waiting))
+            if not in_flight and math.isinf(wait):
+                break
+
+            try:
+                result = result_queue.get(timeout=min(wait, WORKER_CHECK_SECONDS))
+            except queue.Empty:
+                continue                    # a host's next token is due, or time for a worker check
+            if result[0] == 'fetched':
+                scheduler.release(result[1])
+                continue
+            in_flight -= 1
+            if result[0] == 'retry':
+                _, url, retry_after = result
+                scheduler.release(url, retry_after if retry_after is not None else 1)
+                retries[url] = retries.get(url, 0) + 1
+                if retries[url] <= MAX_RETRIES:
+                    held.appendleft(url)
+                    dispatched -= 1
+                else:
+                    print('failed', url, 'gave up after %d retries' % MAX_RETRIES)
+                    frontier.done(url)
+                continue
+            depth = frontier.done(result[1])
+            if result[0] == 'error':
+                if result[2].startswith('fetch'):
+                    scheduler.release(result[1])
+                print('failed', result[1], result[2])
+                continue
+            _, _, title, page_urls, url = result
+            print(count, title, url)
+            count += 1
+            frontier.add_many(page_urls, depth + 1)
+    finally:
+        # runs on errors and Ctrl-C too: stop the workers, never wait on a dead one
+        for q, n in ((url_queue, n_fetchers), (html_queue, n_parsers)):
+            for _ in range(n):
+                try:
+                    q.put_nowait(None)
+                except queue.Full:
+                    break
+        for w in workers:
+            w.join(timeout=JOIN_SECONDS)
+            if w.is_alive():
+                w.terminate()
+                w.join()                # reap it, so no zombie outlives the crawl
+        frontier.close()                # final checkpoint, so a finished crawl is not redone
+    return count - 1
+
+
 if __name__ == '__main__':
     base_url = 'https://mofanpy.com/'
     # base_url = "http://127.0.0.1:4000/"
+    if len(sys.argv) > 1:
+        base_url = sys.argv[1]          # e.g. a local stand-in site: http://127.0.0.1:4000/
+    frontier_path = sys.argv[2] if len(sys.argv) > 2 else None     # checkpoint file, resumed if present
 
     # DON'T OVER CRAWL THE WEBSITE OR YOU MAY NEVER VISIT AGAIN
     if base_url != "http://127.0.0.1:4000/":
@@ -31,33 +198,14 @@ if __name__ == '__main__':
     else:
         restricted_crawl = False
 
-    unseen = set([base_url,])
-    seen = set()
+    # a real site gets a few requests per second, the local stand-in as much as it takes
+    scheduler = PolitenessScheduler(rate=2, max_per_host=2) if restricted_crawl else \
+        PolitenessScheduler(rate=200, burst=8, max_per_host=4)
 
-    pool = mp.Pool(4)                       # number strongly affected
-    count, t1 = 1, time.time()
-
-    while len(unseen) != 0:              # still get some url to visit
-        if restricted_crawl and len(seen) > 20:
-            break
-        print('\nDistributed Crawling...')
-        crawl_jobs = [pool.apply_async(crawl, args=(url,)) for url in unseen]
-        # request connection
-        htmls = [j.get() for j in crawl_jobs]
-        htmls = [h for h in htmls if h is not None]     # remove None
-
-        print('\nDistributed Parsing...')
-        parse_jobs = [pool.apply_async(parse, args=(html,)) for html in htmls]
-        # parse html
-        results = [j.get() for j in parse_jobs]
-
-        print('\nAnalysing...')
-        seen.update(unseen)
-        unseen.clear()
-
-        for title, page_urls, url in results:
-            print(count, title, url)
-            count += 1
-            unseen.update(page_urls - seen)
+    t1 = time.time()
+    print('\nPipelined Crawling...')
+    pipeline_crawl(base_url, n_fetchers=4, n_parsers=2,     # number strongly affected
+                   max_pages=21 if restricted_crawl else None, scheduler=scheduler,
+                   frontier_path=frontier_path)
 
     print('Total time: %.1f s' % (time.time()-t1, ))
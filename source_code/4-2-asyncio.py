@@ -2,12 +2,20 @@ import aiohttp
 import asyncio
 import time
 from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
 from urllib.request import urljoin
+from frontier import Frontier
+from politeness import PolitenessScheduler, RETRY_STATUSES
 import re
-import multiprocessing as mp
+import sys
 
 base_url = "https://mofanpy.com/"
 # base_url = "http://127.0.0.1:4000/"
+if len(sys.argv) > 1:
+    base_url = sys.argv[1]          # e.g. a local stand-in site: http://127.0.0.1:4000/
+frontier_path = sys.argv[2] if len(sys.argv) > 2 else None     # checkpoint file, resumed if present
+CHECKPOINT_EVERY = 100              # pages between frontier checkpoints
+FETCH_TIMEOUT = 30                  # seconds per page, the host's politeness slot is held meanwhile
 
 # DON'T OVER CRAWL THE WEBSITE OR YOU MAY NEVER VISIT AGAIN
 if base_url != "http://127.0.0.1:4000/":
@@ -15,51 +23,102 @@ if base_url != "http://127.0.0.1:4000/":
 else:
     restricted_crawl = False
 
-seen = set()
-unseen = set([base_url])
 
-
-def parse(html):
+def parse(html, page_url):
     soup = BeautifulSoup(html, 'lxml')
     urls = soup.find_all('a', {"href": re.compile('^/.+?/$')})
     title = soup.find('h1').get_text().strip()
-    page_urls = set([urljoin(base_url, url['href']) for url in urls])
+    page_urls = set([urljoin(page_url, url['href']) for url in urls])
     url = soup.find('meta', {'property': "og:url"})['content']
     return title, page_urls, url
 
 
-async def crawl(url, session):
-    r = await session.get(url)
-    html = await r.text()
-    await asyncio.sleep(0.1)        # slightly delay for downloading
-    return html
+class RetryLater(Exception):
+    pass
+
+
+async def crawl(url, session, semaphore, scheduler):
+    # wait for the host's politeness slot instead of a fixed sleep, then for a free connection
+    await scheduler.acquire_async(url)
+    retry_after = None
+    try:
+        async with semaphore:
+            # the response goes back to the connection pool on the retry path too
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT)) as r:
+                if r.status in RETRY_STATUSES:
+                    retry_after = r.headers.get('Retry-After', 1)
+                    raise RetryLater(retry_after)
+                return await r.text()
+    finally:
+        scheduler.release(url, retry_after)
+
 
+async def fetch_and_parse(url, session, pool, semaphore, scheduler):
+    # only the download holds the semaphore, so new fetches start while this page is parsed
+    html = await crawl(url, session, semaphore, scheduler)
+    # parse in the process pool without blocking the event loop
+    return await asyncio.get_running_loop().run_in_executor(pool, parse, html, url)
 
-async def main(loop):
-    pool = mp.Pool(2)               # slightly affected
-    async with aiohttp.ClientSession() as session:
-        count = 1
-        while len(unseen) != 0:
-            if restricted_crawl and len(seen) > 20:
-                break
-            tasks = [loop.create_task(crawl(url, session)) for url in unseen]
-            finished, unfinished = await asyncio.wait(tasks)
-            htmls = [f.result() for f in finished]
 
-            parse_jobs = [pool.apply_async(
-                parse, args=(html,)) for html in htmls]
-            results = [j.get() for j in parse_jobs]
+async def main(concurrency=8, n_parsers=2, scheduler=None, max_retries=3):
+    semaphore = asyncio.Semaphore(concurrency)      # max pages downloading at once
+    frontier = Frontier(frontier_path)              # seen urls + queue, spills to disk
+    if frontier.resumed:
+        print('resuming: %d pages done, %d queued' % (frontier.n_done, len(frontier)))
+    frontier.add(base_url, 0)                       # priority = link depth, breadth first
+    if scheduler is None:   # a real site gets a few requests per second, the local stand-in more
+        scheduler = PolitenessScheduler(rate=2, max_per_host=2) if restricted_crawl else \
+            PolitenessScheduler(rate=200, burst=8, max_per_host=concurrency)
+    retries = {}
+    with ProcessPoolExecutor(n_parsers) as pool:    # slightly affected
+        async with aiohttp.ClientSession() as session:
+            count = last_checkpoint = frontier.n_done
+            count += 1
+            scheduled = 0
+            tasks = {}
+            while len(frontier) or tasks:
+                # schedule every newly found url straight away, no waiting for a whole level
+                while len(frontier) and not (restricted_crawl and scheduled > 20):
+                    url, _ = frontier.pop()
+                    scheduled += 1
+                    if not await scheduler.allowed_async(url):
+                        print('robots.txt disallows', url)
+                        frontier.done(url)
+                        continue
+                    tasks[asyncio.create_task(
+                        fetch_and_parse(url, session, pool, semaphore, scheduler))] = url
+                if not tasks:
+                    break
 
-            seen.update(unseen)
-            unseen.clear()
-            for title, page_urls, url in results:
-                print(count, title, url)
-                unseen.update(page_urls - seen)
-                count += 1
+                finished, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    page = tasks.pop(task)
+                    try:
+                        title, page_urls, url = task.result()
+                    except RetryLater:
+                        # the host is blocked for Retry-After, the scheduler holds the url back
+                        retries[page] = retries.get(page, 0) + 1
+                        if retries[page] <= max_retries:
+                            tasks[asyncio.create_task(
+                                fetch_and_parse(page, session, pool, semaphore, scheduler))] = page
+                        else:
+                            print('failed', page, 'gave up after %d retries' % max_retries)
+                            frontier.done(page)
+                        continue
+                    except Exception as e:
+                        print('failed', page, repr(e))
+                        frontier.done(page)
+                        continue
+                    print(count, title, url)
+                    frontier.add_many(page_urls, frontier.done(page) + 1)
+                    count += 1
+                # failures and robots.txt rejections count too, so compare with the last checkpoint
+                if frontier_path and frontier.n_done - last_checkpoint >= CHECKPOINT_EVERY:
+                    frontier.checkpoint()
+                    last_checkpoint = frontier.n_done
+    frontier.close()                                # final checkpoint
 
 if __name__ == "__main__":
     t1 = time.time()
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(main(loop))
-    loop.close()
+    asyncio.run(main())
     print("Async total time: ", time.time() - t1)
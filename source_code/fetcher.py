@@ -0,0 +1,291 @@
+"""
+Keep-alive HTTP fetcher shared by the urllib scripts and the crawlers.
+
+urllib's urlopen() opens a new TCP (and TLS) connection for every page. A Fetcher keeps
+idle HTTP/1.1 connections per host and reuses them, asks for compressed bodies
+(gzip/deflate, br when the brotli package is installed) and decodes them, and get_many()
+pipelines requests: several GETs are written to one connection before the answers are read.
+
+    from fetcher import urlopen         # drop-in: urlopen(url).read()
+
+Only a plain GET of a url string goes through the pool. urlopen() hands Request objects,
+POST data, extra urlopen arguments and urls covered by a proxy setting (http_proxy etc.)
+to urllib.request.urlopen unchanged, so it can replace urllib's import everywhere.
+
+Every process (and thread) gets its own session from get_session(), so pool / mp.Process
+workers keep their connections between pages and never share a socket after a fork.
+"""
+import gzip
+import http.client
+import io
+import os
+import socket
+import ssl
+import sys
+import threading
+import zlib
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+import urllib.request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+PIPELINE_DEPTH = 8      # requests in flight on one connection in get_many()
+DEFAULT_HEADERS = {
+    'User-Agent': 'Python-urllib/%d.%d' % sys.version_info[:2],
+    'Accept-Encoding': 'gzip, deflate' + (', br' if brotli else ''),
+    'Connection': 'keep-alive',
+}
+# a reused connection the server has closed in the meantime fails with one of these
+STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+
+def decode_body(body, content_encoding):
+    for coding in reversed([c.strip().lower() for c in (content_encoding or '').split(',') if c.strip()]):
+        if coding in ('gzip', 'x-gzip'):
+            body = gzip.decompress(body)
+        elif coding == 'deflate':
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:              # raw deflate without zlib header
+                body = zlib.decompress(body, -zlib.MAX_WBITS)
+        elif coding == 'br' and brotli:
+            body = brotli.decompress(body)
+        elif coding != 'identity':
+            raise URLError('unsupported Content-Encoding: %s' % coding)
+    return body
+
+
+class Response:
+    def __init__(self, url, status, reason, headers, body):
+        self.url, self.status, self.reason, self.headers = url, status, reason, headers
+        self.content = decode_body(body, headers.get('Content-Encoding'))
+
+    def read(self):
+        return self.content
+
+    def text(self, encoding=None):
+        charset = encoding or self.headers.get_content_charset() or 'utf-8'
+        return self.content.decode(charset)
+
+    def geturl(self):
+        return self.url
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HTTPError(self.url, self.status, self.reason, self.headers, io.BytesIO(self.content))
+        return self
+
+
+class _SharedReader:
+    # lets consecutive HTTPResponse objects parse one buffered socket stream (pipelining)
+    def __init__(self, reader):
+        self.reader = reader
+
+    def makefile(self, mode):
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self.reader, name)
+
+    def close(self):
+        pass                                # the connection outlives each response
+
+
+class Fetcher:
+    def __init__(self, timeout=30, headers=None, max_idle_per_host=4, max_redirects=5):
+        """
+        timeout -- socket timeout per connection, in seconds
+        headers -- extra request headers, merged over DEFAULT_HEADERS
+        max_idle_per_host -- idle keep-alive connections kept per host
+        max_redirects -- redirects followed by get()
+        """
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.max_idle_per_host = max_idle_per_host
+        self.max_redirects = max_redirects
+        self.idle = {}                      # (scheme, host, port) -> [HTTPConnection]
+        self.pid = os.getpid()
+        self.ssl_context = ssl.create_default_context()
+        self.n_connections = 0              # connections opened, for benchmarks
+
+    # ---- connection pool ----
+    @staticmethod
+    def _key(url):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise URLError('unsupported url scheme: %r' % url)
+        return parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80)
+
+    def _connect(self, key):
+        scheme, host, port = key
+        self.n_connections += 1
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _checkout(self, key, timeout=None):
+        """An idle connection to the host (reused=True) or a new one, set to this request's timeout."""
+        conns = self.idle.get(key)
+        conn, reused = (conns.pop(), True) if conns else (self._connect(key), False)
+        conn.timeout = self.timeout if timeout is None else timeout    # used by connect()
+        if conn.sock is not None:
+            conn.sock.settimeout(conn.timeout)
+        return conn, reused
+
+    def _drop_idle(self, key):
+        # the server closed one idle connection, the older ones are likely gone too
+        for conn in self.idle.pop(key, []):
+            conn.close()
+
+    def _checkin(self, key, conn, will_close):
+        conns = self.idle.setdefault(key, [])
+        if will_close or len(conns) >= self.max_idle_per_host:
+            conn.close()
+        else:
+            conns.append(conn)
+
+    def close(self):
+        for conns in self.idle.values():
+            for conn in conns:
+                conn.close()
+        self.idle.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- requests ----
+    @staticmethod
+    def _target(url):
+        parts = urlsplit(url)
+        return (parts.path or '/') + ('?' + parts.query if parts.query else '')
+
+    def _request(self, url, headers, timeout=None):
+        key = self._key(url)
+        conn, reused = self._checkout(key, timeout)
+        while True:
+            try:
+                conn.request('GET', self._target(url), headers=headers)
+                r = conn.getresponse()
+                body = r.read()
+            except STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                # the server dropped an idle connection: retry exactly once on a new one
+                self._drop_idle(key)
+                conn, reused = self._checkout(key, timeout)
+                continue
+            except Exception:
+                conn.close()
+                raise
+            self._checkin(key, conn, r.will_close)
+            return Response(url, r.status, r.reason, r.headers, body)
+
+    def get(self, url, headers=None, raise_errors=True, timeout=None):
+        """GET url over a pooled connection, following redirects. Raises HTTPError for 4xx/5xx
+        like urllib unless raise_errors is False. timeout overrides the session's for this call."""
+        headers = dict(self.headers, **(headers or {}))
+        for _ in range(self.max_redirects + 1):
+            response = self._request(url, headers, timeout)
+            location = response.headers.get('Location')
+            if response.status not in REDIRECT_STATUSES or not location:
+                break
+            url = urljoin(url, location)
+        return response.raise_for_status() if raise_errors else response
+
+    def get_many(self, urls, headers=None, depth=PIPELINE_DEPTH):
+        """
+        GET many urls, pipelining up to `depth` requests per connection (HTTP/1.1).
+        Returns responses in the order of urls; errors are not raised, check .status.
+        Redirects, and urls the server would not answer on the pipelined connection,
+        fall back to get().
+        """
+        headers = dict(self.headers, **(headers or {}))
+        responses = [None] * len(urls)
+        by_host = {}
+        for i, url in enumerate(urls):
+            by_host.setdefault(self._key(url), []).append(i)
+        for key, indices in by_host.items():
+            while indices:
+                batch = indices[:depth]
+                answered = self._pipeline(key, [urls[i] for i in batch], headers)
+                for i, response in zip(batch, answered):
+                    responses[i] = response
+                if not answered:            # pipelining failed, this one goes alone
+                    responses[batch[0]] = self.get(urls[batch[0]], headers, raise_errors=False)
+                indices = indices[max(1, len(answered)):]
+        for i, response in enumerate(responses):
+            if response.status in REDIRECT_STATUSES and response.headers.get('Location'):
+                responses[i] = self.get(urljoin(urls[i], response.headers['Location']), headers,
+                                        raise_errors=False)
+        return responses
+
+    def _pipeline(self, key, urls, headers):
+        # write all requests, then read the answers in order; stop early if the server closes
+        conn, reused = self._checkout(key)
+        host = urlsplit(urls[0]).netloc
+        lines = ''.join('%s: %s\r\n' % item for item in headers.items() if item[0].lower() != 'host')
+        payload = ''.join('GET %s HTTP/1.1\r\nHost: %s\r\n%s\r\n' % (self._target(url), host, lines)
+                          for url in urls).encode('latin-1')
+        while True:
+            answered, will_close = [], True
+            try:
+                if conn.sock is None:
+                    conn.connect()
+                conn.sock.sendall(payload)
+                reader = _SharedReader(conn.sock.makefile('rb'))
+                for url in urls:
+                    r = http.client.HTTPResponse(reader, method='GET')
+                    r.begin()
+                    answered.append(Response(url, r.status, r.reason, r.headers, r.read()))
+                    will_close = r.will_close
+                    if will_close:
+                        break
+            except (OSError, http.client.HTTPException):
+                will_close = True
+                if not answered and reused:     # stale idle connection: one more try on a new one
+                    conn.close()
+                    self._drop_idle(key)
+                    conn, reused = self._checkout(key)
+                    continue
+            self._checkin(key, conn, will_close)
+            return answered
+
+
+_local = threading.local()
+
+
+def get_session():
+    """The Fetcher of the current process and thread, created on first use."""
+    fetcher = getattr(_local, 'fetcher', None)
+    if fetcher is None or fetcher.pid != os.getpid():  # sockets inherited over fork are not ours
+        fetcher = _local.fetcher = Fetcher()
+    return fetcher
+
+
+def uses_proxy(url):
+    """True if urllib would send this url through a proxy (the Fetcher always connects directly)."""
+    parts = urlsplit(url)
+    return parts.scheme in urllib.request.getproxies() and not urllib.request.proxy_bypass(parts.hostname or '')
+
+
+def urlopen(url, data=None, timeout=None, **kwargs):
+    """
+    Drop-in for urllib.request.urlopen: same read()/HTTPError. A plain GET of a url string is
+    served keep-alive and compressed by this thread's Fetcher; anything else (Request objects,
+    data, context/cafile arguments, proxied urls) goes to urllib.request.urlopen as given.
+    """
+    if not isinstance(url, str) or data is not None or kwargs or uses_proxy(url):
+        if timeout is None:
+            timeout = socket._GLOBAL_DEFAULT_TIMEOUT
+        return urllib.request.urlopen(url, data, timeout, **kwargs)
+    return get_session().get(url, timeout=timeout)     # the timeout applies to this call only
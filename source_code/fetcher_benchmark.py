@@ -0,0 +1,77 @@
+"""
+Requests per second against a local HTTP/1.1 server: urllib's urlopen (a new connection per
+page) vs fetcher.py (keep-alive pool, compression, pipelining), single process and mp.Pool.
+
+    python fetcher_benchmark.py [n_requests] [page_kb]
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.request import urlopen
+import gzip
+import multiprocessing as mp
+import sys
+import threading
+import time
+
+import fetcher
+
+N_REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+PAGE = ('<html><body><h1>bench</h1>%s</body></html>' %
+        ('<p>filler text</p>' * (int(sys.argv[2]) if len(sys.argv) > 2 else 20) * 55)).encode()
+PAGE_GZ = gzip.compress(PAGE)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'       # keep-alive and pipelining
+    disable_nagle_algorithm = True      # TCP_NODELAY, as production servers set it
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        gz = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = PAGE_GZ if gz else PAGE
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if gz:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def fetch_urllib(url):
+    return len(urlopen(url).read())
+
+
+def fetch_pooled(url):
+    return len(fetcher.urlopen(url).read())
+
+
+def run(name, func, urls):
+    t = time.perf_counter()
+    sizes = func(urls)
+    seconds = time.perf_counter() - t
+    assert all(size == len(PAGE) for size in sizes)
+    print('%-34s %8.0f req/s  (%.2f s)' % (name, len(urls) / seconds, seconds))
+
+
+if __name__ == '__main__':
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = 'http://127.0.0.1:%d/' % server.server_port
+    urls = [base + 'p%d/' % i for i in range(N_REQUESTS)]
+    print('%d requests, %.1f KB page (%.1f KB gzipped)\n' % (N_REQUESTS, len(PAGE) / 1024, len(PAGE_GZ) / 1024))
+
+    run('urllib urlopen', lambda us: [fetch_urllib(u) for u in us], urls)
+    session = fetcher.Fetcher()
+    run('fetcher keep-alive', lambda us: [len(session.get(u).read()) for u in us], urls)
+    run('fetcher pipelined (depth %d)' % fetcher.PIPELINE_DEPTH,
+        lambda us: [len(r.read()) for r in session.get_many(us)], urls)
+    print('connections opened by fetcher: %d' % session.n_connections)
+    session.close()
+
+    with mp.Pool(4) as pool:
+        pool.map(abs, range(4))             # start the workers outside the timings
+        run('mp.Pool(4) + urllib urlopen', lambda us: pool.map(fetch_urllib, us, chunksize=16), urls)
+        run('mp.Pool(4) + fetcher session', lambda us: pool.map(fetch_pooled, us, chunksize=16), urls)
+    server.shutdown()
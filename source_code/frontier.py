@@ -0,0 +1,211 @@
+"""
+URL frontier for the crawlers: what has been seen, and what to crawl next.
+
+- urls are normalized before dedup, so /a/../b/#top and /b/ count as one page
+- the seen set is a Bloom filter: a fixed bit array, ~1.8 MB per million urls at 0.1% false
+  positives, instead of a set of full url strings (a false positive only skips a page)
+- the priority queue (lowest priority first, FIFO within a priority) keeps its best part in a
+  heap and spills the rest into SQLite, so the queue is not limited by memory
+- checkpoint() writes queue, in-flight urls and the filter to the same SQLite file;
+  Frontier(path) on an existing file resumes from the last checkpoint
+"""
+import hashlib
+import heapq
+import math
+import os
+import posixpath
+import sqlite3
+import tempfile
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote, unquote
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """Canonical form used for dedup: lower-case scheme/host, no default port, no fragment,
+    dot segments resolved, sorted query, consistent percent-encoding."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    netloc = '[%s]' % host if ':' in host else host     # IPv6
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc += ':%d' % parts.port
+    userinfo = parts.netloc.rpartition('@')[0]
+    if userinfo:
+        netloc = userinfo + '@' + netloc
+    path = parts.path or '/'
+    trailing = path.endswith('/')
+    path = posixpath.normpath(path)         # resolves . and .. segments
+    path = '/' + (path.lstrip('/') if path != '.' else '')
+    if trailing and not path.endswith('/'):
+        path += '/'
+    path = quote(unquote(path), safe="/:@!$&'()*+,;=-._~")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+class BloomFilter:
+    def __init__(self, capacity=1000000, error_rate=0.001, bits=None):
+        # m = -n ln(p) / ln(2)^2 bits, k = m/n ln(2) hash functions
+        self.n_bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.n_bits + 7) // 8)
+        self.n_bits = min(self.n_bits, len(self.bits) * 8)
+
+    def _positions(self, key):
+        # double hashing: k positions from the two halves of one 128-bit digest
+        digest = hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key):
+        """Add key, return False if it (probably) was there already."""
+        new = False
+        for p in self._positions(key):
+            mask = 1 << (p & 7)
+            if not self.bits[p >> 3] & mask:
+                self.bits[p >> 3] |= mask
+                new = True
+        return new
+
+
+class Frontier:
+    def __init__(self, path=None, capacity=1000000, error_rate=0.001, memory_size=100000,
+                 batch_size=1000):
+        """
+        path -- SQLite file for the spilled queue and checkpoints, resumed if it exists
+                (None: a temporary file removed by close())
+        capacity, error_rate -- Bloom filter sizing, more urls than capacity raise the error rate
+        memory_size -- queued urls kept in memory before spilling to disk
+        batch_size -- urls moved between memory and disk at a time
+        """
+        self.temp_path = None
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix='.frontier.sqlite')
+            os.close(fd)
+            self.temp_path = path
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS queue (priority, seq INTEGER, url TEXT);
+            CREATE INDEX IF NOT EXISTS queue_order ON queue (priority, seq);
+            CREATE TABLE IF NOT EXISTS in_flight (priority, seq INTEGER, url TEXT);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+        ''')
+        self.memory_size, self.batch_size = memory_size, batch_size
+        self.heap = []              # (priority, seq, url), everything better than the disk part
+        self.pending = []           # rows on their way to the disk part
+        self.on_disk = 0
+        self.disk_floor = None      # best (priority, seq) on disk, None when nothing is there
+        self.in_flight = {}         # url -> (priority, seq), popped but not done yet
+        self.seq = self.n_seen = self.n_done = 0
+
+        meta = dict(self.db.execute('SELECT key, value FROM meta'))
+        if 'bloom' in meta:
+            self.seen = BloomFilter(meta['capacity'], meta['error_rate'], meta['bloom'])
+            self.seq, self.n_seen, self.n_done = meta['seq'], meta['n_seen'], meta['n_done']
+            # urls that were being crawled at the checkpoint go back into the queue
+            self.db.execute('INSERT INTO queue SELECT * FROM in_flight')
+            self.db.execute('DELETE FROM in_flight')
+            self.db.commit()
+            self.on_disk = self.db.execute('SELECT COUNT(*) FROM queue').fetchone()[0]
+            self._update_floor()
+        else:
+            self.seen = BloomFilter(capacity, error_rate)
+            self.db.executemany('INSERT INTO meta VALUES (?, ?)',
+                                [('capacity', capacity), ('error_rate', error_rate)])
+        self.resumed = 'bloom' in meta
+
+    def __len__(self):
+        return len(self.heap) + len(self.pending) + self.on_disk
+
+    def add(self, url, priority=0):
+        """Queue url unless an equal url was seen before. Returns the normalized url or None."""
+        url = normalize_url(url)
+        if not self.seen.add(url):
+            return None
+        self.n_seen += 1
+        self.seq += 1
+        item = (priority, self.seq, url)
+        if self.disk_floor is not None and item[:2] > self.disk_floor:
+            self.pending.append(item)      # behind the disk part, keep the order
+            if len(self.pending) >= self.batch_size:
+                self._flush()
+        else:
+            heapq.heappush(self.heap, item)
+            if len(self.heap) > self.memory_size:
+                self._spill()
+        return url
+
+    def add_many(self, urls, priority=0):
+        return [url for url in (self.add(u, priority) for u in urls) if url]
+
+    def pop(self):
+        """Next (url, priority), or None when the queue is empty. Call done(url) when finished."""
+        if not self.heap and (self.pending or self.on_disk):
+            self._refill()
+        if not self.heap:
+            return None
+        priority, seq, url = heapq.heappop(self.heap)
+        self.in_flight[url] = (priority, seq)
+        return url, priority
+
+    def done(self, url):
+        """Mark a popped url as finished (crawled or failed); returns its priority."""
+        self.n_done += 1
+        return self.in_flight.pop(url)[0]
+
+    def checkpoint(self):
+        """Persist the whole frontier state; a crash after this resumes from here.
+
+        Not free: every call rewrites the whole Bloom filter (~1.8 MB per million urls of
+        capacity) and every in-memory queue row (up to memory_size), so call it every few
+        hundred pages rather than after each one."""
+        self._flush()
+        self.db.execute('DELETE FROM in_flight')
+        self.db.executemany('INSERT INTO in_flight VALUES (?, ?, ?)',
+                            [(p, s, url) for url, (p, s) in self.in_flight.items()] + self.heap)
+        self.db.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                            [('bloom', bytes(self.seen.bits)), ('seq', self.seq),
+                             ('n_seen', self.n_seen), ('n_done', self.n_done)])
+        self.db.commit()
+
+    def close(self, checkpoint=True):
+        if checkpoint and not self.temp_path:
+            self.checkpoint()
+        self.db.close()
+        if self.temp_path:
+            os.remove(self.temp_path)
+
+    # ---- memory <-> disk ----
+    def _flush(self):
+        if self.pending:
+            self.db.executemany('INSERT INTO queue VALUES (?, ?, ?)', self.pending)
+            self.on_disk += len(self.pending)
+            self.pending = []
+
+    def _update_floor(self):
+        row = self.db.execute('SELECT priority, seq FROM queue ORDER BY priority, seq LIMIT 1').fetchone()
+        self.disk_floor = tuple(row) if row else None
+
+    def _spill(self):
+        # move the worse half of the heap to disk; what stays is still better than the disk part
+        self.heap.sort()
+        keep = len(self.heap) // 2
+        self.pending.extend(self.heap[keep:])
+        del self.heap[keep:]
+        self._flush()
+        self._update_floor()
+
+    def _refill(self):
+        self._flush()
+        rows = self.db.execute('SELECT rowid, priority, seq, url FROM queue ORDER BY priority, seq LIMIT ?',
+                               (self.batch_size,)).fetchall()
+        self.db.executemany('DELETE FROM queue WHERE rowid = ?', [(row[0],) for row in rows])
+        self.on_disk -= len(rows)
+        self.heap = [tuple(row[1:]) for row in rows]   # already in heap order
+        self._update_floor()
@@ -0,0 +1,212 @@
+"""
+Per-host politeness scheduler for the crawlers.
+
+Every host gets a token bucket (requests per second + burst) and a cap on concurrent
+requests. A Retry-After answer (429/503) blocks the host for the given time, and a
+robots.txt Crawl-delay slows its bucket down. Hosts are independent, so a crawl over
+many hosts runs at full speed while each single host only gets what it allows.
+
+The core is non-blocking (try_acquire/release) so it can drive both the multiprocessing
+coordinator in 4-1 and the asyncio tasks in 4-2 (acquire_async). robots.txt is fetched with
+a timeout in a worker thread, so a slow host never stalls the others.
+"""
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+from urllib.robotparser import RobotFileParser
+
+RETRY_STATUSES = (429, 503)
+ROBOTS_POLL = 0.05      # seconds between checks while a host's robots.txt is loading
+ROBOTS_THREADS = 4      # robots.txt files loaded at the same time
+
+
+def host_of(url):
+    parts = urlsplit(url)
+    return '%s://%s' % (parts.scheme, parts.netloc.lower())
+
+
+def read_robots(robots, timeout):
+    # RobotFileParser.read() with a socket timeout, read() itself can wait forever
+    try:
+        with urlopen(robots.url, timeout=timeout) as f:
+            raw = f.read()
+    except HTTPError as err:
+        if err.code in (401, 403):
+            robots.disallow_all = True
+        elif 400 <= err.code < 500:
+            robots.allow_all = True
+    else:
+        robots.parse(raw.decode('utf-8').splitlines())
+
+
+def parse_retry_after(value, now=None):
+    # Retry-After is either delay-seconds or an HTTP-date
+    if value is None:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - (now or time.time()))
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class HostState:
+    def __init__(self, rate, burst, max_active):
+        self.rate = rate                # tokens per second
+        self.burst = burst              # bucket size
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.max_active = max_active
+        self.active = 0
+        self.blocked_until = 0.0        # set by Retry-After
+        self.robots = None              # RobotFileParser once loaded
+        self.robots_loading = None      # Future of the background load
+        self.released = None            # asyncio.Event, created on demand
+
+    def refill(self, now):
+        if now <= self.updated:     # a caller's `now` taken before this host was first seen
+            return
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def slow_down(self, delay):
+        # robots.txt crawl-delay: at most one request every `delay` seconds
+        if delay and delay > 0:
+            self.rate = min(self.rate, 1.0 / delay)
+            self.burst = 1
+            self.tokens = min(self.tokens, 1)
+
+
+class PolitenessScheduler:
+    def __init__(self, rate=5.0, burst=2, max_per_host=2, user_agent='*',
+                 respect_robots=True, max_delay=60.0, robots_timeout=10.0):
+        """
+        rate -- requests per second per host
+        burst -- requests a host may get back to back after being idle
+        max_per_host -- concurrent requests per host
+        user_agent -- name looked up in robots.txt
+        respect_robots -- load robots.txt for Crawl-delay and disallowed paths
+        max_delay -- upper bound for Retry-After / Crawl-delay waits, in seconds
+        robots_timeout -- socket timeout for fetching robots.txt, in seconds
+        """
+        self.rate, self.burst, self.max_per_host = rate, burst, max_per_host
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.max_delay = max_delay
+        self.robots_timeout = robots_timeout
+        self.hosts = {}
+        self.robots_loader = None       # ThreadPoolExecutor, created on demand
+
+    def host(self, url):
+        key = host_of(url)
+        if key not in self.hosts:
+            self.hosts[key] = HostState(self.rate, self.burst, self.max_per_host)
+        return self.hosts[key]
+
+    # ---- robots.txt ----
+    def load_robots(self, url):
+        """Fetch robots.txt of the url's host once (blocking); later calls are free."""
+        state = self.host(url)
+        if state.robots is not None or not self.respect_robots:
+            return state
+        robots = RobotFileParser(host_of(url) + '/robots.txt')
+        try:
+            read_robots(robots, self.robots_timeout)
+        except Exception:
+            robots.allow_all = True     # unreachable or too slow robots.txt: no restrictions
+        delay = robots.crawl_delay(self.user_agent)
+        if delay is not None:
+            state.slow_down(min(float(delay), self.max_delay))
+        state.robots = robots           # set last: other threads see the crawl-delay with it
+        return state
+
+    def robots_ready(self, url):
+        """True once robots.txt of the url's host is loaded; until then it loads in a worker
+        thread and this returns False straight away."""
+        state = self.host(url)
+        if state.robots is not None or not self.respect_robots:
+            return True
+        if state.robots_loading is None:
+            if self.robots_loader is None:
+                self.robots_loader = ThreadPoolExecutor(ROBOTS_THREADS)
+            state.robots_loading = self.robots_loader.submit(self.load_robots, url)
+        return False
+
+    def allowed(self, url):
+        """Whether robots.txt allows url; blocks on the host's first call unless robots_ready()."""
+        state = self.load_robots(url)
+        return state.robots is None or state.robots.can_fetch(self.user_agent, url)
+
+    # ---- token bucket + concurrency cap ----
+    def try_acquire(self, url, now=None):
+        """
+        Take a slot for url if the host allows it right now.
+        Returns 0 when acquired, otherwise the seconds to wait before trying again
+        (math.inf when the host is at its concurrency cap: wait for a release).
+        Never blocks: a host whose robots.txt is still loading is retried after ROBOTS_POLL.
+        """
+        if not self.robots_ready(url):
+            return ROBOTS_POLL
+        state = self.host(url)
+        now = time.monotonic() if now is None else now
+        if now < state.blocked_until:
+            return state.blocked_until - now
+        if state.active >= state.max_active:
+            return math.inf
+        state.refill(now)
+        if state.tokens < 1:
+            return (1 - state.tokens) / state.rate
+        state.tokens -= 1
+        state.active += 1
+        return 0.0
+
+    def release(self, url, retry_after=None):
+        """Give the slot back; retry_after (header value or seconds) blocks the host for a while."""
+        state = self.host(url)
+        state.active = max(0, state.active - 1)
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            state.blocked_until = max(state.blocked_until,
+                                      time.monotonic() + min(delay, self.max_delay))
+        if state.released is not None:
+            state.released.set()
+
+    def acquire(self, url):
+        """Blocking acquire for simple sequential scripts."""
+        while True:
+            wait = self.try_acquire(url)
+            if wait == 0:
+                return
+            time.sleep(min(wait, 0.05) if math.isinf(wait) else wait)
+
+    async def load_robots_async(self, url):
+        state = self.host(url)
+        if state.robots is None and self.respect_robots:
+            await asyncio.get_running_loop().run_in_executor(None, self.load_robots, url)
+        return state
+
+    async def allowed_async(self, url):
+        await self.load_robots_async(url)
+        return self.allowed(url)
+
+    async def acquire_async(self, url):
+        """Wait without blocking the event loop; robots.txt is loaded in a thread."""
+        state = await self.load_robots_async(url)
+        while True:
+            wait = self.try_acquire(url)
+            if wait == 0:
+                return
+            if math.isinf(wait):
+                if state.released is None:
+                    state.released = asyncio.Event()
+                state.released.clear()
+                await state.released.wait()
+            else:
+                await asyncio.sleep(wait)
@@ -0,0 +1,90 @@
+import importlib.util
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+# the scripts import their helpers by bare module name (from fetcher import urlopen)
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SOURCE_DIR)
+
+
+def load_script(filename, name):
+    """Import a numbered script such as 4-1-distributed-scraping.py, whose name is not an identifier."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SOURCE_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    # page i links to i+1 and 2i+1, like the tutorial site the crawlers were written for
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, body=b'', headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        site = self.server.site
+        site.requests.append(self.path)
+        if self.path == '/robots.txt':
+            return self.send(200, site.robots.encode())
+        path = '/p0/' if self.path == '/' else self.path
+        try:
+            i = int(path.strip('/')[1:])
+        except ValueError:
+            return self.send(404)
+        if i >= site.n_pages:
+            return self.send(404)
+        if path in site.busy:               # answer 429 the first time
+            site.busy.discard(path)
+            return self.send(429, b'slow down' * 200000, [('Retry-After', '0')])   # not buffered whole
+        time.sleep(site.delay)
+        links = ''.join('<a href="/p%d/">p%d</a>' % (j, j) for j in (i + 1, 2 * i + 1) if j < site.n_pages)
+        body = ('<html><head><meta property="og:url" content="%s%s"></head><body><h1> Page %d </h1>'
+                '%s<a href="/about">no trailing slash</a></body></html>' % (site.url[:-1], path, i, links))
+        self.send(200, body.encode(), [('Content-Type', 'text/html; charset=utf-8')])
+
+
+class Site:
+    def __init__(self, n_pages, delay=0.0, robots='User-agent: *\nDisallow:\n', busy=()):
+        self.n_pages, self.delay, self.robots = n_pages, delay, robots
+        self.busy = set(busy)               # paths answered with 429 once
+        self.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+        self.server.daemon_threads = True
+        self.server.site = self
+        self.url = 'http://127.0.0.1:%d/' % self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def pages(self):
+        return [path for path in self.requests if path != '/robots.txt']
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def make_site():
+    """Start local test sites: make_site(n_pages, delay=0, robots=..., busy=()) -> Site."""
+    sites = []
+
+    def make(*args, **kwargs):
+        sites.append(Site(*args, **kwargs))
+        return sites[-1]
+    yield make
+    for site in sites:
+        site.close()
@@ -0,0 +1,78 @@
+import asyncio
+import sys
+
+import pytest
+
+from conftest import load_script
+from politeness import PolitenessScheduler
+
+
+@pytest.fixture
+def crawler(monkeypatch):
+    # the script reads its base url from sys.argv when imported
+    monkeypatch.setattr(sys, 'argv', ['4-2-asyncio.py'])
+    return load_script('4-2-asyncio.py', 'asyncio_crawler')
+
+
+@pytest.fixture
+def crawl_site(crawler, monkeypatch):
+    def crawl(site, **kwargs):
+        monkeypatch.setattr(crawler, 'base_url', site.url)
+        monkeypatch.setattr(crawler, 'restricted_crawl', False)
+        scheduler = PolitenessScheduler(rate=1000, burst=50, max_per_host=8)
+        asyncio.run(crawler.main(concurrency=4, n_parsers=2, scheduler=scheduler, **kwargs))
+    return crawl
+
+
+def test_crawls_every_page_once(make_site, crawl_site, capsys):
+    site = make_site(40)
+    crawl_site(site)
+    pages = site.pages()
+    assert len(pages) == len(set(pages)) == 40
+    out = capsys.readouterr().out.splitlines()
+    assert len(out) == 40 and out[-1].startswith('40 Page ')
+
+
+def test_retry_after(make_site, crawl_site, capsys):
+    site = make_site(10, busy={'/p3/'})
+    crawl_site(site)
+    assert site.pages().count('/p3/') == 2 and len(set(site.pages())) == 10
+    assert 'failed' not in capsys.readouterr().out
+
+
+def test_gives_up_after_max_retries(make_site, crawl_site, capsys):
+    site = make_site(10, busy={'/p3/'})
+    crawl_site(site, max_retries=0)
+    assert 'failed %sp3/ gave up after 0 retries' % site.url in capsys.readouterr().out
+    assert site.pages().count('/p3/') == 1
+
+
+def test_robots_disallowed_pages_are_skipped(make_site, crawl_site, capsys, monkeypatch):
+    site = make_site(5)
+    monkeypatch.setattr(site, 'robots', 'User-agent: *\nDisallow: /p2/\n')
+    crawl_site(site)
+    out = capsys.readouterr().out
+    assert 'robots.txt disallows %sp2/' % site.url in out
+    assert sorted(set(site.pages())) == ['/', '/p1/', '/p3/', '/p4/']
+
+
+def test_retry_releases_the_connection(crawler, make_site):
+    site = make_site(5, busy={'/p1/'})
+    scheduler = PolitenessScheduler(rate=1000, burst=50, max_per_host=8, respect_robots=False)
+
+    async def run():
+        # one pooled connection: a response left open on the retry path would block the next page
+        async with crawler.aiohttp.ClientSession(connector=crawler.aiohttp.TCPConnector(limit=1)) as session:
+            semaphore = asyncio.Semaphore(4)
+            with pytest.raises(crawler.RetryLater):
+                await crawler.crawl(site.url + 'p1/', session, semaphore, scheduler)
+            return await asyncio.wait_for(crawler.crawl(site.url + 'p2/', session, semaphore, scheduler), 2)
+    assert 'Page 2' in asyncio.run(run())
+    assert scheduler.host(site.url).active == 0
+
+
+def test_fetch_timeout(crawler, make_site, crawl_site, capsys, monkeypatch):
+    site = make_site(3, delay=1)
+    monkeypatch.setattr(crawler, 'FETCH_TIMEOUT', 0.2)
+    crawl_site(site)
+    assert 'failed %s TimeoutError()' % site.url in capsys.readouterr().out
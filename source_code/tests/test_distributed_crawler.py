@@ -0,0 +1,58 @@
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from conftest import load_script
+from politeness import PolitenessScheduler
+
+crawler = load_script('4-1-distributed-scraping.py', 'distributed_scraping')
+
+
+def fast_scheduler():
+    return PolitenessScheduler(rate=1000, burst=50, max_per_host=4)
+
+
+def test_parse():
+    html = ('<html><head><meta property="og:url" content="http://x/p1/"></head><body><h1> T </h1>'
+            '<a href="/a/">a</a><a href="/a/">again</a><a href="/b">no slash</a></body></html>')
+    assert crawler.parse(html, 'http://x/p1/') == ('T', {'http://x/a/'}, 'http://x/p1/')
+
+
+def test_crawls_every_page_once(make_site, capsys):
+    site = make_site(40)
+    assert crawler.pipeline_crawl(site.url, n_fetchers=3, n_parsers=2, scheduler=fast_scheduler()) == 40
+    pages = site.pages()
+    assert len(pages) == len(set(pages)) == 40
+    assert 'Page 39' in capsys.readouterr().out
+
+
+def test_max_pages(make_site):
+    site = make_site(40)
+    assert crawler.pipeline_crawl(site.url, max_pages=5, scheduler=fast_scheduler()) == 5
+    assert len(site.pages()) == 5
+
+
+def test_robots_disallow(make_site, capsys):
+    site = make_site(10, robots='User-agent: *\nDisallow: /p3/\n')
+    assert crawler.pipeline_crawl(site.url, scheduler=fast_scheduler()) == 8      # p3 and p7 behind it
+    assert '/p3/' not in site.pages()
+    assert 'robots.txt disallows %sp3/' % site.url in capsys.readouterr().out
+
+
+def test_dead_worker_raises_and_stops_the_others(make_site):
+    site = make_site(400, delay=0.5)      # ~50 s to crawl with all workers alive
+
+    def kill_a_worker():
+        while len(site.pages()) < 4:
+            time.sleep(0.05)
+        os.kill(mp.active_children()[0].pid, signal.SIGKILL)
+    threading.Thread(target=kill_a_worker, daemon=True).start()
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match='exited with code'):
+        crawler.pipeline_crawl(site.url, scheduler=fast_scheduler())
+    assert time.monotonic() - start < 30        # noticed while the others still work
+    assert not mp.active_children()
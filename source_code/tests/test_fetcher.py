@@ -0,0 +1,174 @@
+import gzip
+import os
+import socket
+import threading
+import time
+import urllib.request
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+import fetcher
+from fetcher import decode_body, Fetcher
+
+BODY = b'<html>' + b'filler text ' * 200 + b'</html>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    timeout = 0.3                       # idle keep-alive connections are closed by the server
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.n_connections += 1
+
+    def send(self, status, body=b'', headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        accepts = self.headers.get('Accept-Encoding', '')
+        if self.path.startswith('/redirect/'):
+            return self.send(302, headers=[('Location', '/page/' + self.path.rsplit('/', 1)[1])])
+        if self.path == '/missing':
+            return self.send(404, b'not here')
+        if self.path == '/slow':
+            time.sleep(1)
+        if self.path == '/deflate':
+            return self.send(200, zlib.compress(BODY), [('Content-Encoding', 'deflate')])
+        if 'gzip' in accepts:
+            return self.send(200, gzip.compress(BODY + self.path.encode()), [('Content-Encoding', 'gzip')])
+        self.send(200, BODY + self.path.encode())
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send(200, b'posted ' + body + b' ' + self.headers.get('X-Test', '').encode())
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.n_connections = 0
+    server.url = 'http://127.0.0.1:%d/' % server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_decode_body():
+    assert decode_body(gzip.compress(BODY), 'gzip') == BODY
+    assert decode_body(zlib.compress(BODY)[2:-4], 'deflate') == BODY      # raw deflate
+    assert decode_body(gzip.compress(zlib.compress(BODY)), 'deflate, gzip') == BODY
+    assert decode_body(BODY, None) == BODY
+    with pytest.raises(URLError):
+        decode_body(BODY, 'compress')
+
+
+def test_keep_alive_reuses_one_connection(server):
+    with Fetcher() as session:
+        for i in range(5):
+            assert session.get(server.url + 'page/%d' % i).read() == BODY + b'/page/%d' % i
+        assert session.get(server.url + 'deflate').read() == BODY
+        assert session.n_connections == server.n_connections == 1
+
+
+def test_redirects_and_errors(server):
+    with Fetcher(max_redirects=1) as session:
+        response = session.get(server.url + 'redirect/7')
+        assert response.geturl() == server.url + 'page/7' and response.read().endswith(b'/page/7')
+        with pytest.raises(HTTPError) as error:
+            session.get(server.url + 'missing')
+        assert error.value.code == 404 and error.value.read() == b'not here'
+        assert session.get(server.url + 'missing', raise_errors=False).status == 404
+        with pytest.raises(URLError):
+            session.get('ftp://example.com/')
+
+
+def test_get_many_keeps_order(server):
+    urls = [server.url + 'page/%d' % i for i in range(20)] + [server.url + 'redirect/3', server.url + 'missing']
+    with Fetcher() as session:
+        responses = session.get_many(urls, depth=4)
+        assert [r.read() for r in responses[:20]] == [BODY + b'/page/%d' % i for i in range(20)]
+        assert responses[20].geturl() == server.url + 'page/3'
+        assert responses[21].status == 404
+        assert session.n_connections <= 2
+
+
+def test_stale_connections_are_retried_once(server):
+    with Fetcher() as session:
+        key = session._key(server.url)
+        for _ in range(3):
+            conn = session._connect(key)
+            conn.connect()
+            session._checkin(key, conn, False)
+        time.sleep(0.6)                 # the server closes all three in the meantime
+        opened = session.n_connections
+        assert session.get(server.url + 'page/1').read().endswith(b'/page/1')
+        assert session.n_connections - opened == 1     # no retry on each stale connection
+
+        for _ in range(3):
+            conn = session._connect(key)
+            conn.connect()
+            session._checkin(key, conn, False)
+        time.sleep(0.6)
+        assert len(session.get_many([server.url + 'page/2'] * 3)) == 3
+
+
+def test_per_call_timeout(server):
+    with Fetcher(timeout=30) as session:
+        session.get(server.url)
+        with pytest.raises((socket.timeout, OSError)):
+            session.get(server.url + 'slow', timeout=0.2)
+        assert session.timeout == 30
+        assert session.get(server.url + 'page/1').status == 200
+
+
+def test_session_per_process(server):
+    session = fetcher.get_session()
+    assert fetcher.get_session() is session
+    assert fetcher.urlopen(server.url + 'page/1').read().endswith(b'/page/1')
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:                        # the child must not reuse the parent's sockets
+        os.write(write, b'1' if fetcher.get_session() is not session else b'0')
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read, 1) == b'1'
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(fetcher.get_session()))
+    thread.start()
+    thread.join()
+    assert other[0] is not session
+
+
+def test_urlopen_falls_back_to_urllib(server, monkeypatch):
+    # Request objects, POST data and extra arguments go to urllib.request.urlopen unchanged
+    request = urllib.request.Request(server.url + 'form', data=b'a=1', headers={'X-Test': 'yes'})
+    assert fetcher.urlopen(request).read() == b'posted a=1 yes'
+    assert fetcher.urlopen(server.url + 'form', b'b=2', timeout=5).read() == b'posted b=2 '
+    assert fetcher.urlopen(server.url + 'page/3', context=None).read().endswith(b'/page/3')
+
+    calls = []
+    monkeypatch.setattr(urllib.request, 'urlopen', lambda *args, **kwargs: calls.append(args))
+    monkeypatch.delenv('no_proxy', raising=False)
+    monkeypatch.delenv('NO_PROXY', raising=False)
+    assert fetcher.urlopen(server.url + 'page/4').read().endswith(b'/page/4')
+    assert calls == []
+    monkeypatch.setenv('http_proxy', 'http://proxy.invalid:3128')
+    fetcher.urlopen(server.url + 'page/5')
+    assert calls and calls[0][0] == server.url + 'page/5'
+    monkeypatch.setenv('no_proxy', '127.0.0.1')
+    assert fetcher.urlopen(server.url + 'page/6').read().endswith(b'/page/6')
+    assert len(calls) == 1
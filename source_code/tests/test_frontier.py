@@ -0,0 +1,108 @@
+import os
+import random
+
+import pytest
+
+from conftest import load_script
+from frontier import BloomFilter, Frontier, normalize_url
+from politeness import PolitenessScheduler
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('HTTP://Example.COM:80/a/./b/../c/#top', 'http://example.com/a/c/'),
+    ('https://example.com:443', 'https://example.com/'),
+    ('http://example.com:8080/x?b=2&a=1', 'http://example.com:8080/x?a=1&b=2'),
+    ('http://example.com/%7Euser/a%20b', 'http://example.com/~user/a%20b'),
+    ('http://user@[::1]:81/', 'http://user@[::1]:81/'),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    assert bloom.add('a') and not bloom.add('a') and 'a' in bloom
+    for i in range(2000):
+        bloom.add('http://x/%d' % i)
+    false_positives = sum('http://y/%d' % i in bloom for i in range(2000))
+    assert false_positives < 60
+
+
+def drain(frontier):
+    popped = []
+    while True:
+        item = frontier.pop()
+        if item is None:
+            return popped
+        frontier.done(item[0])
+        popped.append(item)
+
+
+def test_dedup_and_order():
+    frontier = Frontier()
+    assert frontier.add('http://a/x/') == 'http://a/x/'
+    assert frontier.add('http://A/x/#frag') is None
+    assert frontier.add_many(['http://a/y/', 'http://a/./y/', 'http://a/z/'], 1) == ['http://a/y/', 'http://a/z/']
+    frontier.add('http://a/w/', 0)
+    assert drain(frontier) == [('http://a/x/', 0), ('http://a/w/', 0), ('http://a/y/', 1), ('http://a/z/', 1)]
+    assert frontier.n_seen == frontier.n_done == 4
+    path = frontier.temp_path
+    frontier.close()
+    assert not os.path.exists(path)
+
+
+def test_order_kept_across_disk_spill():
+    rnd = random.Random(1)
+    frontier = Frontier(memory_size=8, batch_size=3)
+    items = [('http://a/%d/' % i, rnd.randrange(4)) for i in range(300)]
+    for url, priority in items[:200]:
+        frontier.add(url, priority)
+    assert frontier.on_disk > 0
+    # pop half, add the rest while the queue is partly on disk
+    popped = [frontier.pop() for _ in range(100)]
+    for url, priority in items[200:]:
+        frontier.add(url, priority)
+    popped += drain(frontier)
+    seq = {url: i for i, (url, _) in enumerate(items)}
+    first, rest = popped[:100], popped[100:]
+    expected = sorted(items[:200], key=lambda item: (item[1], seq[item[0]]))[:100]
+    assert first == expected
+    assert rest == sorted(set(items) - set(first), key=lambda item: (item[1], seq[item[0]]))
+    frontier.close()
+
+
+def test_checkpoint_and_resume(tmp_path):
+    path = str(tmp_path / 'frontier.sqlite')
+    frontier = Frontier(path, memory_size=4, batch_size=2)
+    frontier.add_many(['http://a/%d/' % i for i in range(20)])
+    done = frontier.pop()[0]
+    frontier.done(done)
+    in_flight = frontier.pop()[0]       # popped but not done at the checkpoint
+    frontier.checkpoint()
+    frontier.add('http://a/after/')     # lost: added after the checkpoint
+    frontier.db.close()                 # crash: no close(), no final checkpoint
+
+    resumed = Frontier(path, memory_size=4, batch_size=2)
+    assert resumed.resumed and resumed.n_done == 1 and resumed.n_seen == 20
+    assert resumed.add(done) is None and resumed.add('http://a/5/') is None
+    urls = [url for url, _ in drain(resumed)]
+    assert urls == ['http://a/%d/' % i for i in range(1, 20)] and in_flight in urls
+    resumed.close()
+
+    finished = Frontier(path)
+    assert finished.resumed and len(finished) == 0 and finished.n_done == 20
+    finished.close()
+
+
+def test_crawl_resumes_from_checkpoint(make_site, tmp_path, monkeypatch):
+    crawler = load_script('4-1-distributed-scraping.py', 'distributed_scraping')
+    monkeypatch.setattr(crawler, 'CHECKPOINT_EVERY', 5)
+    site = make_site(30)
+    path = str(tmp_path / 'crawl.sqlite')
+
+    def scheduler():
+        return PolitenessScheduler(rate=1000, burst=50, max_per_host=4)
+    assert crawler.pipeline_crawl(site.url, max_pages=12, scheduler=scheduler(), frontier_path=path) == 12
+    assert crawler.pipeline_crawl(site.url, scheduler=scheduler(), frontier_path=path) == 30
+    pages = site.pages()
+    assert len(pages) == len(set(pages)) == 30
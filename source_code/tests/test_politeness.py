@@ -0,0 +1,106 @@
+import asyncio
+import math
+import time
+from email.utils import formatdate
+
+import pytest
+
+import politeness
+from politeness import PolitenessScheduler, host_of, parse_retry_after, ROBOTS_POLL
+
+
+def test_host_of():
+    assert host_of('https://Example.COM:8443/a/b?q') == 'https://example.com:8443'
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after(None) is None and parse_retry_after('soon') is None
+    now = time.time()
+    assert parse_retry_after(formatdate(now + 30, usegmt=True), now) == pytest.approx(30, abs=1)
+    assert parse_retry_after(formatdate(now - 30, usegmt=True), now) == 0.0
+
+
+def test_token_bucket():
+    scheduler = PolitenessScheduler(rate=2, burst=2, max_per_host=10, respect_robots=False)
+    url = 'http://a.example/p/'
+    scheduler.host(url)
+    now = time.monotonic()
+    assert scheduler.try_acquire(url, now) == 0
+    assert scheduler.try_acquire(url, now) == 0
+    assert scheduler.try_acquire(url, now) == pytest.approx(0.5)     # bucket empty
+    assert scheduler.try_acquire(url, now + 0.5) == 0
+    # another host has its own bucket
+    assert scheduler.try_acquire('http://b.example/', now + 0.5) == 0
+
+
+def test_concurrency_cap_waits_for_release():
+    scheduler = PolitenessScheduler(rate=1000, burst=10, max_per_host=1, respect_robots=False)
+    url = 'http://a.example/'
+    assert scheduler.try_acquire(url) == 0
+    assert math.isinf(scheduler.try_acquire(url))
+    scheduler.release(url)
+    assert scheduler.try_acquire(url) == 0
+
+
+def test_retry_after_blocks_the_host():
+    scheduler = PolitenessScheduler(rate=1000, burst=10, respect_robots=False, max_delay=5)
+    url = 'http://a.example/'
+    scheduler.try_acquire(url)
+    scheduler.release(url, '3600')
+    assert 4 < scheduler.try_acquire(url) <= 5                  # capped by max_delay
+    assert scheduler.try_acquire('http://b.example/') == 0
+
+
+def test_robots_crawl_delay_and_disallow(make_site):
+    site = make_site(3, robots='User-agent: *\nCrawl-delay: 2\nDisallow: /p1/\n')
+    scheduler = PolitenessScheduler(rate=100, burst=5)
+    assert not scheduler.allowed(site.url + 'p1/') and scheduler.allowed(site.url + 'p2/')
+    state = scheduler.host(site.url)
+    assert state.rate == 0.5 and state.burst == 1
+    assert site.requests.count('/robots.txt') == 1
+    assert scheduler.try_acquire(site.url) == 0
+    assert scheduler.try_acquire(site.url) > 1
+
+
+def test_robots_ready_does_not_block(make_site, monkeypatch):
+    slow_read = politeness.read_robots
+
+    def read_robots(robots, timeout):
+        time.sleep(0.5)
+        slow_read(robots, timeout)
+    monkeypatch.setattr(politeness, 'read_robots', read_robots)
+    site = make_site(3, robots='User-agent: *\nDisallow: /p1/\n')
+    scheduler = PolitenessScheduler(rate=100)
+
+    start = time.monotonic()
+    assert not scheduler.robots_ready(site.url)
+    assert scheduler.try_acquire(site.url) == ROBOTS_POLL
+    assert time.monotonic() - start < 0.2
+    scheduler.host(site.url).robots_loading.result(timeout=5)
+    assert scheduler.robots_ready(site.url) and not scheduler.allowed(site.url + 'p1/')
+    assert scheduler.try_acquire(site.url) == 0
+
+
+def test_slow_robots_times_out(make_site):
+    site = make_site(3, delay=0)
+    site.server.RequestHandlerClass = type('Slow', (site.server.RequestHandlerClass,), {
+        'do_GET': lambda self: time.sleep(2)})
+    scheduler = PolitenessScheduler(robots_timeout=0.2)
+    start = time.monotonic()
+    assert scheduler.allowed(site.url + 'p1/')          # unreachable robots.txt: no restrictions
+    assert time.monotonic() - start < 1.5
+
+
+def test_acquire_async_waits_for_release():
+    scheduler = PolitenessScheduler(rate=1000, burst=10, max_per_host=1, respect_robots=False)
+    url = 'http://a.example/'
+
+    async def run():
+        await scheduler.acquire_async(url)
+        waiter = asyncio.create_task(scheduler.acquire_async(url))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        scheduler.release(url)
+        await asyncio.wait_for(waiter, 1)
+    asyncio.run(run())
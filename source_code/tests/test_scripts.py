@@ -0,0 +1,18 @@
+import glob
+import os
+import re
+
+import pytest
+
+from conftest import SOURCE_DIR
+
+SCRIPTS = sorted(glob.glob(os.path.join(SOURCE_DIR, '*.py')))
+CONFLICT_RE = re.compile(r'^(<{7}|={7}|>{7})( |$)', re.M)
+
+
+@pytest.mark.parametrize('path', SCRIPTS, ids=os.path.basename)
+def test_script_has_no_conflict_markers(path):
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    assert not CONFLICT_RE.search(source)
+    compile(source, path, 'exec')